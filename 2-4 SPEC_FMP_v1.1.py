@@ -3,11 +3,13 @@ import requests
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from openai import OpenAI
 from datetime import datetime, timedelta
 import json
 import numpy as np
 
+import ai_client
+import http_client
+
 # 設置頁面配置
 st.set_page_config(
     page_title="AI 股票趨勢分析系統",
@@ -44,7 +46,7 @@ def get_stock_data(symbol, api_key, start_date, end_date):
         }
         
         # 發送API請求
-        response = requests.get(url, params=params)
+        response = http_client.http_get(url, params=params, endpoint='fmp/historical-price-eod')
         response.raise_for_status()
         
         data = response.json()
@@ -328,8 +330,8 @@ def generate_ai_insights(symbol, stock_data, openai_api_key, start_date, end_dat
         str: AI分析結果
     """
     try:
-        # 創建OpenAI客戶端
-        client = OpenAI(api_key=openai_api_key)
+        # 取得共用的OpenAI客戶端 (重用連線池)
+        client = ai_client.get_client(openai_api_key)
         
         # 準備數據
         first_date = stock_data['date'].iloc[0].strftime('%Y-%m-%d')
@@ -429,22 +431,25 @@ def generate_ai_insights(symbol, stock_data, openai_api_key, start_date, end_dat
 
 分析目標：{symbol}"""
         
-        # 調用OpenAI API (新版本)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        # 調用OpenAI API (串流模式，逐字渲染)
+        stream_stats = {}
+        analysis = st.write_stream(ai_client.stream_chat_completion(
+            client,
+            [
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": user_prompt}
             ],
+            stats=stream_stats,
             max_tokens=2500,
             temperature=0.3
-        )
-        
-        return response.choices[0].message.content
+        ))
+        st.caption(ai_client.format_stream_stats(stream_stats))
+        return analysis
         
     except Exception as e:
         st.error(f"AI分析失敗：{str(e)}")
-        return "AI分析暫時無法使用，請檢查API金鑰或稍後再試。"
+        st.info("AI分析暫時無法使用，請檢查API金鑰或稍後再試。")
+        return None
 
 # 側邊欄設置
 st.sidebar.markdown("## 🔧 分析設定")
@@ -598,17 +603,14 @@ if analyze_button:
                         
                         # AI技術分析
                         st.markdown("### 🤖 AI技術分析（含RSI指標解讀）")
-                        with st.spinner("AI 正在分析中..."):
-                            ai_analysis = generate_ai_insights(
-                                symbol.upper(), 
-                                data_with_indicators, 
-                                openai_api_key, 
-                                start_date, 
-                                end_date
-                            )
-                        
-                        if ai_analysis:
-                            st.markdown(ai_analysis)
+                        # 串流逐字顯示，不再以 spinner 等待完整報告
+                        generate_ai_insights(
+                            symbol.upper(), 
+                            data_with_indicators, 
+                            openai_api_key, 
+                            start_date, 
+                            end_date
+                        )
                         
                         # 歷史數據表格
                         st.markdown("### 📋 歷史數據表格（含RSI指標）")
@@ -0,0 +1,131 @@
+"""
+AI 分析結果快取
+以 SQLite 儲存 OpenAI 回應，鍵值為模型名稱、系統訊息、使用者提示與數據 JSON 的 SHA-256，
+輸入完全相同時直接返回先前的分析，不再呼叫 API；
+超過 TTL 的結果視為過期，筆數超過上限時淘汰最久未使用 (LRU) 的項目
+"""
+
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from price_cache import CACHE_DIR
+
+# ==================== 設定 ====================
+
+DEFAULT_DB_PATH = os.path.join(CACHE_DIR, "ai_responses.db")
+
+# 分析結果的有效期限
+DEFAULT_TTL = timedelta(hours=24)
+
+# 最多保留的分析筆數
+MAX_ENTRIES = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_response (
+    key           TEXT PRIMARY KEY,
+    model         TEXT NOT NULL,
+    response      TEXT NOT NULL,
+    created_at    TEXT NOT NULL,
+    last_accessed TEXT NOT NULL
+);
+"""
+
+
+# ==================== 內部函數 ====================
+
+def _connect(db_path):
+    """開啟資料庫連線並確保資料表存在"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ==================== 公開函數 ====================
+
+def make_key(model, system_message, user_prompt, data_json):
+    """
+    計算分析請求的內容鍵值
+
+    返回:
+        str: SHA-256 十六進位字串
+    """
+    digest = hashlib.sha256()
+    for part in (model, system_message, user_prompt, data_json):
+        encoded = (part or "").encode('utf-8')
+        # 加上長度前綴，避免不同切分方式產生相同的串接結果
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def get_response(key, ttl=DEFAULT_TTL, db_path=DEFAULT_DB_PATH, now=None):
+    """
+    讀取快取的分析結果並更新最後使用時間
+
+    參數:
+        key: make_key 的返回值
+        ttl: 有效期限，None 表示不會過期
+        db_path: SQLite 檔案路徑
+
+    返回:
+        dict: {'response', 'model', 'created_at'}，無快取或已過期時返回 None
+    """
+    now = now or datetime.now()
+    with closing(_connect(db_path)) as conn, conn:
+        row = conn.execute(
+            "SELECT response, model, created_at FROM ai_response WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        created_at = datetime.fromisoformat(row[2])
+        if ttl is not None and now - created_at >= ttl:
+            conn.execute("DELETE FROM ai_response WHERE key = ?", (key,))
+            return None
+
+        conn.execute(
+            "UPDATE ai_response SET last_accessed = ? WHERE key = ?",
+            (now.isoformat(timespec='seconds'), key),
+        )
+
+    return {'response': row[0], 'model': row[1], 'created_at': created_at}
+
+
+def save_response(key, model, response, db_path=DEFAULT_DB_PATH, max_entries=MAX_ENTRIES, now=None):
+    """
+    寫入分析結果，並淘汰超過上限的最久未使用項目
+
+    參數:
+        key: make_key 的返回值
+        model: 模型名稱
+        response: AI 回應文字
+        db_path: SQLite 檔案路徑
+        max_entries: 最多保留筆數
+    """
+    if not response:
+        return
+
+    timestamp = (now or datetime.now()).isoformat(timespec='seconds')
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_response (key, model, response, created_at, last_accessed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, model, response, timestamp, timestamp),
+        )
+        conn.execute(
+            "DELETE FROM ai_response WHERE key NOT IN ("
+            "SELECT key FROM ai_response ORDER BY last_accessed DESC, created_at DESC LIMIT ?)",
+            (max_entries,),
+        )
+
+
+def clear_cache(db_path=DEFAULT_DB_PATH):
+    """清除所有快取的分析結果"""
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute("DELETE FROM ai_response")
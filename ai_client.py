@@ -0,0 +1,261 @@
+"""
+OpenAI 對話輔助
+提供行程內共用的 OpenAI 客戶端 (依 API 金鑰與伺服器重用 keep-alive 連線池)、
+請求延遲與 token 用量統計，以及串流 / 非串流的 chat.completions 呼叫：
+串流回應轉為逐段文字的產生器，可直接交給 st.write_stream 逐字渲染，
+並記錄首個 token 延遲 (time to first token) 與總耗時
+"""
+
+import hashlib
+import threading
+import time
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI, Timeout
+
+# ==================== 設定 ====================
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# 讀取逾時秒數 (完整報告可能需要數十秒) 與連線逾時秒數
+REQUEST_TIMEOUT = 120
+CONNECT_TIMEOUT = 10
+
+# 連線錯誤、429 與 5xx 時的重試次數 (SDK 內建指數退避)
+MAX_RETRIES = 3
+
+# 連線池大小與閒置連線保留秒數 (SDK 預設只保留 5 秒，互動使用時幾乎每次都要重新 TLS 握手)
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 300
+
+# 粗估 token 數: 中文約 1 字 1 token，其餘約 4 字元 1 token
+CJK_TOKENS_PER_CHAR = 1.0
+ASCII_CHARS_PER_TOKEN = 4
+
+
+# ==================== 客戶端 ====================
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _build_client(api_key, base_url, timeout, max_retries):
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=Timeout(timeout, connect=CONNECT_TIMEOUT),
+        max_retries=max_retries,
+        http_client=DefaultHttpxClient(limits=limits),
+    )
+
+
+def get_client(api_key, base_url=None, timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES):
+    """
+    取得行程內共用的 OpenAI 客戶端
+
+    相同 API 金鑰、伺服器與逾時設定共用同一個客戶端與連線池，
+    避免每次分析都重新建立連線與 TLS 握手。
+
+    參數:
+        api_key: OpenAI API 金鑰
+        base_url: OpenAI 相容伺服器網址 (None 表示官方 API)
+        timeout: 讀取逾時秒數
+        max_retries: 重試次數
+
+    返回:
+        OpenAI: 客戶端
+    """
+    # 登錄表只保存金鑰的雜湊值
+    key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest(), base_url, timeout, max_retries)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = _build_client(api_key, base_url, timeout, max_retries)
+        return _clients[key]
+
+
+def close_clients():
+    """關閉所有共用客戶端的連線池"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+# ==================== 用量統計 ====================
+
+class UsageStats:
+    """各模型的請求次數、錯誤次數、延遲與 token 用量統計 (執行緒安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, model, elapsed, ok=True, usage=None, first_token=None):
+        with self._lock:
+            stat = self._stats.setdefault(model, {
+                'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0,
+                'first_token_total': 0.0, 'first_token_count': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0,
+            })
+            stat['count'] += 1
+            stat['total'] += elapsed
+            stat['max'] = max(stat['max'], elapsed)
+            if not ok:
+                stat['errors'] += 1
+            if first_token is not None:
+                stat['first_token_total'] += first_token
+                stat['first_token_count'] += 1
+            if usage:
+                stat['prompt_tokens'] += usage.get('prompt_tokens') or 0
+                stat['completion_tokens'] += usage.get('completion_tokens') or 0
+
+    def totals(self):
+        """
+        返回:
+            dict: 目前累計的原始統計副本，可傳給 snapshot(since=...) 計算之後的增量
+        """
+        with self._lock:
+            return {model: dict(stat) for model, stat in self._stats.items()}
+
+    def snapshot(self, since=None):
+        """
+        參數:
+            since: 先前 totals() 的結果，指定時只統計之後的請求 (例如單次批次執行)；
+                   最大延遲無法由差值得出，此時 max 為 None
+
+        返回:
+            dict: 模型 -> {'count', 'errors', 'avg', 'max', 'avg_first_token', 'prompt_tokens', 'completion_tokens'}
+        """
+        with self._lock:
+            current = {model: dict(stat) for model, stat in self._stats.items()}
+
+        result = {}
+        for model, stat in current.items():
+            if since is not None:
+                before = since.get(model, {})
+                stat = {key: value - before.get(key, 0) for key, value in stat.items() if key != 'max'}
+                stat['max'] = None
+                if not stat['count']:
+                    continue
+            result[model] = {
+                'count': stat['count'],
+                'errors': stat['errors'],
+                'avg': stat['total'] / stat['count'] if stat['count'] else 0.0,
+                'max': stat['max'],
+                'avg_first_token': (stat['first_token_total'] / stat['first_token_count']
+                                    if stat['first_token_count'] else None),
+                'prompt_tokens': stat['prompt_tokens'],
+                'completion_tokens': stat['completion_tokens'],
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+usage_stats = UsageStats()
+
+
+def _usage_dict(usage):
+    if usage is None:
+        return {}
+    return {
+        'prompt_tokens': usage.prompt_tokens,
+        'completion_tokens': usage.completion_tokens,
+        'total_tokens': usage.total_tokens,
+    }
+
+
+# ==================== 串流 ====================
+
+def stream_chat_completion(client, messages, model=DEFAULT_MODEL, stats=None, **kwargs):
+    """
+    以串流模式呼叫 chat.completions，逐段產生回應文字
+
+    參數:
+        client: OpenAI 客戶端
+        messages: 對話訊息清單
+        model: 模型名稱
+        stats: 選填 dict，收到第一段文字時填入 first_token (秒)，結束時填入 elapsed (秒) 與 usage
+        **kwargs: 其他 chat.completions.create 參數 (max_tokens、temperature 等)
+
+    返回:
+        generator: 依序產生的文字片段
+    """
+    stats = {} if stats is None else stats
+    started = time.perf_counter()
+    ok = False
+    try:
+        stream = client.chat.completions.create(
+            model=model, messages=messages, stream=True,
+            stream_options={'include_usage': True}, **kwargs
+        )
+        for chunk in stream:
+            # 最後一個 chunk 只帶 usage 而沒有 choices
+            if getattr(chunk, 'usage', None) is not None:
+                stats['usage'] = _usage_dict(chunk.usage)
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            if 'first_token' not in stats:
+                stats['first_token'] = time.perf_counter() - started
+            yield text
+        ok = True
+    finally:
+        stats['elapsed'] = time.perf_counter() - started
+        usage_stats.record(model, stats['elapsed'], ok, stats.get('usage'), stats.get('first_token'))
+
+
+def format_stream_stats(stats):
+    """
+    返回:
+        str: 例如「首個 token 0.8 秒，完成 21.4 秒」，無統計時為空字串
+    """
+    if 'first_token' not in stats:
+        return ""
+    text = f"首個 token {stats['first_token']:.1f} 秒"
+    if 'elapsed' in stats:
+        text += f"，完成 {stats['elapsed']:.1f} 秒"
+    return text
+
+
+# ==================== 非串流 ====================
+
+def complete_chat(client, messages, model=DEFAULT_MODEL, **kwargs):
+    """
+    以非串流模式呼叫 chat.completions
+
+    返回:
+        tuple: (回應文字, usage dict；伺服器未回傳 usage 時為空 dict)
+    """
+    started = time.perf_counter()
+    ok = False
+    usage = {}
+    try:
+        response = client.chat.completions.create(model=model, messages=messages, **kwargs)
+        usage = _usage_dict(getattr(response, 'usage', None))
+        ok = True
+        return response.choices[0].message.content, usage
+    finally:
+        usage_stats.record(model, time.perf_counter() - started, ok, usage)
+
+
+def estimate_tokens(text):
+    """
+    粗估文字的 token 數 (用於限流預估，不需精確)
+
+    返回:
+        int: 估計的 token 數
+    """
+    cjk = sum(1 for ch in text if ord(ch) > 0x2E7F)
+    other = len(text) - cjk
+    return int(cjk * CJK_TOKENS_PER_CHAR + other / ASCII_CHARS_PER_TOKEN) + 1
@@ -0,0 +1,129 @@
+"""
+Streamlit 層級的函數快取
+以 st.cache_data 包裝計算函數並記錄各函數的命中 / 未命中次數；側邊欄可檢視快取狀態與清除快取。
+調整 RSI 週期或日期等參數後重新分析時，相同輸入不再重新計算。
+股價、財報與月營收的獲取不在此記憶，由本地資料庫的同步間隔決定何時重新下載。
+"""
+
+import functools
+import threading
+
+import pandas as pd
+import streamlit as st
+
+# ==================== 設定 ====================
+
+# 純計算結果只取決於輸入，不需過期，只限制筆數
+COMPUTE_TTL = None
+
+# 每個函數最多保留的快取筆數
+MAX_ENTRIES = 64
+
+
+class _NotCached(Exception):
+    """函數返回 None (獲取失敗或無數據)，不寫入快取"""
+
+
+_registry = {}
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+# ==================== 包裝器 ====================
+
+def _count(name, field):
+    with _counters_lock:
+        _counters.setdefault(name, {'calls': 0, 'misses': 0})[field] += 1
+
+
+def cached(label, ttl, max_entries=MAX_ENTRIES):
+    """
+    以 st.cache_data 快取函數結果並記錄命中率
+
+    返回 None 的結果 (API 失敗或查無數據) 不會被快取，下次呼叫會重新執行。
+
+    參數:
+        label: 快取狀態表中顯示的名稱
+        ttl: 有效期限 (timedelta)，None 表示不過期
+        max_entries: 最多保留筆數
+
+    返回:
+        function: 裝飾器；被裝飾的函數另有 clear() 可清除其快取
+    """
+    def decorator(func):
+        def load(*args, **kwargs):
+            # 只有未命中時才會執行到這裡
+            _count(func.__qualname__, 'misses')
+            result = func(*args, **kwargs)
+            if result is None:
+                raise _NotCached()
+            return result
+
+        # st.cache_data 以模組與函數名稱區分快取，沿用原函數的名稱避免彼此衝突
+        load.__module__ = func.__module__
+        load.__qualname__ = func.__qualname__
+        load.__name__ = func.__name__
+        cached_load = st.cache_data(ttl=ttl, max_entries=max_entries, show_spinner=False)(load)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _count(func.__qualname__, 'calls')
+            try:
+                return cached_load(*args, **kwargs)
+            except _NotCached:
+                return None
+
+        wrapper.clear = cached_load.clear
+        _registry[func.__qualname__] = (label, ttl, wrapper)
+        return wrapper
+
+    return decorator
+
+
+# ==================== 狀態與清除 ====================
+
+def _format_ttl(ttl):
+    if ttl is None:
+        return "不過期"
+    if ttl.days:
+        return f"{ttl.days} 天"
+    return f"{ttl.seconds // 3600} 小時"
+
+
+def cache_stats():
+    """
+    返回:
+        DataFrame: 每個快取函數的名稱、TTL、呼叫次數、命中、未命中與命中率
+    """
+    rows = []
+    with _counters_lock:
+        for name, (label, ttl, _) in _registry.items():
+            counter = _counters.get(name, {'calls': 0, 'misses': 0})
+            hits = counter['calls'] - counter['misses']
+            rows.append({
+                '項目': label,
+                'TTL': _format_ttl(ttl),
+                '呼叫': counter['calls'],
+                '命中': hits,
+                '未命中': counter['misses'],
+                '命中率': f"{hits / counter['calls']:.0%}" if counter['calls'] else "-",
+            })
+    return pd.DataFrame(rows)
+
+
+def clear_all():
+    """清除所有已登錄函數的快取並歸零計數"""
+    for _, _, wrapper in _registry.values():
+        wrapper.clear()
+    with _counters_lock:
+        _counters.clear()
+
+
+def render_cache_sidebar():
+    """在側邊欄顯示快取狀態表與清除按鈕"""
+    with st.sidebar.expander("🗄️ 快取狀態", expanded=False):
+        st.dataframe(cache_stats(), use_container_width=True, hide_index=True)
+        if st.button("清除計算快取", use_container_width=True,
+                     help="清除記憶體中的計算快取，下次分析會重新計算 (本地資料庫不受影響)"):
+            clear_all()
+            st.success("✅ 已清除快取")
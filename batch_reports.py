@@ -0,0 +1,239 @@
+"""
+自選股批次 AI 報告
+沿用 stock_analysis_app 的數據流程與提示語，為整份自選股清單產生 AI 綜合分析報告，
+以有限並行數呼叫 OpenAI 並遵守每分鐘 token 上限 (TPM)，結果寫入 reports/ 供 Streamlit 頁面瀏覽
+
+可用 --base-url 指向本地的 OpenAI 相容伺服器 (例如 mock_openai_server.py) 離線測試
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import ai_cache
+import ai_client
+import http_client
+import prompt_builder
+import report_store
+import stock_analysis_app as app
+
+# ==================== 設定 ====================
+
+# 同時進行的 OpenAI 請求數
+DEFAULT_CONCURRENCY = 4
+
+# 每分鐘 token 上限 (gpt-4o-mini Tier 1 為 200,000)
+DEFAULT_TPM = 200_000
+
+# 限流時為每份報告的回應預留的 token 數
+COMPLETION_TOKEN_RESERVE = 2000
+
+# 與互動頁面相同的預設分析區間
+DEFAULT_LOOKBACK_DAYS = 90
+
+
+# ==================== 工作項目 ====================
+
+def load_watchlist(path):
+    """
+    讀取自選股清單 (每行一個代碼，# 之後為註解)
+
+    返回:
+        list: 不重複的股票代碼 (保持原順序)
+    """
+    symbols = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            symbol = line.split('#', 1)[0].strip()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+    return symbols
+
+
+def build_report_request(symbol, token, start_date, end_date, rsi_period=14,
+                         model=ai_client.DEFAULT_MODEL, token_budget=prompt_builder.DEFAULT_TOKEN_BUDGET):
+    """
+    以互動頁面相同的流程獲取數據並組合提示語
+
+    返回:
+        dict: prompt_builder.build_prompt 的結果加上 symbol 與分析區間；數據不足時返回 None
+    """
+    analysis = app.run_analysis_pipeline(symbol, token, start_date, end_date, rsi_period)
+    if analysis['tech_data'] is None:
+        return None
+
+    inputs = app.prepare_ai_inputs(analysis)
+    request = prompt_builder.build_prompt(
+        symbol, analysis['tech_data'], token_budget=token_budget, model=model,
+        rsi_period=rsi_period, **inputs
+    )
+    request.update(symbol=symbol, first_date=inputs['first_date'], last_date=inputs['last_date'])
+    return request
+
+
+def generate_report(client, request, bucket, model=ai_client.DEFAULT_MODEL, force=False,
+                    ai_cache_path=ai_cache.DEFAULT_DB_PATH):
+    """
+    產生單一股票的報告 (先查 AI 分析快取，未命中才呼叫 OpenAI)
+
+    參數:
+        client: OpenAI 客戶端
+        request: build_report_request 的返回值
+        bucket: 每分鐘 token 限流器 (http_client.TokenBucket)
+        model: 模型名稱
+        force: 忽略快取並重新生成
+        ai_cache_path: AI 分析快取的 SQLite 路徑
+
+    返回:
+        dict: report、usage、cached
+    """
+    cache_key = ai_cache.make_key(model, request['system_message'], request['user_prompt'], request['data_table'])
+    cached = None if force else ai_cache.get_response(cache_key, db_path=ai_cache_path)
+    if cached is not None:
+        return {'report': cached['response'], 'usage': {}, 'cached': True}
+
+    messages = app.build_ai_messages(request['system_message'], request['user_prompt'])
+    estimated = request['tokens'] + COMPLETION_TOKEN_RESERVE
+    bucket.acquire(min(estimated, bucket.capacity))
+
+    report, usage = ai_client.complete_chat(client, messages, model=model)
+    ai_cache.save_response(cache_key, model, report, db_path=ai_cache_path)
+    return {'report': report, 'usage': usage, 'cached': False}
+
+
+# ==================== 批次執行 ====================
+
+def run_batch(symbols, openai_api_key, token="", start_date=None, end_date=None, rsi_period=14,
+              model=ai_client.DEFAULT_MODEL, concurrency=DEFAULT_CONCURRENCY, tpm=DEFAULT_TPM,
+              base_url=None, force=False, token_budget=prompt_builder.DEFAULT_TOKEN_BUDGET,
+              output_dir=report_store.REPORTS_DIR, progress=None, ai_cache_path=ai_cache.DEFAULT_DB_PATH):
+    """
+    為多檔股票產生 AI 報告
+
+    每檔股票的數據獲取與 OpenAI 呼叫在執行緒池中進行，最多 concurrency 檔同時處理；
+    所有 OpenAI 請求共用一個每分鐘 token 限流器。單一股票失敗不影響其他股票。
+
+    參數:
+        symbols: 股票代碼清單
+        openai_api_key: OpenAI API 金鑰
+        token: FinMind API Token
+        start_date / end_date: 分析區間，預設為最近 90 天
+        rsi_period: RSI 週期
+        model: 模型名稱
+        concurrency: 最大並行數
+        tpm: 每分鐘 token 上限
+        base_url: OpenAI 相容伺服器網址 (None 表示官方 API)
+        force: 忽略 AI 分析快取
+        token_budget: 每份提示語的 token 預算
+        output_dir: 報告輸出目錄
+        progress: 選填回呼函數，每完成一檔呼叫 progress(result)
+        ai_cache_path: AI 分析快取的 SQLite 路徑
+
+    返回:
+        dict: 批次摘要 (亦寫入 <執行目錄>/summary.json)
+    """
+    end_date = end_date or datetime.now().date()
+    start_date = start_date or end_date - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+
+    started_at = datetime.now()
+    # 行程內的用量統計是累計的 (Streamlit 頁面會重複執行)，摘要只報告本次的增量
+    usage_before = ai_client.usage_stats.totals()
+    run_dir = report_store.create_run_dir(started_at, output_dir)
+
+    client = ai_client.get_client(openai_api_key, base_url)
+    bucket = http_client.TokenBucket(capacity=tpm, refill_rate=tpm / 60)
+
+    def run_one(symbol):
+        started = time.perf_counter()
+        result = {'symbol': symbol, 'model': model, 'status': 'ok', 'error': None,
+                  'first_date': None, 'last_date': None, 'cached': False, 'usage': {}, 'report': None}
+        try:
+            request = build_report_request(symbol, token, start_date, end_date, rsi_period,
+                                           model, token_budget)
+            if request is None:
+                result.update(status='no_data', error="分析區間內沒有股價數據")
+            else:
+                result.update(first_date=request['first_date'], last_date=request['last_date'])
+                result.update(generate_report(client, request, bucket, model, force, ai_cache_path))
+        except Exception as e:
+            result.update(status='error', error=str(e))
+
+        result['elapsed'] = round(time.perf_counter() - started, 2)
+        report_store.write_report(run_dir, result)
+        if progress is not None:
+            progress(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(run_one, symbols))
+
+    summary = {
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'model': model,
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+        'reports': [
+            {**{key: result[key] for key in ('symbol', 'status', 'cached', 'elapsed', 'error')},
+             'total_tokens': result['usage'].get('total_tokens')}
+            for result in results
+        ],
+        'openai_stats': ai_client.usage_stats.snapshot(since=usage_before),
+    }
+    report_store.write_summary(run_dir, summary)
+    summary['run_dir'] = run_dir
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="為自選股清單批次產生 AI 綜合分析報告")
+    parser.add_argument('symbols', nargs='*', help="股票代碼 (可與 --watchlist 併用)")
+    parser.add_argument('--watchlist', default=None, help="自選股清單檔 (每行一個代碼)")
+    parser.add_argument('--start-date', default=None, help="起始日期 (YYYY-MM-DD)，預設為 90 天前")
+    parser.add_argument('--end-date', default=None, help="結束日期 (YYYY-MM-DD)，預設為今天")
+    parser.add_argument('--rsi-period', type=int, default=14, help="RSI 週期")
+    parser.add_argument('--model', default=ai_client.DEFAULT_MODEL, help="模型名稱")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="最大並行數")
+    parser.add_argument('--tpm', type=int, default=DEFAULT_TPM, help="每分鐘 token 上限")
+    parser.add_argument('--base-url', default=os.environ.get('OPENAI_BASE_URL'),
+                        help="OpenAI 相容伺服器網址 (測試時可指向本地模擬伺服器)")
+    parser.add_argument('--api-key', default=os.environ.get('OPENAI_API_KEY', ''), help="OpenAI API Key")
+    parser.add_argument('--token', default=os.environ.get('FINMIND_TOKEN', ''), help="FinMind API Token")
+    parser.add_argument('--token-budget', type=int, default=prompt_builder.DEFAULT_TOKEN_BUDGET,
+                        help="每份提示語的 token 預算")
+    parser.add_argument('--force', action='store_true', help="忽略 AI 分析快取重新生成")
+    parser.add_argument('--output', default=report_store.REPORTS_DIR, help="報告輸出目錄")
+    args = parser.parse_args()
+
+    symbols = list(args.symbols)
+    if args.watchlist:
+        symbols += [s for s in load_watchlist(args.watchlist) if s not in symbols]
+    if not symbols:
+        parser.error("請指定股票代碼或 --watchlist")
+    if not args.api_key:
+        parser.error("請以 --api-key 或環境變數 OPENAI_API_KEY 提供 OpenAI API Key")
+
+    def progress(result):
+        note = "快取" if result['cached'] else result['status']
+        print(f"{result['symbol']}: {note} ({result['elapsed']:.1f} 秒)" +
+              (f" - {result['error']}" if result['error'] else ""))
+
+    summary = run_batch(
+        symbols, args.api_key, args.token,
+        start_date=datetime.strptime(args.start_date, '%Y-%m-%d').date() if args.start_date else None,
+        end_date=datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None,
+        rsi_period=args.rsi_period, model=args.model, concurrency=args.concurrency, tpm=args.tpm,
+        base_url=args.base_url, force=args.force, token_budget=args.token_budget,
+        output_dir=args.output, progress=progress,
+    )
+    succeeded = sum(1 for report in summary['reports'] if report['status'] == 'ok')
+    print(f"完成 {succeeded}/{len(summary['reports'])} 份報告 → {summary['run_dir']}")
+    for model, stat in summary['openai_stats'].items():
+        print(f"{model}: {stat['count']} 次請求 (錯誤 {stat['errors']})，平均 {stat['avg']:.1f} 秒，"
+              f"輸入 {stat['prompt_tokens']} / 輸出 {stat['completion_tokens']} tokens")
+
+
+if __name__ == "__main__":
+    main()
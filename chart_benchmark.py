@@ -0,0 +1,223 @@
+"""
+技術分析圖表效能測試
+以模擬的多年日線數據比較 plot_advanced_chart 完整模式與快速模式
+(WebGL + LTTB 降採樣 + 週K/月K 彙總) 的建圖時間、資料點數與圖表 JSON 大小；
+--html 另輸出自動平移圖表並量測瀏覽器每秒影格數 (FPS) 的網頁，
+--helpers 比較逐列產生顏色 / 標籤與 chart_helpers 陣列函數的耗時
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import chart_helpers
+import stock_analysis_app as app
+from indicators import compute_indicators
+
+# ==================== 設定 ====================
+
+# 測試的期間長度 (年)
+DEFAULT_YEARS = (1, 3, 5, 10, 20)
+
+# 每年交易日數
+TRADING_DAYS_PER_YEAR = 250
+
+# 建圖時間取最佳的重複次數
+REPEAT = 3
+
+# 顏色 / 標籤微基準的序列長度與重複次數
+HELPER_SIZES = (250, 1250, 5000, 20000)
+HELPER_REPEAT = 20
+
+# 瀏覽器平移量測秒數
+FPS_DURATION_MS = 5000
+
+# 以 Plotly.relayout 來回平移 x 軸，統計完成的重繪次數
+FPS_SCRIPT = """
+(function () {
+    var gd = document.getElementById('{plot_id}');
+    var range = gd._fullLayout.xaxis.range.map(function (v) { return new Date(v).getTime(); });
+    var span = range[1] - range[0];
+    var frames = 0;
+    var started = performance.now();
+    function step() {
+        var offset = span * 0.1 * Math.sin(frames / 10);
+        Plotly.relayout(gd, {'xaxis.range': [range[0] + offset, range[1] + offset]}).then(function () {
+            frames += 1;
+            var elapsed = performance.now() - started;
+            if (elapsed < DURATION_MS) {
+                requestAnimationFrame(step);
+                return;
+            }
+            var fps = (frames * 1000 / elapsed).toFixed(1);
+            document.title = 'FPS ' + fps;
+            var note = document.createElement('h3');
+            note.textContent = '平移重繪: ' + fps + ' FPS (' + frames + ' 次 / ' + (elapsed / 1000).toFixed(1) + ' 秒)';
+            document.body.insertBefore(note, document.body.firstChild);
+        });
+    }
+    requestAnimationFrame(step);
+})();
+"""
+
+
+# ==================== 測試數據 ====================
+
+def make_price_history(num_days, seed=0):
+    """
+    產生模擬的日線數據並計算技術指標
+
+    返回:
+        DataFrame: 含 date, open, high, low, close, volume 與所有指標欄位
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, num_days)))
+    open_ = close * (1 + rng.normal(0, 0.005, num_days))
+    spread = close * np.abs(rng.normal(0, 0.01, num_days))
+    df = pd.DataFrame({
+        'date': pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=num_days),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(1_000_000, 50_000_000, num_days).astype(float),
+    })
+    return compute_indicators(df)
+
+
+def count_points(fig):
+    """
+    返回:
+        int: 圖表中所有 trace 的資料點總數
+    """
+    return sum(len(trace.x) for trace in fig.data if trace.x is not None)
+
+
+# ==================== 量測 ====================
+
+def measure(df, render_mode):
+    """
+    返回:
+        dict: 建圖時間 (毫秒，取最佳值)、資料點數、JSON 大小 (KB) 與圖表物件
+    """
+    best = float('inf')
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fig = app.plot_advanced_chart(df, 'BENCH', render_mode)
+        best = min(best, time.perf_counter() - started)
+    return {
+        'build_ms': best * 1000,
+        'points': count_points(fig),
+        'json_kb': len(fig.to_json().encode('utf-8')) / 1024,
+        'figure': fig,
+    }
+
+
+def run_benchmark(years=DEFAULT_YEARS, html_dir=None):
+    """
+    量測各期間長度下完整模式與快速模式的差異
+
+    參數:
+        years: 期間長度 (年) 清單
+        html_dir: 輸出 FPS 量測網頁的目錄，None 表示不輸出
+
+    返回:
+        DataFrame: 每個期間與模式的量測結果
+    """
+    if html_dir:
+        os.makedirs(html_dir, exist_ok=True)
+
+    rows = []
+    for year in years:
+        df = make_price_history(year * TRADING_DAYS_PER_YEAR)
+        for mode in ('full', 'fast'):
+            result = measure(df, mode)
+            rows.append({
+                '年數': year,
+                'K棒數': len(df),
+                '模式': mode,
+                '建圖 (ms)': round(result['build_ms'], 1),
+                '資料點數': result['points'],
+                'JSON (KB)': round(result['json_kb'], 1),
+            })
+            if html_dir:
+                result['figure'].write_html(
+                    os.path.join(html_dir, f"chart_{year}y_{mode}.html"),
+                    include_plotlyjs='cdn',
+                    post_script=FPS_SCRIPT.replace('DURATION_MS', str(FPS_DURATION_MS)),
+                )
+    return pd.DataFrame(rows)
+
+
+# ==================== 顏色與標籤微基準 ====================
+
+def _best_ms(func, repeat=HELPER_REPEAT):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run_helper_benchmark(sizes=HELPER_SIZES):
+    """
+    比較逐列產生顏色 / 標籤 (原本的寫法) 與 chart_helpers 的陣列函數
+
+    返回:
+        DataFrame: 每個序列長度與項目的耗時 (毫秒)
+    """
+    rows = []
+    for size in sizes:
+        df = make_price_history(size)
+        cases = {
+            '成交量顏色': (
+                lambda: ['#ef5350' if df['close'].iloc[i] >= df['open'].iloc[i] else '#26a69a'
+                         for i in range(len(df))],
+                lambda: chart_helpers.candle_colors(df['open'], df['close']),
+            ),
+            'MACD 柱狀顏色': (
+                lambda: ['#ef5350' if val >= 0 else '#26a69a' for val in df['MACD_Hist']],
+                lambda: chart_helpers.sign_colors(df['MACD_Hist'], chart_helpers.UP_COLOR,
+                                                  chart_helpers.DOWN_COLOR),
+            ),
+            '數值標籤': (
+                lambda: df['close'].apply(lambda x: f'{x:.2f}' if pd.notna(x) else 'N/A'),
+                lambda: chart_helpers.format_labels(df['close']),
+            ),
+        }
+        for name, (legacy, helper) in cases.items():
+            legacy_ms = _best_ms(legacy, repeat=3 if size > 5000 else HELPER_REPEAT)
+            helper_ms = _best_ms(helper)
+            rows.append({
+                '筆數': size,
+                '項目': name,
+                '逐列 (ms)': round(legacy_ms, 3),
+                '陣列 (ms)': round(helper_ms, 3),
+                '加速倍數': round(legacy_ms / helper_ms, 1),
+            })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技術分析圖表完整模式與快速模式的效能比較")
+    parser.add_argument('--years', type=int, nargs='+', default=list(DEFAULT_YEARS), help="期間長度 (年)")
+    parser.add_argument('--html', default=None, help="輸出 FPS 量測網頁的目錄 (以瀏覽器開啟後查看標題列)")
+    parser.add_argument('--helpers', action='store_true', help="只執行顏色 / 標籤陣列的微基準")
+    args = parser.parse_args()
+
+    if args.helpers:
+        print(run_helper_benchmark().to_string(index=False))
+        return
+
+    results = run_benchmark(args.years, args.html)
+    print(results.to_string(index=False))
+    if args.html:
+        print(f"FPS 量測網頁已輸出至 {args.html}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+圖表輔助工具
+長期間的技術分析圖表改用 WebGL (Scattergl) 繪製折線，
+並以 LTTB (Largest-Triangle-Three-Buckets) 演算法降低折線點數、
+將日 K 彙總為週 K / 月 K，減少送到瀏覽器的圖表 JSON 大小；
+另提供各圖表共用的顏色與標籤陣列產生函數
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# ==================== 設定 ====================
+
+# 圖表模式: 自動 (依資料筆數決定)、完整 (所有資料點)、快速 (WebGL + 降採樣)
+RENDER_MODES = {'auto': '自動', 'full': '完整', 'fast': '快速'}
+
+# 自動模式下超過此 K 棒數改用快速模式 (約 2 年日線)
+FAST_MODE_THRESHOLD = 500
+
+# 快速模式下每條折線最多保留的點數
+LTTB_THRESHOLD = 600
+
+# 日 K 超過此筆數時彙總為週 K / 月 K (由大到小比對)
+BAR_INTERVALS = [
+    (2500, pd.offsets.MonthEnd(), '月K'),
+    (FAST_MODE_THRESHOLD, pd.offsets.Week(weekday=4), '週K'),
+]
+
+# K 棒彙總方式
+OHLC_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+# 技術面 (台股習慣): 紅色 = 上漲、綠色 = 下跌
+UP_COLOR = '#ef5350'
+DOWN_COLOR = '#26a69a'
+
+# 基本面: 綠色 = 正向、紅色 = 負向
+POSITIVE_COLOR = '#66bb6a'
+NEGATIVE_COLOR = '#ef5350'
+NEUTRAL_COLOR = '#2196f3'
+
+
+# ==================== 降採樣 ====================
+
+def lttb_indices(x, y, threshold=LTTB_THRESHOLD):
+    """
+    以 LTTB 演算法挑選保留的資料點
+
+    將資料分成 threshold - 2 個區間，每個區間保留與前一個保留點、
+    下一區間平均點所構成三角形面積最大的點，保留峰谷等視覺特徵。
+
+    參數:
+        x: 遞增的數值陣列 (日期請先轉為數值)
+        y: 數值陣列，NaN 的點不參與挑選
+        threshold: 最多保留的點數
+
+    返回:
+        ndarray: 保留點的位置 (遞增)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(np.isfinite(y))
+    n = len(valid)
+    if threshold >= n or threshold < 3:
+        return valid
+
+    xs = x[valid] - x[valid[0]]
+    ys = y[valid]
+    bucket_size = (n - 2) / (threshold - 2)
+    # 各區間的邊界，第 i 個區間為 [bounds[i], bounds[i + 1])，最後一個點自成一區
+    bounds = np.floor(np.arange(threshold - 1) * bucket_size).astype(np.int64) + 1
+    bounds = np.append(bounds, n)
+
+    # 各區間的平均點一次算好；逐區間挑選依賴前一個保留點，以純 Python 迴圈處理
+    # (每個區間只有數個點，逐次呼叫 numpy 的額外開銷反而更大)
+    sizes = np.diff(bounds)
+    avg_x = (np.add.reduceat(xs, bounds[:-1]) / sizes).tolist()
+    avg_y = (np.add.reduceat(ys, bounds[:-1]) / sizes).tolist()
+    xs, ys, bounds = xs.tolist(), ys.tolist(), bounds.tolist()
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        ax, ay = xs[a], ys[a]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        best_area = -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            area = abs((ax - cx) * (ys[j] - ay) - (ax - xs[j]) * (cy - ay))
+            if area > best_area:
+                best_area, a = area, j
+        selected[i + 1] = a
+    return valid[selected]
+
+
+def _date_values(dates):
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+def line_trace(dates, values, fast=False, threshold=LTTB_THRESHOLD, **kwargs):
+    """
+    建立折線 trace
+
+    參數:
+        dates: 日期 Series
+        values: 數值 Series
+        fast: True 時使用 Scattergl 並以 LTTB 降採樣
+        threshold: 降採樣後最多保留的點數
+        **kwargs: 其他 trace 參數 (name、line 等)
+
+    返回:
+        go.Scatter 或 go.Scattergl
+    """
+    if not fast:
+        return go.Scatter(x=dates, y=values, mode='lines', **kwargs)
+
+    keep = lttb_indices(_date_values(dates), values, threshold)
+    return go.Scattergl(
+        x=np.asarray(dates)[keep], y=np.asarray(values, dtype=np.float64)[keep],
+        mode='lines', **kwargs
+    )
+
+
+# ==================== K 棒彙總 ====================
+
+def choose_bar_interval(num_bars):
+    """
+    依日 K 筆數選擇 K 棒週期
+
+    返回:
+        tuple: (pandas offset, 顯示名稱)，不需彙總時為 (None, '日K')
+    """
+    for min_bars, offset, label in BAR_INTERVALS:
+        if num_bars > min_bars:
+            return offset, label
+    return None, '日K'
+
+
+def resample_ohlc(df, offset, last_columns=()):
+    """
+    將日 K 彙總為週 K / 月 K
+
+    參數:
+        df: 含 date, open, high, low, close, volume 的 DataFrame (依日期遞增)
+        offset: pandas offset，例如 pd.offsets.Week(weekday=4)
+        last_columns: 其他取期末值的欄位 (例如 MACD_Hist)
+
+    返回:
+        DataFrame: 彙總後的 K 棒，date 為期末日期
+    """
+    agg = dict(OHLC_AGG)
+    agg.update({col: 'last' for col in last_columns})
+    bars = df.set_index('date')[list(agg)].resample(offset).agg(agg)
+    return bars.dropna(subset=['close']).reset_index()
+
+
+def resolve_render_mode(mode, num_bars):
+    """
+    返回:
+        bool: 是否使用快速模式 (mode 為 'auto' 時依 K 棒數決定)
+    """
+    if mode == 'auto':
+        return num_bars > FAST_MODE_THRESHOLD
+    return mode == 'fast'
+
+
+# ==================== 顏色與標籤 ====================
+
+def sign_colors(values, positive=POSITIVE_COLOR, negative=NEGATIVE_COLOR, strict=False):
+    """
+    依正負號產生顏色陣列
+
+    參數:
+        values: 數值陣列或 Series (NaN 視為負值)
+        positive: 正值的顏色
+        negative: 負值的顏色
+        strict: True 時 0 也視為負值 (大於 0 才使用 positive)
+
+    返回:
+        list: 與 values 等長的顏色 (numpy 字串陣列會讓 plotly 的 orjson 序列化
+              退回較慢的相容路徑，日期也會多出微秒，因此轉為 list)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(values > 0 if strict else values >= 0, positive, negative).tolist()
+
+
+def candle_colors(open_prices, close_prices, up=UP_COLOR, down=DOWN_COLOR):
+    """
+    依收盤價是否高於等於開盤價產生 K 棒 / 成交量顏色
+
+    返回:
+        list: 收盤 >= 開盤為 up，其餘為 down
+    """
+    close_prices = np.asarray(close_prices, dtype=np.float64)
+    return np.where(close_prices >= np.asarray(open_prices, dtype=np.float64), up, down).tolist()
+
+
+def format_labels(values, fmt='{:.2f}', na='N/A'):
+    """
+    將數值格式化為標籤文字
+
+    numpy 的字串運算 (np.char.mod) 實測並不比逐一格式化快，
+    因此一次轉為 Python float 清單後格式化，仍約為 Series.apply 的兩倍速。
+
+    參數:
+        values: 數值陣列或 Series
+        fmt: str.format 格式，例如 '{:.1f}%'
+        na: NaN 顯示的文字
+
+    返回:
+        list: 與 values 等長的標籤
+    """
+    return [na if value != value else fmt.format(value)
+            for value in np.asarray(values, dtype=np.float64).tolist()]
@@ -0,0 +1,154 @@
+"""
+精簡資料型別
+全市場的價格與財報數據在載入時一次轉為較小的型別:
+OHLC 為 float32、成交量為 uint32 / uint64、股票代碼與會計科目為 categorical，
+財報維持長表 (date, type, value) 或稀疏寬表，而非數百個大多為 NaN 的 float64 欄位
+"""
+
+import numpy as np
+import pandas as pd
+
+# ==================== 設定 ====================
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+# 台股價格最多兩位小數、不超過萬元，float32 的 7 位有效數字足夠
+PRICE_DTYPE = np.float32
+
+# 財報金額可達兆元 (13 位數)，超過 float32 的有效位數，維持 float64
+STATEMENT_VALUE_DTYPE = np.float64
+
+# 以 categorical 儲存的重複字串欄位
+CATEGORY_COLUMNS = ('symbol', 'stock_id', 'dataset', 'type')
+
+
+# ==================== 轉換 ====================
+
+def smallest_unsigned_dtype(values):
+    """
+    返回:
+        numpy dtype: 可容納 values 最大值的無號整數型別 (uint32 或 uint64)
+    """
+    maximum = np.nanmax(values) if len(values) else 0
+    return np.dtype(np.uint32) if maximum <= np.iinfo(np.uint32).max else np.dtype(np.uint64)
+
+
+def _categorize(df):
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def compact_prices(df):
+    """
+    將價格數據轉為精簡型別
+
+    參數:
+        df: 含 open, high, low, close, volume (與 symbol) 的 DataFrame
+
+    返回:
+        DataFrame: OHLC 為 float32、volume 為 uint32 / uint64、symbol 為 categorical 的副本
+    """
+    df = df.copy()
+    for column in PRICE_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(PRICE_DTYPE)
+    if 'volume' in df.columns:
+        volume = df['volume'].fillna(0).clip(lower=0)
+        df['volume'] = volume.astype(smallest_unsigned_dtype(volume.to_numpy()))
+    return _categorize(df)
+
+
+def compact_statements(long_df):
+    """
+    將財報長表 (date, type, value) 轉為精簡型別
+
+    返回:
+        DataFrame: 科目、股票代碼與數據集為 categorical 的副本
+    """
+    long_df = long_df.copy()
+    long_df['value'] = long_df['value'].astype(STATEMENT_VALUE_DTYPE)
+    return _categorize(long_df)
+
+
+def sparse_statements(long_df, index=('symbol', 'date')):
+    """
+    將財報長表轉為稀疏寬表 (每季一列、每個科目一欄，只儲存有數值的格子)
+
+    逐科目建立 SparseArray，不會先產生完整的 float64 寬表。
+
+    參數:
+        long_df: 財報長表 (date, type, value，可含 symbol)
+        index: 列索引欄位 (不存在的欄位會略過)
+
+    返回:
+        DataFrame: 欄位為 Sparse[float64, nan] 的寬表
+    """
+    keys = [column for column in index if column in long_df.columns]
+    row_codes, rows = pd.MultiIndex.from_frame(long_df[keys]).factorize()
+    type_codes, types = pd.factorize(long_df['type'], sort=True)
+    values = long_df['value'].to_numpy(dtype=np.float64)
+
+    # 依科目排序一次，之後每個科目只是一段連續的位置
+    order = np.argsort(type_codes, kind='stable')
+    bounds = np.searchsorted(type_codes[order], np.arange(len(types) + 1))
+    columns = {}
+    for code, name in enumerate(types):
+        selected = order[bounds[code]:bounds[code + 1]]
+        dense = np.full(len(rows), np.nan)
+        dense[row_codes[selected]] = values[selected]
+        columns[name] = pd.arrays.SparseArray(dense)
+    return pd.DataFrame(columns, index=rows)
+
+
+def compact_indicators(df, exclude=('date',)):
+    """
+    將指標長表的 float64 欄位轉為 float32，字串代碼轉為 categorical
+
+    返回:
+        DataFrame: 精簡型別的副本
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column not in exclude and df[column].dtype == np.float64:
+            df[column] = df[column].astype(np.float32)
+    if 'volume' in df.columns and df['volume'].dtype.kind == 'f':
+        volume = df['volume'].fillna(0).clip(lower=0)
+        df['volume'] = volume.astype(smallest_unsigned_dtype(volume.to_numpy()))
+    return _categorize(df)
+
+
+# ==================== 記憶體 ====================
+
+def frame_memory(df):
+    """
+    返回:
+        int: DataFrame 佔用的位元組數 (含字串物件)
+    """
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(frames):
+    """
+    比較轉換前後的記憶體用量
+
+    參數:
+        frames: dict，名稱 -> (轉換前 DataFrame, 轉換後 DataFrame)
+
+    返回:
+        DataFrame: 項目、筆數、轉換前 / 後 (MB) 與節省比例
+    """
+    rows = []
+    for name, (before, after) in frames.items():
+        before_bytes = frame_memory(before)
+        after_bytes = frame_memory(after)
+        rows.append({
+            '項目': name,
+            '轉換前筆數': len(before),
+            '轉換後筆數': len(after),
+            '轉換前 (MB)': round(before_bytes / 1024 ** 2, 2),
+            '轉換後 (MB)': round(after_bytes / 1024 ** 2, 2),
+            '節省': f"{1 - after_bytes / before_bytes:.0%}" if before_bytes else "-",
+        })
+    return pd.DataFrame(rows)
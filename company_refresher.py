@@ -0,0 +1,371 @@
+"""
+上市櫃公司清單更新
+以條件式 GET (ETag / Last-Modified) 下載公開資訊觀測站的上市、上櫃公司 CSV，
+來源未變更時不下載也不改寫任何檔案；有變更時與現有清單比對新上市、下市、更名與轉市場，
+再以暫存檔 + os.replace 原子性地寫入三個 CSV 與 Parquet (供快速載入)。
+公開資訊觀測站的清單不含 ETF，ETF 清單 (tw_etf.csv) 以 --etf 由 FinMind 股票基本資料更新
+
+來源可指定本地檔案路徑 (--twse / --tpex) 離線測試
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import stat
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+import http_client
+import market_warehouse
+import price_cache
+
+# ==================== 設定 ====================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TWSE_CSV = "https://mopsfin.twse.com.tw/opendata/t187ap03_L.csv"
+TPEX_CSV = "https://mopsfin.twse.com.tw/opendata/t187ap03_O.csv"
+
+# 來源名稱 -> (市場標籤, 輸出檔名)
+MARKETS = {
+    'twse': ("上市(TWSE)", "twse_listed.csv"),
+    'tpex': ("上櫃(TPEx)", "tpex_otc.csv"),
+}
+
+COMPANY_LIST_PATH = os.path.join(BASE_DIR, "tw_all_listed_otc.csv")
+COMPANY_PARQUET_PATH = os.path.join(price_cache.CACHE_DIR, "companies.parquet")
+
+# 各來源的 ETag / Last-Modified / 內容雜湊
+STATE_PATH = os.path.join(price_cache.CACHE_DIR, "company_sources.json")
+
+COMPANY_COLUMNS = ['公司代號', '公司名稱', '市場']
+
+# ETF / 受益憑證清單 (00 開頭的代碼，例如 0050、00878、00632R)
+ETF_LIST_PATH = os.path.join(BASE_DIR, "tw_etf.csv")
+ETF_DATASET = "TaiwanStockInfo"
+ETF_MARKET = "ETF"
+ETF_CODE_PATTERN = re.compile(r"^00\d{2,4}[A-Z]?$")
+
+# 來源解析後的家數低於現有清單此比例時視為錯誤頁或下載不完整，拒絕寫入
+MIN_ROW_RATIO = 0.5
+
+
+# ==================== 狀態 ====================
+
+def load_state(path=STATE_PATH):
+    """
+    返回:
+        dict: 來源名稱 -> 上次下載的 etag, last_modified, sha256, file (本地檔的 mtime:size)
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _file_mode(path):
+    """既有檔案沿用原本的權限，新檔案使用一般 open() 建立時的權限 (0o666 扣除 umask)"""
+    if os.path.exists(path):
+        return stat.S_IMODE(os.stat(path).st_mode)
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _write_atomic(path, write):
+    """以同目錄暫存檔寫入後 os.replace，讀取端不會看到寫到一半的檔案"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp 建立的暫存檔權限為 0600，os.replace 會保留
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def save_state(state, path=STATE_PATH):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+
+    _write_atomic(path, write)
+
+
+# ==================== 下載 ====================
+
+def _is_local(source):
+    return not source.startswith(('http://', 'https://'))
+
+
+def fetch_source(name, source, state):
+    """
+    取得單一來源的 CSV 內容 (未變更時返回 None)
+
+    網址以 If-None-Match / If-Modified-Since 發出條件式請求，伺服器回應 304 時不下載；
+    伺服器不支援時比對內容雜湊。本地檔案以修改時間與大小判斷。
+
+    參數:
+        name: 來源名稱 (twse / tpex)
+        source: 網址或本地檔案路徑
+        state: 此來源上次的狀態 (dict，首次為空)
+
+    返回:
+        tuple: (CSV 位元組或 None, 新狀態)
+    """
+    if _is_local(source):
+        info = os.stat(source)
+        file_key = f"{info.st_mtime_ns}:{info.st_size}"
+        if state.get('file') == file_key:
+            return None, state
+        with open(source, 'rb') as f:
+            content = f.read()
+        new_state = {'file': file_key}
+    else:
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        response = http_client.http_get(source, timeout=60, endpoint=f'mops/{name}', headers=headers)
+        if response.status_code == 304:
+            return None, state
+        response.raise_for_status()
+        content = response.content
+        new_state = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+
+    new_state['sha256'] = hashlib.sha256(content).hexdigest()
+    if state.get('sha256') == new_state['sha256']:
+        return None, new_state
+    return content, new_state
+
+
+def parse_companies(content, market):
+    """
+    返回:
+        DataFrame: 公司代號, 公司名稱, 市場 (依代碼數值排序)
+
+    來源不是公司清單 CSV (例如 HTML 錯誤頁) 時引發 ValueError
+    """
+    df = pd.read_csv(io.BytesIO(content), dtype=str, encoding='utf-8-sig')
+    if not {'公司代號', '公司名稱'}.issubset(df.columns):
+        raise ValueError(f"{market} 來源缺少 公司代號 / 公司名稱 欄位")
+    df = df[['公司代號', '公司名稱']].apply(lambda column: column.str.strip())
+    df = df.dropna().drop_duplicates('公司代號').assign(市場=market)
+    return sort_companies(df)
+
+
+def sort_companies(df):
+    """依代碼數值排序 (4 位數代碼在 6 位數之前，與原本以整數排序的清單相同)"""
+    return df.sort_values('公司代號', key=lambda codes: codes.str.zfill(8), kind='stable').reset_index(drop=True)
+
+
+# ==================== 比對 ====================
+
+def read_company_list(path=COMPANY_LIST_PATH, parquet_path=COMPANY_PARQUET_PATH):
+    """
+    讀取公司清單 (Parquet 不比 CSV 舊時讀取 Parquet)
+
+    返回:
+        DataFrame: 公司代號, 公司名稱, 市場；檔案不存在時為空表
+    """
+    if os.path.exists(parquet_path) and (
+            not os.path.exists(path) or os.path.getmtime(parquet_path) >= os.path.getmtime(path)):
+        return pd.read_parquet(parquet_path).astype({'市場': str})
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COMPANY_COLUMNS, dtype=str)
+    return pd.read_csv(path, dtype=str, encoding='utf-8-sig')
+
+
+def diff_companies(old, new):
+    """
+    比較新舊公司清單
+
+    返回:
+        dict: added (新上市櫃)、removed (下市櫃)、renamed (代碼相同、名稱不同)、
+              moved (轉換市場，例如上櫃轉上市)，各為 DataFrame
+    """
+    merged = old.merge(new, on='公司代號', how='outer', suffixes=('_舊', '_新'), indicator=True)
+    both = merged['_merge'] == 'both'
+    return {
+        'added': merged.loc[merged['_merge'] == 'right_only', ['公司代號', '公司名稱_新', '市場_新']],
+        'removed': merged.loc[merged['_merge'] == 'left_only', ['公司代號', '公司名稱_舊', '市場_舊']],
+        'renamed': merged.loc[both & (merged['公司名稱_舊'] != merged['公司名稱_新']),
+                              ['公司代號', '公司名稱_舊', '公司名稱_新']],
+        'moved': merged.loc[both & (merged['市場_舊'] != merged['市場_新']), ['公司代號', '市場_舊', '市場_新']],
+    }
+
+
+def read_etf_list(path=ETF_LIST_PATH):
+    """
+    返回:
+        DataFrame: 公司代號, 公司名稱, 市場 (ETF)；檔案不存在時為空表
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COMPANY_COLUMNS, dtype=str)
+    return pd.read_csv(path, dtype=str, encoding='utf-8-sig')
+
+
+# ==================== 寫入 ====================
+
+def write_outputs(companies, output_dir=BASE_DIR, list_path=COMPANY_LIST_PATH,
+                  parquet_path=COMPANY_PARQUET_PATH):
+    """原子性地寫入各市場 CSV、合併 CSV 與 Parquet"""
+    for market, filename in MARKETS.values():
+        rows = companies.loc[companies['市場'] == market, ['公司代號', '公司名稱']]
+        _write_atomic(os.path.join(output_dir, filename),
+                      lambda tmp_path: rows.to_csv(tmp_path, index=False, encoding='utf-8-sig'))
+    _write_atomic(list_path, lambda tmp_path: companies.to_csv(tmp_path, index=False, encoding='utf-8-sig'))
+
+    # Parquet 最後寫入，修改時間不早於 CSV
+    compact = companies.astype({'公司代號': 'string', '公司名稱': 'string', '市場': 'category'})
+    _write_atomic(parquet_path, lambda tmp_path: compact.to_parquet(tmp_path, index=False))
+
+
+def refresh(sources=None, force=False, output_dir=BASE_DIR, list_path=COMPANY_LIST_PATH,
+            parquet_path=COMPANY_PARQUET_PATH, state_path=STATE_PATH):
+    """
+    更新公司清單
+
+    參數:
+        sources: dict，來源名稱 -> 網址或本地檔案路徑 (預設為 MOPS 網址)
+        force: 忽略上次的 ETag / Last-Modified 與內容雜湊，重新下載並比對
+        output_dir: 各市場 CSV 的目錄
+        list_path: 合併清單 CSV 路徑
+        parquet_path: Parquet 路徑
+        state_path: 來源狀態 JSON 路徑
+
+    返回:
+        dict: updated (有變更的來源)、counts (各市場家數)、written (是否改寫檔案)
+              與 diff_companies 的結果
+
+    來源解析出的家數低於現有清單的 MIN_ROW_RATIO 時引發 ValueError，不改寫任何檔案
+    """
+    sources = sources or {'twse': TWSE_CSV, 'tpex': TPEX_CSV}
+    current = read_company_list(list_path, parquet_path)
+
+    # 清單檔案不存在時不能沿用未變更的來源
+    state = {} if force or current.empty else load_state(state_path)
+
+    frames = []
+    updated = []
+    new_state = dict(state)
+    for name, source in sources.items():
+        market = MARKETS[name][0]
+        content, new_state[name] = fetch_source(name, source, state.get(name, {}))
+        previous = current[current['市場'] == market]
+        if content is None:
+            frames.append(previous)
+            continue
+
+        parsed = parse_companies(content, market)
+        if len(parsed) < len(previous) * MIN_ROW_RATIO:
+            # 不寫入也不保存狀態，下次仍會重新下載
+            raise ValueError(f"{market} 來源只解析出 {len(parsed)} 家 (現有 {len(previous)} 家)，"
+                             "可能是錯誤頁或下載不完整")
+        frames.append(parsed)
+        updated.append(name)
+
+    companies = pd.concat(frames, ignore_index=True)[COMPANY_COLUMNS]
+    diff = diff_companies(current, companies)
+    changed = current.empty or any(not frame.empty for frame in diff.values())
+
+    written = changed or not os.path.exists(parquet_path)
+    if written:
+        write_outputs(companies, output_dir, list_path, parquet_path)
+
+    # 狀態在清單寫入成功後才保存，寫入失敗時下次仍會重新下載
+    new_state['checked_at'] = datetime.now().isoformat(timespec='seconds')
+    save_state(new_state, state_path)
+
+    counts = {name: int((companies['市場'] == MARKETS[name][0]).sum()) for name in MARKETS}
+    return {'updated': updated, 'counts': counts, 'written': written, **diff}
+
+
+def refresh_etfs(token="", path=ETF_LIST_PATH):
+    """
+    由 FinMind 股票基本資料 (TaiwanStockInfo) 更新 ETF 清單
+
+    參數:
+        token: FinMind API Token
+        path: ETF 清單 CSV 路徑
+
+    返回:
+        dict: count (ETF 檔數)、written (是否改寫檔案) 與 diff_companies 的結果
+
+    回應缺少欄位或解析出的檔數低於現有清單的 MIN_ROW_RATIO 時引發 ValueError，不改寫檔案
+    """
+    response = http_client.finmind_request(ETF_DATASET, token=token)
+    response.raise_for_status()
+    df = pd.DataFrame(response.json().get('data') or [])
+    if not {'stock_id', 'stock_name'}.issubset(df.columns):
+        raise ValueError(f"{ETF_DATASET} 回應缺少 stock_id / stock_name 欄位")
+
+    df = df[['stock_id', 'stock_name']].astype(str).apply(lambda column: column.str.strip())
+    df = df[df['stock_id'].str.match(ETF_CODE_PATTERN)].drop_duplicates('stock_id', keep='last')
+    etfs = sort_companies(df.rename(columns={'stock_id': '公司代號', 'stock_name': '公司名稱'})
+                          .assign(市場=ETF_MARKET))
+
+    current = read_etf_list(path)
+    if len(etfs) < len(current) * MIN_ROW_RATIO:
+        raise ValueError(f"ETF 來源只解析出 {len(etfs)} 檔 (現有 {len(current)} 檔)，可能是錯誤回應")
+
+    diff = diff_companies(current, etfs)
+    written = current.empty or any(not frame.empty for frame in diff.values())
+    if written:
+        _write_atomic(path, lambda tmp_path: etfs.to_csv(tmp_path, index=False, encoding='utf-8-sig'))
+    return {'count': len(etfs), 'written': written, **diff}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以條件式下載更新上市櫃公司清單並列出變更")
+    parser.add_argument('--twse', default=TWSE_CSV, help="上市公司 CSV 網址或本地檔案")
+    parser.add_argument('--tpex', default=TPEX_CSV, help="上櫃公司 CSV 網址或本地檔案")
+    parser.add_argument('--force', action='store_true', help="忽略 ETag / Last-Modified 重新下載")
+    parser.add_argument('--import-warehouse', action='store_true', help="有變更時同步更新本地倉儲的公司資料表")
+    parser.add_argument('--etf', action='store_true', help="同時由 FinMind 更新 ETF 清單")
+    parser.add_argument('--token', default=os.environ.get('FINMIND_TOKEN', ''), help="FinMind API Token")
+    args = parser.parse_args()
+
+    try:
+        summary = refresh({'twse': args.twse, 'tpex': args.tpex}, force=args.force)
+    except ValueError as e:
+        parser.exit(1, f"未更新公司清單: {e}\n")
+    print(f"TWSE 上市家數 = {summary['counts']['twse']}，TPEx 上櫃家數 = {summary['counts']['tpex']}")
+    if not summary['updated']:
+        print("來源未變更")
+    labels = {'added': "新上市櫃", 'removed': "下市櫃", 'renamed': "更名", 'moved': "轉換市場"}
+    for key, label in labels.items():
+        if not summary[key].empty:
+            print(f"\n{label} ({len(summary[key])}):")
+            print(summary[key].to_string(index=False, header=False))
+
+    if summary['written'] and args.import_warehouse:
+        print(f"\n倉儲公司資料表: {market_warehouse.import_companies(COMPANY_LIST_PATH)} 家")
+
+    if args.etf:
+        try:
+            etf_summary = refresh_etfs(args.token)
+        except ValueError as e:
+            parser.exit(1, f"未更新 ETF 清單: {e}\n")
+        print(f"\nETF 檔數 = {etf_summary['count']}" + ("" if etf_summary['written'] else " (未變更)"))
+        for key, label in (('added', "新上市"), ('removed', "下市"), ('renamed', "更名")):
+            if not etf_summary[key].empty:
+                print(f"{label} ({len(etf_summary[key])}):")
+                print(etf_summary[key].to_string(index=False, header=False))
+
+
+if __name__ == "__main__":
+    main()
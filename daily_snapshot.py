@@ -0,0 +1,290 @@
+"""
+每日全市場快照匯入
+每個交易日只下載一次全市場日線 (FinMind 依日期查詢，或證交所 / 櫃買中心 OpenAPI)，
+再分送到各股票的價格快取，將每日 O(股票數) 次請求降為 O(1)
+
+可用 --fixture 指定本地 CSV / JSON 檔離線測試
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import requests
+
+import http_client
+import price_cache
+
+# ==================== 設定 ====================
+
+TWSE_DAILY_URL = "https://openapi.twse.com.tw/v1/exchangeReport/STOCK_DAY_ALL"
+TPEX_DAILY_URL = "https://www.tpex.org.tw/openapi/v1/tpex_mainboard_daily_close_quotes"
+
+SNAPSHOT_COLUMNS = ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume']
+
+# 交易日曆往前查詢的範圍 (涵蓋春節等長假)
+CALENDAR_LOOKBACK = pd.Timedelta(days=30)
+
+# 交易所 OpenAPI 欄位 -> 快取欄位
+TWSE_FIELDS = {
+    'Code': 'symbol', 'OpeningPrice': 'open', 'HighestPrice': 'high',
+    'LowestPrice': 'low', 'ClosingPrice': 'close', 'TradeVolume': 'volume',
+}
+TPEX_FIELDS = {
+    'SecuritiesCompanyCode': 'symbol', 'Open': 'open', 'High': 'high',
+    'Low': 'low', 'Close': 'close', 'TradingShares': 'volume',
+}
+
+
+# ==================== 數據正規化 ====================
+
+def _to_number(series):
+    """將含千分位逗號或 '--' 的文字轉為數值"""
+    return pd.to_numeric(series.astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+
+def _parse_roc_date(text):
+    """民國日期 (例如 1141017) 轉為 Timestamp"""
+    text = str(text).strip()
+    if not text.isdigit():
+        return pd.NaT
+    return pd.Timestamp(year=int(text[:-4]) + 1911, month=int(text[-4:-2]), day=int(text[-2:]))
+
+
+def normalize_finmind_rows(rows):
+    """
+    將 FinMind TaiwanStockPrice 格式轉為快照格式
+
+    返回:
+        DataFrame: symbol, date, open, high, low, close, volume
+    """
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+
+    df = df.rename(columns={
+        'stock_id': 'symbol', 'max': 'high', 'min': 'low', 'Trading_Volume': 'volume'
+    })
+    return _finalize(df)
+
+
+def normalize_exchange_rows(rows, fields):
+    """
+    將證交所 / 櫃買中心 OpenAPI 格式轉為快照格式
+
+    缺少或無法解析 Date 欄位的資料列直接捨棄，不以請求日期補上
+    (請求日期可能是休市日，補上會產生不存在的 K 棒)。
+
+    參數:
+        rows: OpenAPI 回傳的 list
+        fields: 欄位對照表 (TWSE_FIELDS 或 TPEX_FIELDS)
+
+    返回:
+        DataFrame: symbol, date, open, high, low, close, volume
+    """
+    df = pd.DataFrame(rows)
+    if df.empty or 'Date' not in df.columns:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+
+    df['date'] = df['Date'].map(_parse_roc_date)
+    df = df.rename(columns=fields)
+    return _finalize(df)
+
+
+def _finalize(df):
+    df = df[SNAPSHOT_COLUMNS].copy()
+    df['symbol'] = df['symbol'].astype(str).str.strip()
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        df[col] = _to_number(df[col])
+
+    # 沒有日期或沒有成交 (收盤價為 '--') 的資料列不寫入
+    df = df.dropna(subset=['date', 'open', 'high', 'low', 'close'])
+    df['volume'] = df['volume'].fillna(0).astype(np.int64)
+    return df.reset_index(drop=True)
+
+
+# ==================== 數據來源 ====================
+
+def fetch_finmind_snapshot(date, token=""):
+    """以 FinMind 依日期查詢全市場日線 (不帶 data_id)"""
+    day = pd.Timestamp(date).strftime('%Y-%m-%d')
+    response = http_client.finmind_request(
+        "TaiwanStockPrice", start_date=day, end_date=day, token=token, timeout=60
+    )
+    response.raise_for_status()
+    return normalize_finmind_rows(response.json().get('data', []))
+
+
+def fetch_exchange_snapshot():
+    """以證交所 (上市) 與櫃買中心 (上櫃) OpenAPI 取得最新交易日的全市場日線"""
+    twse = http_client.http_get(TWSE_DAILY_URL, timeout=60, endpoint='twse/STOCK_DAY_ALL')
+    twse.raise_for_status()
+    tpex = http_client.http_get(TPEX_DAILY_URL, timeout=60, endpoint='tpex/daily_close_quotes')
+    tpex.raise_for_status()
+    return pd.concat([
+        normalize_exchange_rows(twse.json(), TWSE_FIELDS),
+        normalize_exchange_rows(tpex.json(), TPEX_FIELDS),
+    ], ignore_index=True)
+
+
+def fetch_trading_dates(date, token=""):
+    """
+    以 FinMind 交易日曆 (TaiwanStockTradingDate) 取得指定日期前後的交易日
+
+    返回:
+        DatetimeIndex: 交易日；查詢失敗時返回 None (改用平日近似)
+    """
+    day = pd.Timestamp(date)
+    try:
+        response = http_client.finmind_request(
+            "TaiwanStockTradingDate", start_date=(day - CALENDAR_LOOKBACK).strftime('%Y-%m-%d'),
+            end_date=day.strftime('%Y-%m-%d'), token=token
+        )
+        response.raise_for_status()
+        rows = response.json().get('data', [])
+    except (http_client.FinMindError, requests.RequestException, ValueError):
+        return None
+    if not rows:
+        return None
+    return pd.DatetimeIndex(pd.to_datetime([row['date'] for row in rows]))
+
+
+def load_fixture(path):
+    """
+    讀取本地快照檔 (離線測試用)
+
+    支援 FinMind 格式 (stock_id, max, min, Trading_Volume) 或快照格式 (symbol, high, low, volume)
+    的 CSV 或 JSON ({"data": [...]} 或 list)。
+    """
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        rows = payload.get('data', []) if isinstance(payload, dict) else payload
+    else:
+        rows = pd.read_csv(path, dtype={'stock_id': str, 'symbol': str}).to_dict('records')
+    return normalize_finmind_rows(rows)
+
+
+# ==================== 匯入 ====================
+
+def previous_trading_date(date, trading_dates=None):
+    """
+    取得指定日期的前一交易日
+
+    有交易日曆時以日曆為準；沒有時以「前一個平日」近似 (不含國定假日，
+    連假後的第一個交易日會把股票判為有缺口而略過，不會寫入錯誤的資料)。
+
+    參數:
+        date: 交易日
+        trading_dates: 交易日清單 (DatetimeIndex)，None 表示使用平日近似
+
+    返回:
+        Timestamp: 前一交易日
+    """
+    date = pd.Timestamp(date)
+    if trading_dates is not None:
+        earlier = trading_dates[trading_dates < date]
+        if len(earlier):
+            return earlier.max()
+    return date - pd.offsets.BDay(1)
+
+
+def ingest_snapshot(snapshot, db_path=price_cache.DEFAULT_DB_PATH, trading_dates=None):
+    """
+    將全市場快照分送到各股票的價格快取
+
+    只寫入「最後快取日期為前一交易日 (或已是當天)」的股票；尚未快取或中間有缺口的股票會略過，
+    留給 get_stock_data 依原本流程補齊，避免增量下載因此跳過缺口。
+    前一交易日來自交易日曆，而非價格快取本身 (快取整體落後時無法判斷缺口)。
+
+    參數:
+        snapshot: 快照 DataFrame (symbol, date, open, high, low, close, volume)
+        db_path: SQLite 檔案路徑
+        trading_dates: 交易日曆 (DatetimeIndex)，None 時以平日近似
+
+    返回:
+        dict: {'written': 寫入筆數, 'uncached': 未快取的代碼, 'gap': 有缺口的代碼}
+    """
+    summary = {'written': 0, 'uncached': [], 'gap': []}
+    if snapshot.empty:
+        return summary
+
+    last_dates = price_cache.get_last_cached_dates(db_path)
+    for date, day_rows in snapshot.sort_values('date').groupby('date'):
+        previous_date = previous_trading_date(date, trading_dates)
+        cached_through = day_rows['symbol'].map(last_dates)
+
+        uncached = cached_through.isna()
+        contiguous = cached_through >= previous_date
+        summary['uncached'] += day_rows.loc[uncached, 'symbol'].tolist()
+        summary['gap'] += day_rows.loc[~uncached & ~contiguous, 'symbol'].tolist()
+
+        written = day_rows[contiguous]
+        summary['written'] += price_cache.save_market_snapshot(written, db_path)
+        last_dates.update(dict.fromkeys(written['symbol'], date))
+
+    return summary
+
+
+def run(date=None, source='finmind', fixture=None, token="", force=False,
+        db_path=price_cache.DEFAULT_DB_PATH):
+    """
+    下載並匯入某交易日的全市場快照
+
+    參數:
+        date: 交易日，預設為今天
+        source: 'finmind' 或 'exchange' (證交所 / 櫃買中心 OpenAPI)
+        fixture: 本地快照檔路徑，指定時不連網 (前一交易日以平日近似)
+        token: FinMind API Token
+        force: 已匯入過的日期仍重新匯入
+        db_path: SQLite 檔案路徑
+
+    返回:
+        dict: ingest_snapshot 的摘要，已匯入過時為 None
+    """
+    date = pd.Timestamp(date or datetime.now().date())
+    if not force and fixture is None and price_cache.is_snapshot_ingested(date, db_path):
+        return None
+
+    if fixture is not None:
+        snapshot, source = load_fixture(fixture), f"fixture:{os.path.basename(fixture)}"
+        trading_dates = None
+    else:
+        if source == 'exchange':
+            snapshot = fetch_exchange_snapshot()
+        else:
+            snapshot = fetch_finmind_snapshot(date, token)
+        trading_dates = fetch_trading_dates(date, token)
+
+    summary = ingest_snapshot(snapshot, db_path, trading_dates)
+    for day in snapshot['date'].unique():
+        price_cache.log_snapshot(day, source, summary['written'], db_path)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匯入每日全市場日線快照到價格快取")
+    parser.add_argument('--date', default=None, help="交易日 (YYYY-MM-DD)，預設為今天")
+    parser.add_argument('--source', choices=['finmind', 'exchange'], default='finmind',
+                        help="數據來源: FinMind 依日期查詢或證交所/櫃買中心 OpenAPI")
+    parser.add_argument('--fixture', default=None, help="本地 CSV/JSON 快照檔 (離線模式)")
+    parser.add_argument('--token', default=os.environ.get('FINMIND_TOKEN', ''), help="FinMind API Token")
+    parser.add_argument('--force', action='store_true', help="已匯入過的日期仍重新匯入")
+    parser.add_argument('--db', default=price_cache.DEFAULT_DB_PATH, help="SQLite 快取路徑")
+    args = parser.parse_args()
+
+    summary = run(args.date, args.source, args.fixture, args.token, args.force, args.db)
+    if summary is None:
+        print("此交易日的快照已匯入過 (使用 --force 重新匯入)")
+        return
+    print(f"寫入 {summary['written']} 筆；略過未快取 {len(summary['uncached'])} 檔、"
+          f"歷史有缺口 {len(summary['gap'])} 檔")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,16 @@ import requests
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from openai import OpenAI
 from datetime import datetime, timedelta
 import json
 import numpy as np
 import base64
 from io import BytesIO
 
+import ai_client
+import chart_helpers
+import http_client
+
 # 設置頁面配置
 st.set_page_config(
     page_title="AI 股票趨勢分析系統",
@@ -215,7 +218,7 @@ def get_stock_data(symbol, api_key, start_date, end_date):
             'to': end_date.strftime('%Y-%m-%d')
         }
         
-        response = requests.get(url, params=params)
+        response = http_client.http_get(url, params=params, endpoint='fmp/historical-price-eod')
         response.raise_for_status()
         
         data = response.json()
@@ -312,8 +315,7 @@ def create_candlestick_chart(df, symbol, color_theme="專業藍", chart_height=7
         )
     
     # 成交量柱狀圖
-    colors = [theme['bullish'] if df['close'].iloc[i] >= df['open'].iloc[i] 
-              else theme['bearish'] for i in range(len(df))]
+    colors = chart_helpers.candle_colors(df['open'], df['close'], theme['bullish'], theme['bearish'])
     
     fig.add_trace(
         go.Bar(
@@ -385,7 +387,7 @@ def create_candlestick_chart(df, symbol, color_theme="專業藍", chart_height=7
 def generate_ai_insights(symbol, stock_data, openai_api_key, start_date, end_date):
     """使用OpenAI進行技術分析"""
     try:
-        client = OpenAI(api_key=openai_api_key)
+        client = ai_client.get_client(openai_api_key)
         
         first_date = stock_data['date'].iloc[0].strftime('%Y-%m-%d')
         last_date = stock_data['date'].iloc[-1].strftime('%Y-%m-%d')
@@ -468,21 +470,24 @@ def generate_ai_insights(symbol, stock_data, openai_api_key, start_date, end_dat
 
 分析目標：{symbol}"""
         
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        stream_stats = {}
+        analysis = st.write_stream(ai_client.stream_chat_completion(
+            client,
+            [
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": user_prompt}
             ],
+            stats=stream_stats,
             max_tokens=2000,
             temperature=0.3
-        )
-        
-        return response.choices[0].message.content
+        ))
+        st.caption(ai_client.format_stream_stats(stream_stats))
+        return analysis
         
     except Exception as e:
         st.error(f"AI分析失敗：{str(e)}")
-        return "AI分析暫時無法使用，請檢查API金鑰或稍後再試。"
+        st.info("AI分析暫時無法使用，請檢查API金鑰或稍後再試。")
+        return None
 
 def fig_to_png(fig):
     """將Plotly圖表轉換為PNG格式"""
@@ -507,6 +512,36 @@ def create_download_button(data, filename, label, file_format="png"):
     
     return href
 
+@st.fragment
+def render_chart_panel(df, symbol):
+    """顯示K線圖與圖表設定（fragment：調整配色或高度只重繪圖表，不重新獲取數據）"""
+    col_theme, col_height = st.columns(2)
+    
+    with col_theme:
+        # 圖表配色選擇
+        color_theme = st.selectbox(
+            "選擇圖表配色",
+            ["專業藍", "經典黑", "清新綠", "深色模式"],
+            key="color_theme",
+            help="選擇K線圖和技術指標的配色方案"
+        )
+    
+    with col_height:
+        # 圖表高度調整
+        chart_height = st.slider(
+            "圖表高度",
+            min_value=500,
+            max_value=1000,
+            value=700,
+            step=50,
+            key="chart_height",
+            help="調整圖表顯示高度"
+        )
+    
+    chart = create_candlestick_chart(df, symbol, color_theme, chart_height)
+    st.plotly_chart(chart, use_container_width=True)
+    return chart
+
 # ========== 主程式開始 ==========
 
 # 側邊欄設置
@@ -522,23 +557,6 @@ with st.sidebar:
         help="切換淺色或深色界面主題"
     )
     
-    # 圖表配色選擇
-    color_theme = st.selectbox(
-        "選擇圖表配色",
-        ["專業藍", "經典黑", "清新綠", "深色模式"],
-        help="選擇K線圖和技術指標的配色方案"
-    )
-    
-    # 圖表高度調整
-    chart_height = st.slider(
-        "圖表高度",
-        min_value=500,
-        max_value=1000,
-        value=700,
-        step=50,
-        help="調整圖表顯示高度"
-    )
-    
     st.divider()
     
     # 股票輸入
@@ -634,6 +652,12 @@ st.markdown("""
 
 st.divider()
 
+# 保留上次分析的圖表：切換界面主題等操作造成整頁重新執行時不需重新分析
+if not analyze_button and 'chart_data' in st.session_state:
+    chart_symbol, chart_data = st.session_state.chart_data
+    st.markdown("### 📊 股價K線圖與技術指標")
+    render_chart_panel(chart_data, chart_symbol)
+
 # 主要分析邏輯
 if analyze_button:
     # 輸入驗證
@@ -662,17 +686,11 @@ if analyze_button:
                         data_with_ma = get_moving_averages(filtered_data)
                     
                     if data_with_ma is not None:
+                        st.session_state.chart_data = (symbol.upper(), data_with_ma)
+                        
                         # 顯示K線圖
                         st.markdown("### 📊 股價K線圖與技術指標")
-                        
-                        # 創建圖表
-                        chart = create_candlestick_chart(
-                            data_with_ma, 
-                            symbol.upper(), 
-                            color_theme,
-                            chart_height
-                        )
-                        st.plotly_chart(chart, use_container_width=True)
+                        chart = render_chart_panel(data_with_ma, symbol.upper())
                         
                         # 匯出功能區
                         st.markdown("### 💾 匯出選項")
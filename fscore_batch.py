@@ -0,0 +1,128 @@
+"""
+全市場 F-Score 批次計算
+下載清單中每檔股票的損益表、資產負債表與現金流量表，合併為含 stock_id 的財報面板，
+以 fundamentals 的向量化運算一次算出所有股票每一季的 Piotroski F-Score，
+寫入 fscore_store 後輸出最新一季的排名
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import fscore_store
+import fundamentals
+import price_cache
+import stock_analysis_app as app
+from market_batch import COMPANY_LIST_PATH, load_universe
+
+# ==================== 設定 ====================
+
+# 同時下載的股票數 (每檔 3 個數據集，實際請求數受 http_client 的限流控制)
+DEFAULT_WORKERS = 4
+
+# 排名時至少要有數據的條件數 (滿分 9 項)
+DEFAULT_MIN_CRITERIA = 7
+
+# 財報數據集: 面板名稱 -> 獲取函數
+STATEMENT_FETCHERS = {
+    'income': app.get_financial_statements,
+    'balance': app.get_balance_sheet,
+    'cashflow': app.get_cash_flow_statement,
+}
+
+
+# ==================== 數據載入 ====================
+
+def fetch_statements(symbol, token=""):
+    """
+    返回:
+        dict: 數據集名稱 -> 財報 DataFrame (無數據時為 None)
+    """
+    return {name: fetch(symbol, token) for name, fetch in STATEMENT_FETCHERS.items()}
+
+
+def build_statement_panel(symbols, token="", workers=DEFAULT_WORKERS):
+    """
+    下載並合併多檔股票的財報
+
+    參數:
+        symbols: 股票代碼清單
+        token: FinMind API Token
+        workers: 同時下載的股票數
+
+    返回:
+        dict: 數據集名稱 -> 含 stock_id 欄位的長表 (沒有任何數據時為 None)
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(zip(symbols, executor.map(lambda symbol: fetch_statements(symbol, token), symbols)))
+
+    panel = {}
+    for name in STATEMENT_FETCHERS:
+        frames = [
+            statements[name].assign(stock_id=symbol)
+            for symbol, statements in results.items()
+            if statements[name] is not None
+        ]
+        panel[name] = pd.concat(frames, ignore_index=True) if frames else None
+    return panel
+
+
+# ==================== 批次計算 ====================
+
+def compute_panel_fscores(panel):
+    """
+    對整個財報面板計算每一季的 F-Score (前期與去年同季比較都在各股票內進行)
+
+    返回:
+        DataFrame: stock_id, date, F_Score, F_Count, F_<條件>；沒有損益表或資產負債表時返回 None
+    """
+    if panel['income'] is None or panel['balance'] is None:
+        return None
+
+    table = fundamentals.compute_quarterly_fundamentals(panel['income'], panel['balance'], panel['cashflow'])
+    return fundamentals.fscore_history(table)
+
+
+def run_batch(symbols, token="", workers=DEFAULT_WORKERS, db_path=price_cache.DEFAULT_DB_PATH):
+    """
+    下載財報、計算全市場 F-Score 並寫入資料庫
+
+    返回:
+        DataFrame: 寫入的 F-Score 歷史 (無數據時為 None)
+    """
+    history = compute_panel_fscores(build_statement_panel(symbols, token, workers))
+    if history is not None:
+        fscore_store.save_scores(history, db_path=db_path)
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全市場批次計算 Piotroski F-Score 並寫入歷史資料庫")
+    parser.add_argument('symbols', nargs='*', help="股票代碼 (未指定時使用公司清單)")
+    parser.add_argument('--companies', default=COMPANY_LIST_PATH, help="公司清單 CSV")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="同時下載的股票數")
+    parser.add_argument('--token', default=os.environ.get('FINMIND_TOKEN', ''), help="FinMind API Token")
+    parser.add_argument('--db', default=price_cache.DEFAULT_DB_PATH, help="SQLite 資料庫路徑")
+    parser.add_argument('--top', type=int, default=20, help="顯示最新一季排名前幾名")
+    parser.add_argument('--min-criteria', type=int, default=DEFAULT_MIN_CRITERIA,
+                        help="排名時至少要有數據的條件數")
+    args = parser.parse_args()
+
+    symbols = args.symbols or load_universe(args.companies)
+    started = time.perf_counter()
+    history = run_batch(symbols, args.token, args.workers, args.db)
+    if history is None:
+        print("沒有可用的財報數據")
+        return
+
+    print(f"完成 {history['stock_id'].nunique()} 檔股票、{len(history)} 季 F-Score "
+          f"({time.perf_counter() - started:.1f} 秒) → {args.db}")
+    ranking = fscore_store.load_ranking(min_criteria=args.min_criteria, limit=args.top, db_path=args.db)
+    print(ranking[['symbol', 'date', 'F_Score', 'F_Count']].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
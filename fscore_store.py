@@ -0,0 +1,179 @@
+"""
+F-Score 歷史資料庫
+以 SQLite 儲存每檔股票每一季的 Piotroski F-Score 總分與九項條件 (以 symbol + date 為主鍵)，
+單一股票的歷史趨勢與全市場最新一季排名都只需一次查詢
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from price_cache import DEFAULT_DB_PATH
+
+# ==================== 設定 ====================
+
+# fundamentals.FSCORE_CRITERIA 條件名稱 -> 資料表欄位
+CRITERION_COLUMNS = {
+    'ROA正值': 'roa_positive',
+    'CFO正值': 'cfo_positive',
+    'ROA年增': 'roa_improved',
+    '應計項目': 'accruals',
+    '長期負債比下降': 'leverage_down',
+    '流動比率上升': 'current_ratio_up',
+    '未發行新股': 'no_dilution',
+    '毛利率改善': 'gross_margin_up',
+    '資產週轉率上升': 'asset_turnover_up',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fscore_history (
+    symbol            TEXT NOT NULL,
+    date              TEXT NOT NULL,
+    roa_positive      INTEGER,
+    cfo_positive      INTEGER,
+    roa_improved      INTEGER,
+    accruals          INTEGER,
+    leverage_down     INTEGER,
+    current_ratio_up  INTEGER,
+    no_dilution       INTEGER,
+    gross_margin_up   INTEGER,
+    asset_turnover_up INTEGER,
+    total_score       INTEGER NOT NULL,
+    criteria_count    INTEGER NOT NULL,
+    updated_at        TEXT NOT NULL,
+    PRIMARY KEY (symbol, date)
+);
+CREATE INDEX IF NOT EXISTS fscore_history_date ON fscore_history (date);
+"""
+
+
+# ==================== 內部函數 ====================
+
+def _connect(db_path):
+    """開啟資料庫連線並確保資料表存在"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _to_frame(df):
+    """將資料表欄位轉回 fundamentals.fscore_history 的欄位名稱"""
+    df = df.rename(columns={
+        'total_score': 'F_Score',
+        'criteria_count': 'F_Count',
+        **{column: f'F_{name}' for name, column in CRITERION_COLUMNS.items()},
+    })
+    df['date'] = pd.to_datetime(df['date'])
+    # 未計算的條件 (NULL) 為 NaN，整欄皆為 NULL 時也維持數值型別
+    flag_columns = [f'F_{name}' for name in CRITERION_COLUMNS]
+    df[flag_columns] = df[flag_columns].astype('float64')
+    return df
+
+
+def _select_columns():
+    return ", ".join(['symbol', 'date', 'total_score', 'criteria_count', *CRITERION_COLUMNS.values()])
+
+
+# ==================== 公開函數 ====================
+
+def save_scores(history, symbol=None, db_path=DEFAULT_DB_PATH):
+    """
+    寫入 F-Score 歷史 (同一檔股票同一季會被覆蓋)
+
+    參數:
+        history: fundamentals.fscore_history 的結果 (含 stock_id 欄位，或以 symbol 指定股票)
+        symbol: 單一股票的代碼，history 含 stock_id 時可省略
+        db_path: SQLite 檔案路徑
+
+    返回:
+        int: 寫入筆數
+    """
+    if history is None or history.empty:
+        return 0
+
+    if 'stock_id' in history.columns:
+        symbols = history['stock_id'].astype(str)
+    else:
+        symbols = [symbol] * len(history)
+    # 資料不足而未計算的條件存為 NULL
+    missing = [float('nan')] * len(history)
+    flags = [
+        history[f'F_{name}'] if f'F_{name}' in history.columns else missing
+        for name in CRITERION_COLUMNS
+    ]
+    updated_at = datetime.now().isoformat(timespec='seconds')
+    rows = [
+        (sym, date.strftime('%Y-%m-%d'),
+         *[None if value != value else int(value) for value in values],
+         int(score), int(count), updated_at)
+        for sym, date, score, count, *values in zip(
+            symbols, history['date'], history['F_Score'], history['F_Count'], *flags
+        )
+    ]
+
+    columns = ['symbol', 'date', *CRITERION_COLUMNS.values(), 'total_score', 'criteria_count', 'updated_at']
+    with closing(_connect(db_path)) as conn, conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO fscore_history ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            rows,
+        )
+    return len(rows)
+
+
+def load_history(symbol, db_path=DEFAULT_DB_PATH):
+    """
+    讀取單一股票的 F-Score 歷史
+
+    返回:
+        DataFrame: date, F_Score, F_Count, F_<條件>，依日期由新到舊；無數據時返回 None
+    """
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(
+            f"SELECT {_select_columns()} FROM fscore_history WHERE symbol = ? ORDER BY date DESC",
+            conn,
+            params=(symbol,),
+        )
+
+    if df.empty:
+        return None
+    return _to_frame(df).drop(columns='symbol')
+
+
+def load_ranking(as_of=None, min_criteria=0, limit=None, db_path=DEFAULT_DB_PATH):
+    """
+    全市場 F-Score 排名 (每檔股票取 as_of 以前最新的一季)
+
+    參數:
+        as_of: 截止日期 (YYYY-MM-DD)，None 表示全部
+        min_criteria: 至少有數據的條件數，避免資料不足的股票排在前面
+        limit: 最多返回筆數，None 表示全部
+        db_path: SQLite 檔案路徑
+
+    返回:
+        DataFrame: symbol, date, F_Score, F_Count, F_<條件>，依總分由高到低排序
+    """
+    as_of = pd.Timestamp(as_of or datetime.now()).strftime('%Y-%m-%d')
+    query = (
+        f"SELECT {_select_columns()} FROM fscore_history AS f "
+        "JOIN (SELECT symbol AS latest_symbol, MAX(date) AS latest_date FROM fscore_history "
+        "      WHERE date <= ? GROUP BY symbol) AS latest "
+        "ON f.symbol = latest.latest_symbol AND f.date = latest.latest_date "
+        "WHERE criteria_count >= ? "
+        "ORDER BY total_score DESC, criteria_count DESC, symbol"
+    )
+    params = [as_of, min_criteria]
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    return _to_frame(df)
+
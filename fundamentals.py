@@ -0,0 +1,289 @@
+"""
+基本面指標引擎
+將損益表、資產負債表與現金流量表依季度對齊，以欄位運算一次算出每一季的
+ROE、ROA、毛利率、營益率、淨利率、流動比率、負債比率、EPS 成長率與
+Piotroski F-Score 九項條件，取代逐列 iterrows / iloc 的計算；
+頁面上「最新一季」的數值只是此表的切片。
+含 stock_id 欄位的多檔股票財報面板也可直接計算 (前期比較在各股票內進行)
+"""
+
+import numpy as np
+import pandas as pd
+
+# ==================== 指標規格 ====================
+
+# FinMind 各數據集中意義相同的科目名稱 -> 統一欄位名稱 (只在統一名稱不存在時改名)
+COLUMN_ALIASES = {
+    'Assets': 'TotalAssets',
+    'CashFlowsFromOperatingActivities': 'CFO',
+    'NetCashInflowFromOperatingActivities': 'CFO',
+    'OrdinaryShare': 'ShareCapital',
+    'CapitalStock': 'ShareCapital',
+}
+
+# 現金流量表為年初至今的累計數，需換算為單季才能與單季損益比較
+CASHFLOW_IS_YTD = True
+CASHFLOW_COLUMNS = ['CFO']
+
+# 比率欄位 -> (分子, 分母, 倍數)；分母 <= 0 時為 0 (與原本逐列計算的慣例一致)，
+# 分子或分母缺值 (例如該季沒有資產負債表) 時為 NaN，表示沒有數據
+RATIO_SPECS = {
+    'ROE': ('IncomeAfterTaxes', 'Equity', 100),
+    'ROA': ('IncomeAfterTaxes', 'TotalAssets', 100),
+    '毛利率': ('GrossProfit', 'Revenue', 100),
+    '營益率': ('OperatingIncome', 'Revenue', 100),
+    '淨利率': ('IncomeAfterTaxes', 'Revenue', 100),
+    '流動比率': ('CurrentAssets', 'CurrentLiabilities', 1),
+    '負債比率': ('Liabilities', 'TotalAssets', 100),
+    '長期負債比率': ('NoncurrentLiabilities', 'TotalAssets', 100),
+    '資產週轉率': ('Revenue', 'TotalAssets', 1),
+}
+
+# 財務比率摘要 (calculate_financial_ratios) 輸出的欄位
+LATEST_RATIO_KEYS = ['ROE', 'ROA', '毛利率', '淨利率', '流動比率', '負債比率', 'EPS']
+
+# Piotroski F-Score 九項條件 -> (需要的欄位, 是否與去年同季比較, 判斷函數)
+# 判斷函數接收本期與去年同季的欄位；季報有季節性，變化項目一律與去年同季比較
+FSCORE_CRITERIA = {
+    # 獲利能力
+    'ROA正值': (['ROA'], False, lambda cur, prev: cur['ROA'] > 0),
+    'CFO正值': (['CFO'], False, lambda cur, prev: cur['CFO'] > 0),
+    'ROA年增': (['ROA'], True, lambda cur, prev: cur['ROA'] > prev['ROA']),
+    '應計項目': (['CFO', 'IncomeAfterTaxes'], False, lambda cur, prev: cur['CFO'] > cur['IncomeAfterTaxes']),
+    # 財務槓桿與流動性
+    '長期負債比下降': (['長期負債比率'], True, lambda cur, prev: cur['長期負債比率'] < prev['長期負債比率']),
+    '流動比率上升': (['流動比率'], True, lambda cur, prev: cur['流動比率'] > prev['流動比率']),
+    '未發行新股': (['ShareCapital'], True, lambda cur, prev: cur['ShareCapital'] <= prev['ShareCapital']),
+    # 營運效率
+    '毛利率改善': (['毛利率'], True, lambda cur, prev: cur['毛利率'] > prev['毛利率']),
+    '資產週轉率上升': (['資產週轉率'], True, lambda cur, prev: cur['資產週轉率'] > prev['資產週轉率']),
+}
+
+FSCORE_MAX = len(FSCORE_CRITERIA)
+
+
+# ==================== 對齊與運算 ====================
+
+def _keys(df):
+    return ['stock_id', 'date'] if 'stock_id' in df.columns else ['date']
+
+
+def _apply_aliases(df):
+    renames = {}
+    for source, target in COLUMN_ALIASES.items():
+        if source in df.columns and target not in df.columns and target not in renames.values():
+            renames[source] = target
+    return df.rename(columns=renames)
+
+
+def quarterly_from_ytd(df, columns):
+    """
+    將年初至今的累計數換算為單季數值
+
+    第一季維持原值；其他季減去同年前一季的累計數，前一季缺漏時為 NaN。
+
+    參數:
+        df: 含 date (與 stock_id) 的 DataFrame
+        columns: 要換算的欄位
+
+    返回:
+        DataFrame: 換算後的副本
+    """
+    keys = _keys(df)
+    df = df.sort_values(keys).reset_index(drop=True)
+    quarter = df['date'].dt.quarter
+    previous = df[keys + columns].shift(1)
+    consecutive = (
+        (previous['date'].dt.year == df['date'].dt.year)
+        & (previous['date'].dt.quarter == quarter - 1)
+    )
+    if 'stock_id' in keys:
+        consecutive &= previous['stock_id'] == df['stock_id']
+
+    for column in columns:
+        values = df[column].astype(np.float64)
+        df[column] = values.where(quarter == 1, (values - previous[column]).where(consecutive))
+    return df
+
+
+def merge_statements(income_df, balance_df=None, cashflow_df=None):
+    """
+    依日期 (與 stock_id) 對齊損益表、資產負債表與現金流量表
+
+    參數:
+        income_df: 損益表 (每季一列，欄位為會計科目)
+        balance_df: 資產負債表，None 表示不使用
+        cashflow_df: 現金流量表，None 表示不使用
+
+    返回:
+        DataFrame: 以損益表的季度為準合併，依日期由新到舊排序
+    """
+    merged = _apply_aliases(income_df)
+    keys = _keys(merged)
+
+    if cashflow_df is not None and not cashflow_df.empty:
+        cashflow = _apply_aliases(cashflow_df)
+        cashflow_columns = [col for col in CASHFLOW_COLUMNS if col in cashflow.columns]
+        cashflow = cashflow[keys + cashflow_columns]
+        if CASHFLOW_IS_YTD and cashflow_columns:
+            cashflow = quarterly_from_ytd(cashflow, cashflow_columns)
+        extra_sources = [cashflow]
+    else:
+        extra_sources = []
+
+    if balance_df is not None and not balance_df.empty:
+        extra_sources.insert(0, _apply_aliases(balance_df))
+
+    for source in extra_sources:
+        overlap = [col for col in source.columns if col in merged.columns and col not in keys]
+        merged = merged.merge(source.drop(columns=overlap), on=keys, how='left')
+
+    return merged.sort_values(keys, ascending=[True] * (len(keys) - 1) + [False]).reset_index(drop=True)
+
+
+def _previous(table, columns, periods=1):
+    """前 periods 季的數值 (表格由新到舊排序，多檔股票時不跨股票取值)"""
+    if 'stock_id' in table.columns:
+        return table.groupby('stock_id', sort=False)[columns].shift(-periods)
+    return table[columns].shift(-periods)
+
+
+def _year_ago(table, columns):
+    """去年同季的數值 (以日期對齊，中間缺季也不會錯位)"""
+    keys = _keys(table)
+    lookup = table[keys + columns].copy()
+    lookup['date'] = lookup['date'] + pd.DateOffset(years=1)
+    return table[keys].merge(lookup, on=keys, how='left')[columns]
+
+
+def _safe_ratio(numerator, denominator, scale):
+    numerator = numerator.to_numpy(dtype=np.float64)
+    denominator = denominator.to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(denominator > 0, numerator / denominator * scale, 0.0)
+    return np.where(np.isnan(numerator) | np.isnan(denominator), np.nan, ratio)
+
+
+def _ratio_inputs(column):
+    """比率欄位的分子與分母 (非比率欄位返回空清單)"""
+    if column not in RATIO_SPECS:
+        return []
+    numerator, denominator, _ = RATIO_SPECS[column]
+    return [numerator, denominator]
+
+
+def _growth(current, previous):
+    return ((current - previous) / previous.abs() * 100).where(previous != 0)
+
+
+def compute_quarterly_fundamentals(income_df, balance_df=None, cashflow_df=None):
+    """
+    計算每一季的所有基本面指標
+
+    參數:
+        income_df: 損益表 DataFrame
+        balance_df: 資產負債表 DataFrame
+        cashflow_df: 現金流量表 DataFrame
+
+    返回:
+        DataFrame: 依日期由新到舊，原始科目加上 RATIO_SPECS 各比率、
+                   EPS_QoQ / EPS_YoY (%)、F_<條件> (1/0，數據不足為 NaN)、
+                   F_Score 與 F_Count (有數據的條件數)；無數據時返回 None
+    """
+    if income_df is None or income_df.empty:
+        return None
+
+    table = merge_statements(income_df, balance_df, cashflow_df)
+
+    ratios = {
+        name: _safe_ratio(table[numerator], table[denominator], scale)
+        for name, (numerator, denominator, scale) in RATIO_SPECS.items()
+        if numerator in table.columns and denominator in table.columns
+    }
+    table = table.assign(**ratios)
+
+    if 'EPS' in table.columns:
+        table['EPS'] = pd.to_numeric(table['EPS'], errors='coerce')
+        table['EPS_QoQ'] = _growth(table['EPS'], _previous(table, 'EPS', 1))
+        table['EPS_YoY'] = _growth(table['EPS'], _previous(table, 'EPS', 4))
+
+    return add_fscore_columns(table)
+
+
+def add_fscore_columns(table):
+    """
+    加入 F-Score 各條件、總分與有數據的條件數
+
+    缺少科目或去年同季數據的條件為 NaN，不計入總分也不計入 F_Count；
+    比率條件另外檢查原始分子與分母，缺少資產負債表的季度不會以 0 計分。
+
+    返回:
+        DataFrame: 加上 F_<條件>、F_Score 與 F_Count 欄位
+    """
+    columns = sorted({col for needed, _, _ in FSCORE_CRITERIA.values() for col in needed if col in table.columns})
+    year_ago = _year_ago(table, columns)
+
+    # 比率欄位的有無以原始分子、分母判斷 (例如該季沒有資產負債表)
+    raw = sorted({col for column in columns for col in _ratio_inputs(column)})
+    raw_year_ago = _year_ago(table, raw)
+
+    flags = {}
+    for name, (needed, compare_year_ago, check) in FSCORE_CRITERIA.items():
+        if not all(col in table.columns for col in needed):
+            continue
+        inputs = [col for column in needed for col in _ratio_inputs(column)]
+        available = table[needed].notna().all(axis=1) & table[inputs].notna().all(axis=1)
+        if compare_year_ago:
+            available &= year_ago[needed].notna().all(axis=1) & raw_year_ago[inputs].notna().all(axis=1)
+        flags[f'F_{name}'] = check(table, year_ago).astype(np.float64).where(available)
+
+    table = table.assign(**flags)
+    flag_table = table[list(flags)]
+    table['F_Score'] = flag_table.sum(axis=1).astype(np.int8)
+    table['F_Count'] = flag_table.notna().sum(axis=1).astype(np.int8)
+    return table
+
+
+def fscore_history(table):
+    """
+    返回:
+        DataFrame: 每季的 F-Score 總分、有數據的條件數與各條件 (依日期由新到舊)
+    """
+    keys = _keys(table)
+    flag_columns = [f'F_{name}' for name in FSCORE_CRITERIA if f'F_{name}' in table.columns]
+    return table[keys + ['F_Score', 'F_Count'] + flag_columns].reset_index(drop=True)
+
+
+# ==================== 最新一季摘要 ====================
+
+def latest_ratios(table):
+    """
+    返回:
+        dict: 最新一季的財務比率 (LATEST_RATIO_KEYS 中存在且有數據的欄位)
+    """
+    row = table.iloc[0]
+    return {key: row[key] for key in LATEST_RATIO_KEYS if key in table.columns and pd.notna(row[key])}
+
+
+def latest_fscore(table):
+    """
+    返回:
+        dict: {'total_score', 'max_score', 'evaluated', 'details'}，
+              details 只列出有數據的條件，各為 {'score', ...}
+    """
+    row = table.iloc[0]
+    details = {}
+    for name in FSCORE_CRITERIA:
+        column = f'F_{name}'
+        if column in table.columns and pd.notna(row[column]):
+            details[name] = {'score': int(row[column])}
+    if 'ROA正值' in details:
+        details['ROA正值']['value'] = f"{row['ROA'] / 100:.2%}"
+    if 'CFO正值' in details:
+        details['CFO正值']['value'] = f"{row['CFO']:,.0f}"
+    return {
+        'total_score': int(row['F_Score']),
+        'max_score': FSCORE_MAX,
+        'evaluated': int(row['F_Count']),
+        'details': details,
+    }
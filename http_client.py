@@ -0,0 +1,262 @@
+"""
+共用 HTTP 客戶端
+提供連線池 (keep-alive) Session、429/5xx 指數退避重試、
+FinMind 配額感知的 Token Bucket 限流器，以及各端點延遲統計
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ==================== 設定 ====================
+
+FINMIND_API_URL = "https://api.finmindtrade.com/api/v4/data"
+
+DEFAULT_TIMEOUT = 10
+
+# FinMind 每小時請求上限 (依會員等級)
+FINMIND_RATE_LIMITS = {
+    'anonymous': 300,   # 未帶 Token
+    'free': 600,        # 免費註冊會員
+    'backer': 1600,
+    'sponsor': 6000,
+}
+
+# 可用環境變數 FINMIND_TIER 指定帶 Token 時的會員等級
+FINMIND_TIER = os.environ.get('FINMIND_TIER', 'free')
+
+# 限流器最多等待秒數，超過則直接視為配額用盡
+RATE_LIMIT_MAX_WAIT = 10
+
+# FinMind 配額用盡時回傳 402
+FINMIND_QUOTA_STATUS = 402
+
+
+# ==================== 例外 ====================
+
+class FinMindError(Exception):
+    """FinMind API 呼叫失敗"""
+
+
+class FinMindRateLimitError(FinMindError):
+    """FinMind 請求配額用盡 (伺服器回應或本地限流器判定)"""
+
+
+# ==================== 限流器 ====================
+
+class TokenBucket:
+    """
+    執行緒安全的 Token Bucket 限流器
+
+    參數:
+        capacity: 桶容量 (允許的瞬間突發請求數)
+        refill_rate: 每秒補充的 token 數
+    """
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, max_wait=None):
+        """
+        取得 token，不足時等待補充
+
+        參數:
+            tokens: 需要的 token 數
+            max_wait: 最長等待秒數，None 表示無限等待
+
+        返回:
+            bool: 成功取得為 True；需等待超過 max_wait 時為 False (不消耗 token)
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.refill_rate
+
+            if max_wait is not None and wait > max_wait:
+                return False
+            time.sleep(wait)
+
+    @property
+    def available(self):
+        """目前可用的 token 數"""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+def hourly_bucket(requests_per_hour):
+    """建立以每小時請求數設定的限流器"""
+    return TokenBucket(capacity=requests_per_hour, refill_rate=requests_per_hour / 3600)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_finmind_bucket(token=""):
+    """依 Token 有無取得對應會員等級的共用限流器"""
+    tier = FINMIND_TIER if token else 'anonymous'
+    with _buckets_lock:
+        if tier not in _buckets:
+            _buckets[tier] = hourly_bucket(FINMIND_RATE_LIMITS[tier])
+        return _buckets[tier]
+
+
+# ==================== 延遲統計 ====================
+
+class LatencyStats:
+    """各端點的請求次數、錯誤次數與延遲統計 (執行緒安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, endpoint, elapsed, ok=True):
+        with self._lock:
+            stat = self._stats.setdefault(
+                endpoint, {'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0}
+            )
+            stat['count'] += 1
+            stat['total'] += elapsed
+            stat['max'] = max(stat['max'], elapsed)
+            if not ok:
+                stat['errors'] += 1
+
+    def snapshot(self):
+        """
+        返回:
+            dict: 端點 -> {'count', 'errors', 'avg', 'max'} (秒)
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    'count': stat['count'],
+                    'errors': stat['errors'],
+                    'avg': stat['total'] / stat['count'] if stat['count'] else 0.0,
+                    'max': stat['max'],
+                }
+                for endpoint, stat in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+latency_stats = LatencyStats()
+
+
+# ==================== Session ====================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,  # 0.5, 1, 2 秒
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """取得行程內共用的 keep-alive Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def http_get(url, params=None, timeout=DEFAULT_TIMEOUT, endpoint=None, headers=None):
+    """
+    以共用 Session 發出 GET 請求並記錄延遲
+
+    參數:
+        url: 請求網址
+        params: 查詢參數
+        timeout: 逾時秒數
+        endpoint: 統計用的端點名稱，預設為網址路徑
+        headers: 額外的請求標頭 (例如條件式請求的 If-None-Match)
+
+    返回:
+        requests.Response
+    """
+    endpoint = endpoint or urlparse(url).path
+    started = time.perf_counter()
+    ok = False
+    try:
+        response = get_session().get(url, params=params, timeout=timeout, headers=headers)
+        ok = response.status_code < 400
+        return response
+    finally:
+        latency_stats.record(endpoint, time.perf_counter() - started, ok)
+
+
+def finmind_request(dataset, data_id=None, start_date=None, end_date=None, token="",
+                    timeout=DEFAULT_TIMEOUT):
+    """
+    呼叫 FinMind v4 data API
+
+    先經過本地限流器，配額用盡 (本地判定或伺服器回應 402) 時拋出
+    FinMindRateLimitError，讓呼叫端能與「查無數據」區分。
+
+    參數:
+        dataset: 數據集名稱，例如 TaiwanStockPrice
+        data_id: 股票代碼，None 表示全市場
+        start_date: 起始日期 (YYYY-MM-DD)
+        end_date: 結束日期 (YYYY-MM-DD)
+        token: FinMind API Token
+        timeout: 逾時秒數
+
+    返回:
+        requests.Response
+    """
+    if not get_finmind_bucket(token).acquire(max_wait=RATE_LIMIT_MAX_WAIT):
+        raise FinMindRateLimitError("FinMind 請求配額已用盡 (本地限流)")
+
+    params = {"dataset": dataset, "token": token or ""}
+    if data_id is not None:
+        params["data_id"] = data_id
+    if start_date is not None:
+        params["start_date"] = start_date
+    if end_date is not None:
+        params["end_date"] = end_date
+
+    response = http_get(FINMIND_API_URL, params=params, timeout=timeout,
+                        endpoint=f"finmind/{dataset}")
+
+    if response.status_code == FINMIND_QUOTA_STATUS:
+        try:
+            message = response.json().get('msg', '')
+        except ValueError:
+            message = response.text[:200]
+        raise FinMindRateLimitError(f"FinMind 請求配額已用盡: {message}")
+
+    return response
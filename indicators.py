@@ -0,0 +1,325 @@
+"""
+技術指標引擎
+以單次運算產生 MA、RSI、KD、MACD、威廉指標，
+共用中間結果 (滾動最高/最低價、EMA) 並將所有輸出寫入同一個預先配置的陣列，
+取代逐步 df.copy() 的串接流程
+"""
+
+import numpy as np
+import pandas as pd
+
+# ==================== 指標規格 ====================
+
+# 宣告式的指標清單，順序即輸出欄位順序
+DEFAULT_INDICATOR_SPEC = [
+    {'name': 'MA', 'windows': (5, 10, 20, 60)},
+    {'name': 'RSI', 'period': 14},
+    {'name': 'KD', 'n': 9, 'm1': 3, 'm2': 3},
+    {'name': 'MACD', 'fast': 12, 'slow': 26, 'signal': 9},
+    {'name': 'WillR', 'period': 14},
+]
+
+
+def default_indicator_spec(rsi_period=14):
+    """
+    取得預設指標規格，並套用使用者設定的 RSI 週期
+
+    參數:
+        rsi_period: RSI 計算週期
+
+    返回:
+        list: 指標規格清單
+    """
+    spec = [dict(item) for item in DEFAULT_INDICATOR_SPEC]
+    for item in spec:
+        if item['name'] == 'RSI':
+            item['period'] = rsi_period
+    return spec
+
+
+# EMA 需要約 4 倍週期的資料，初始值的殘留權重才會低於 0.1%
+EMA_WARMUP_FACTOR = 4
+
+
+def required_warmup(spec):
+    """
+    依規格計算指標暖機所需的最少 K 棒數 (最長回溯期)
+
+    滾動視窗需要完整的視窗長度；EMA 類指標 (KD 平滑、MACD) 需要
+    EMA_WARMUP_FACTOR 倍週期才能收斂。
+
+    參數:
+        spec: 指標規格清單
+
+    返回:
+        int: 暖機 K 棒數
+    """
+    lookbacks = [0]
+    for item in spec:
+        name = item['name']
+        if name == 'MA':
+            lookbacks.append(max(item['windows']))
+        elif name in ('RSI', 'WillR'):
+            lookbacks.append(item['period'])
+        elif name == 'KD':
+            lookbacks.append(item['n'] + EMA_WARMUP_FACTOR * (item['m1'] + item['m2']))
+        elif name == 'MACD':
+            lookbacks.append(EMA_WARMUP_FACTOR * (item['slow'] + item['signal']))
+    return max(lookbacks)
+
+
+def indicator_columns(spec):
+    """
+    依規格列出輸出欄位
+
+    返回:
+        list: 欄位名稱 (依規格順序)
+    """
+    columns = []
+    for item in spec:
+        name = item['name']
+        if name == 'MA':
+            columns += [f"MA{w}" for w in item['windows']]
+        elif name == 'RSI':
+            columns.append('RSI')
+        elif name == 'KD':
+            columns += ['RSV', 'K', 'D']
+        elif name == 'MACD':
+            columns += ['MACD', 'MACD_Signal', 'MACD_Hist']
+        elif name == 'WillR':
+            columns.append('WillR')
+        else:
+            raise ValueError(f"未知的指標: {name}")
+    return columns
+
+
+# ==================== 共用運算工作區 ====================
+
+class _Workspace:
+    """
+    保存價格陣列與已計算的中間結果
+
+    價格陣列可為一維 (單一股票) 或二維 (日期 × 股票的市場面板)，
+    所有運算皆沿第 0 軸 (時間) 進行。
+    滾動視窗與 EMA 以 (種類, 來源, 參數) 為鍵記憶，
+    例如 KD 與威廉指標週期相同時只計算一次滾動最高/最低價。
+    滾動平均與 EMA 使用 pandas 的運算核心，確保與原本逐步計算的結果逐位元一致。
+    """
+
+    def __init__(self, arrays):
+        self.arrays = {col: np.asarray(values, dtype=np.float64) for col, values in arrays.items()}
+        self._memo = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls({col: df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close')})
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    @staticmethod
+    def _pandas(values):
+        return pd.Series(values) if values.ndim == 1 else pd.DataFrame(values)
+
+    def rolling_extreme(self, column, window, how):
+        """滾動最高價 / 最低價 (min_periods=window)"""
+        def compute():
+            values = self.arrays[column]
+            result = np.full(values.shape, np.nan)
+            if len(values) >= window:
+                windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+                result[window - 1:] = windows.max(axis=-1) if how == 'max' else windows.min(axis=-1)
+            return result
+        return self._cached(('extreme', column, window, how), compute)
+
+    def rolling_mean(self, key, values, window, min_periods):
+        return self._cached(
+            ('mean', key, window, min_periods),
+            lambda: self._pandas(values).rolling(window=window, min_periods=min_periods).mean().to_numpy()
+        )
+
+    def ema(self, key, values, span):
+        return self._cached(
+            ('ema', key, span),
+            lambda: self._pandas(values).ewm(span=span, adjust=False).mean().to_numpy()
+        )
+
+    def close_delta(self):
+        def compute():
+            close = self.arrays['close']
+            delta = np.empty_like(close)
+            if len(close):
+                delta[0] = np.nan
+                np.subtract(close[1:], close[:-1], out=delta[1:])
+            return delta
+        return self._cached(('delta', 'close'), compute)
+
+
+# ==================== 個別指標 ====================
+
+def _moving_averages(ws, windows):
+    close = ws.arrays['close']
+    return [ws.rolling_mean('close', close, w, 1) for w in windows]
+
+
+def _rsi(ws, period):
+    delta = ws.close_delta()
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    avg_gain = ws.rolling_mean('gain', gain, period, period)
+    avg_loss = ws.rolling_mean('loss', loss, period, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return [100 - (100 / (1 + rs))]
+
+
+def _kd(ws, n, m1, m2):
+    low_min = ws.rolling_extreme('low', n, 'min')
+    high_max = ws.rolling_extreme('high', n, 'max')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv = 100 * (ws.arrays['close'] - low_min) / (high_max - low_min)
+    k = ws.ema(('RSV', n), rsv, m1)
+    d = ws.ema(('K', n, m1), k, m2)
+    return [rsv, k, d]
+
+
+def _macd(ws, fast, slow, signal):
+    close = ws.arrays['close']
+    macd = ws.ema('close', close, fast) - ws.ema('close', close, slow)
+    macd_signal = ws.ema(('MACD', fast, slow), macd, signal)
+    return [macd, macd_signal, macd - macd_signal]
+
+
+def _willr(ws, period):
+    high_max = ws.rolling_extreme('high', period, 'max')
+    low_min = ws.rolling_extreme('low', period, 'min')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return [-100 * (high_max - ws.arrays['close']) / (high_max - low_min)]
+
+
+_INDICATOR_FUNCS = {
+    'MA': lambda ws, item: _moving_averages(ws, item['windows']),
+    'RSI': lambda ws, item: _rsi(ws, item['period']),
+    'KD': lambda ws, item: _kd(ws, item['n'], item['m1'], item['m2']),
+    'MACD': lambda ws, item: _macd(ws, item['fast'], item['slow'], item['signal']),
+    'WillR': lambda ws, item: _willr(ws, item['period']),
+}
+
+
+def _iter_indicator_arrays(ws, spec):
+    """依規格順序逐一產生指標陣列"""
+    for item in spec:
+        yield from _INDICATOR_FUNCS[item['name']](ws, item)
+
+
+# ==================== 主要介面 ====================
+
+def compute_indicators(df, spec=None):
+    """
+    一次計算所有技術指標
+
+    參數:
+        df: 包含 date, open, high, low, close, volume 的 DataFrame
+        spec: 指標規格清單，預設為 DEFAULT_INDICATOR_SPEC
+
+    返回:
+        DataFrame: 原始欄位加上所有指標欄位
+    """
+    if df is None or df.empty:
+        return None
+
+    spec = spec or DEFAULT_INDICATOR_SPEC
+    columns = indicator_columns(spec)
+
+    output = np.empty((len(df), len(columns)))
+    for position, values in enumerate(_iter_indicator_arrays(_Workspace.from_frame(df), spec)):
+        output[:, position] = values
+
+    result = df.copy()
+    result[columns] = output
+    return result
+
+
+def compute_indicator_arrays(high, low, close, spec=None):
+    """
+    以陣列計算技術指標 (可用於日期 × 股票的二維面板)
+
+    參數:
+        high, low, close: 形狀相同的一維或二維陣列，第 0 軸為時間
+        spec: 指標規格清單
+
+    返回:
+        dict: 欄位名稱 -> 與輸入形狀相同的陣列
+    """
+    spec = spec or DEFAULT_INDICATOR_SPEC
+    ws = _Workspace({'high': high, 'low': low, 'close': close})
+    return dict(zip(indicator_columns(spec), _iter_indicator_arrays(ws, spec)))
+
+
+def date_range_bounds(df, start_date, end_date):
+    """
+    以二分搜尋找出日期區間在已排序 DataFrame 中的位置 (O(log n))
+
+    參數:
+        df: 依 date 遞增排序的 DataFrame
+        start_date: 起始日期 (含)
+        end_date: 結束日期 (含)
+
+    返回:
+        tuple: (起始位置, 結束位置)，可直接用於 iloc 切片
+    """
+    dates = df['date'].to_numpy()
+    start = dates.searchsorted(np.datetime64(pd.Timestamp(start_date)), side='left')
+    end = dates.searchsorted(np.datetime64(pd.Timestamp(end_date)), side='right')
+    return start, end
+
+
+def slice_date_range(df, start_date, end_date):
+    """
+    擷取日期區間 (不重新計算指標)
+
+    返回:
+        DataFrame: 區間內的數據，無數據時返回 None
+    """
+    if df is None or df.empty:
+        return None
+
+    start, end = date_range_bounds(df, start_date, end_date)
+    if start >= end:
+        return None
+    return df.iloc[start:end].reset_index(drop=True)
+
+
+def compute_indicators_for_range(df, start_date, end_date, spec=None, warmup=None):
+    """
+    在包含暖機區間的歷史上計算指標，再擷取顯示區間
+
+    顯示區間前保留 warmup 根 K 棒，讓 MA60 等長週期指標在區間第一天就有
+    完整視窗、EMA 也已收斂，而不是只用區間內的資料冷啟動計算。
+
+    參數:
+        df: 依 date 遞增排序的完整歷史價格
+        start_date: 顯示起始日期 (含)
+        end_date: 顯示結束日期 (含)
+        spec: 指標規格清單
+        warmup: 暖機 K 棒數，預設依規格自動計算
+
+    返回:
+        DataFrame: 顯示區間內含所有指標的數據，無數據時返回 None
+    """
+    if df is None or df.empty:
+        return None
+
+    spec = spec or DEFAULT_INDICATOR_SPEC
+    if warmup is None:
+        warmup = required_warmup(spec)
+
+    start, end = date_range_bounds(df, start_date, end_date)
+    if start >= end:
+        return None
+
+    window_start = max(0, start - warmup)
+    result = compute_indicators(df.iloc[window_start:end], spec)
+    return result.iloc[start - window_start:].reset_index(drop=True)
@@ -0,0 +1,161 @@
+"""
+全市場批次指標計算
+將 tw_all_listed_otc.csv 中所有股票的快取日線載入成「日期 × 股票」面板，
+以向量化的逐欄運算一次算出 MA、RSI、KD、MACD、威廉指標，並輸出為單一 Parquet 檔
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import compact_dtypes
+import price_cache
+from indicators import DEFAULT_INDICATOR_SPEC, compute_indicator_arrays
+
+# ==================== 設定 ====================
+
+COMPANY_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tw_all_listed_otc.csv")
+PANEL_PATH = os.path.join(price_cache.CACHE_DIR, "market_indicators.parquet")
+
+PANEL_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+
+# ==================== 數據載入 ====================
+
+def load_universe(path=COMPANY_LIST_PATH):
+    """
+    讀取上市櫃公司清單
+
+    返回:
+        list: 股票代碼 (字串)
+    """
+    companies = pd.read_csv(path, dtype={'公司代號': str}, encoding='utf-8-sig')
+    return companies['公司代號'].str.strip().tolist()
+
+
+def build_price_panel(symbols=None, start_date=None, db_path=price_cache.DEFAULT_DB_PATH):
+    """
+    由價格快取建立市場面板
+
+    參數:
+        symbols: 股票代碼清單，None 表示快取中的全部股票
+        start_date: 起始日期 (YYYY-MM-DD)，None 表示全部歷史
+        db_path: SQLite 檔案路徑
+
+    返回:
+        dict: 欄位 (open/high/low/close/volume) -> 寬表 DataFrame
+              (index 為日期、columns 為股票代碼；停牌或尚未上市的日期為 NaN；
+              價格為 float32，成交量因缺值為 float64)
+    """
+    long_df = price_cache.load_all_prices(start_date, db_path)
+    if symbols is not None:
+        long_df = long_df[long_df['symbol'].isin(set(symbols))]
+
+    # 逐欄 pivot，避免多欄一起 pivot 時 float32 價格被提升為 float64
+    return {
+        field: long_df.pivot(index='date', columns='symbol', values=field).sort_index()
+        for field in PANEL_FIELDS
+    }
+
+
+# ==================== 批次計算 ====================
+
+def compute_panel_indicators(panel, spec=None):
+    """
+    對整個面板計算技術指標
+
+    所有股票的同一個指標在一次二維陣列運算中完成，
+    公式與 indicators.compute_indicators (單一股票) 相同。
+    停牌或尚未上市的日期 (收盤價為 NaN) 會先從各欄移除，
+    讓滾動視窗、漲跌與 EMA 只跨越該股票實際交易的 K 棒，結果與單一股票計算一致。
+
+    參數:
+        panel: build_price_panel 的返回值
+        spec: 指標規格清單
+
+    返回:
+        dict: 指標欄位 -> 寬表 DataFrame (index/columns 與面板相同，無交易的日期為 NaN)
+    """
+    spec = spec or DEFAULT_INDICATOR_SPEC
+    close = panel['close']
+    traded = ~np.isnan(close.to_numpy())
+
+    # 每欄有交易的列依原順序移到最前面，NaN 補在尾端 (不影響前面的計算)
+    order = np.argsort(~traded, axis=0, kind='stable')
+
+    def compact(frame):
+        return np.take_along_axis(frame.to_numpy(), order, axis=0)
+
+    arrays = compute_indicator_arrays(compact(panel['high']), compact(panel['low']), compact(close), spec)
+
+    indicator_panel = {}
+    for column, values in arrays.items():
+        scattered = np.empty(values.shape)
+        np.put_along_axis(scattered, order, values, axis=0)
+        scattered[~traded] = np.nan
+        indicator_panel[column] = pd.DataFrame(scattered, index=close.index, columns=close.columns)
+    return indicator_panel
+
+
+def panel_to_long(panel, indicator_panel):
+    """
+    將面板與指標合併成長表 (date, symbol, 價格欄位, 指標欄位)
+
+    沒有收盤價的格子 (停牌或尚未上市) 不會輸出。
+
+    返回:
+        DataFrame: 依 date, symbol 排序的長表
+    """
+    close = panel['close']
+    dates = np.repeat(close.index.to_numpy(), close.shape[1])
+    symbols = np.tile(close.columns.to_numpy(), close.shape[0])
+
+    columns = {'date': dates, 'symbol': symbols}
+    for name, frame in list(panel.items()) + list(indicator_panel.items()):
+        columns[name] = frame.to_numpy().ravel()
+
+    long_df = pd.DataFrame(columns)
+    return long_df[~np.isnan(long_df['close'].to_numpy())].reset_index(drop=True)
+
+
+def run_batch(symbols=None, start_date=None, spec=None, output_path=PANEL_PATH,
+              db_path=price_cache.DEFAULT_DB_PATH):
+    """
+    建立面板、計算全市場指標並寫出 Parquet 檔
+
+    返回:
+        DataFrame: 寫出的長表；快取中沒有符合的價格時為空 DataFrame (不寫檔，保留原有的面板)
+    """
+    panel = build_price_panel(symbols, start_date, db_path)
+    if panel['close'].empty:
+        return pd.DataFrame()
+
+    long_df = compact_dtypes.compact_indicators(panel_to_long(panel, compute_panel_indicators(panel, spec)))
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    long_df.to_parquet(output_path, index=False)
+    return long_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全市場批次計算技術指標並輸出 Parquet")
+    parser.add_argument('--companies', default=COMPANY_LIST_PATH, help="公司清單 CSV")
+    parser.add_argument('--start-date', default=None, help="起始日期 (YYYY-MM-DD)")
+    parser.add_argument('--output', default=PANEL_PATH, help="輸出 Parquet 路徑")
+    parser.add_argument('--db', default=price_cache.DEFAULT_DB_PATH, help="SQLite 快取路徑")
+    args = parser.parse_args()
+
+    long_df = run_batch(load_universe(args.companies), args.start_date,
+                        output_path=args.output, db_path=args.db)
+    if long_df.empty:
+        print("價格快取中沒有符合的數據")
+        return
+    print(f"完成 {long_df['symbol'].nunique()} 檔股票、{len(long_df)} 筆指標數據 → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+本地市場數據倉儲
+在價格快取的同一個 SQLite 檔案中，以型別明確的資料表保存財報 (長表: date, type, value)、
+月營收與公司基本資料，並提供查詢 API；stock_analysis_app 的 get_* 函數先讀取倉儲，
+同步間隔過後才向 FinMind 補抓。跨股票的問題 (例如月營收年增率前 20 名) 只需一次 SQL 查詢。
+日線價格仍由 price_cache 寫入 stock_price 資料表，可在同一連線中一起查詢。
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import compact_dtypes
+from price_cache import DEFAULT_DB_PATH
+
+# ==================== 設定 ====================
+
+COMPANY_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tw_all_listed_otc.csv")
+
+# 同一檔股票的同一數據集在此時間內已同步過就直接讀取倉儲
+SYNC_INTERVAL = timedelta(hours=12)
+
+# 財報數據集 (FinMind 名稱)
+STATEMENT_DATASETS = (
+    "TaiwanStockFinancialStatements",
+    "TaiwanStockBalanceSheet",
+    "TaiwanStockCashFlowsStatement",
+)
+REVENUE_DATASET = "TaiwanStockMonthRevenue"
+
+# 財報最早的歷史起始日 (與原本 get_financial_statements 的 start_date 一致)
+STATEMENT_START_DATE = "2019-01-01"
+
+# 每次同步重新下載最近幾季 (公司可能重編已公布的財報)
+RESTATEMENT_QUARTERS = 4
+
+# 行程內最多保留的寬表筆數
+MAX_PIVOT_ENTRIES = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS financial_statement (
+    symbol  TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    date    TEXT NOT NULL,
+    type    TEXT NOT NULL,
+    value   REAL,
+    PRIMARY KEY (symbol, dataset, date, type)
+);
+CREATE TABLE IF NOT EXISTS monthly_revenue (
+    symbol        TEXT NOT NULL,
+    date          TEXT NOT NULL,
+    revenue_year  INTEGER NOT NULL,
+    revenue_month INTEGER NOT NULL,
+    revenue       REAL,
+    PRIMARY KEY (symbol, date)
+);
+CREATE INDEX IF NOT EXISTS monthly_revenue_period ON monthly_revenue (symbol, revenue_year, revenue_month);
+CREATE TABLE IF NOT EXISTS company (
+    symbol TEXT PRIMARY KEY,
+    name   TEXT NOT NULL,
+    market TEXT
+);
+CREATE TABLE IF NOT EXISTS dataset_sync (
+    symbol    TEXT NOT NULL,
+    dataset   TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (symbol, dataset)
+);
+"""
+
+# 月營收年增率排名: 每檔股票最新一個月與去年同月比較
+_TOP_REVENUE_GROWTH_SQL = """
+WITH latest AS (
+    SELECT symbol, MAX(revenue_year * 100 + revenue_month) AS period
+    FROM monthly_revenue
+    WHERE revenue_year * 100 + revenue_month <= ?
+    GROUP BY symbol
+)
+SELECT cur.symbol, c.name, c.market, cur.revenue_year, cur.revenue_month,
+       cur.revenue, prev.revenue AS revenue_last_year,
+       (cur.revenue - prev.revenue) * 100.0 / prev.revenue AS yoy_growth
+FROM latest
+JOIN monthly_revenue AS cur
+  ON cur.symbol = latest.symbol AND cur.revenue_year = latest.period / 100
+ AND cur.revenue_month = latest.period % 100
+JOIN monthly_revenue AS prev
+  ON prev.symbol = cur.symbol AND prev.revenue_year = cur.revenue_year - 1
+ AND prev.revenue_month = cur.revenue_month
+LEFT JOIN company AS c ON c.symbol = cur.symbol
+WHERE prev.revenue > 0 AND cur.revenue >= ?
+ORDER BY yoy_growth DESC
+LIMIT ?
+"""
+
+
+# (db_path, symbol, dataset) -> (數據版本, 寬表)
+_pivot_cache = {}
+_pivot_lock = threading.Lock()
+
+
+# ==================== 內部函數 ====================
+
+def _connect(db_path):
+    """開啟資料庫連線並確保資料表存在"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _connect_readonly(db_path):
+    """開啟唯讀連線 (資料表已建立後，寫入語句會引發 sqlite3.OperationalError)"""
+    conn = _connect(db_path)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+# ==================== 查詢 ====================
+
+def query(sql, params=(), db_path=DEFAULT_DB_PATH):
+    """
+    執行唯讀 SQL 查詢 (連線設為 query_only，INSERT / UPDATE / DELETE 等寫入會被拒絕)
+
+    參數:
+        sql: SQL 語句 (可使用 financial_statement、monthly_revenue、company、stock_price 等資料表)
+        params: 參數
+        db_path: SQLite 檔案路徑
+
+    返回:
+        DataFrame: 查詢結果
+    """
+    with closing(_connect_readonly(db_path)) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def top_revenue_growth(limit=20, as_of=None, min_revenue=0, db_path=DEFAULT_DB_PATH):
+    """
+    全市場月營收年增率排名
+
+    參數:
+        limit: 返回筆數
+        as_of: 截止月份 (日期)，None 表示最新
+        min_revenue: 最新月營收下限 (排除基期過小的公司)
+        db_path: SQLite 檔案路徑
+
+    返回:
+        DataFrame: symbol, name, market, revenue_year, revenue_month, revenue,
+                   revenue_last_year, yoy_growth (%)，依年增率由高到低排序
+    """
+    as_of = pd.Timestamp(as_of or datetime.now())
+    return query(_TOP_REVENUE_GROWTH_SQL, (as_of.year * 100 + as_of.month, min_revenue, int(limit)), db_path)
+
+
+# ==================== 同步狀態 ====================
+
+def mark_synced(symbol, dataset, db_path=DEFAULT_DB_PATH, synced_at=None):
+    """記錄某檔股票的某個數據集最後一次向 API 同步的時間"""
+    synced_at = synced_at or datetime.now()
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO dataset_sync (symbol, dataset, synced_at) VALUES (?, ?, ?)",
+            (symbol, dataset, synced_at.isoformat(timespec='seconds')),
+        )
+
+
+def needs_sync(symbol, dataset, db_path=DEFAULT_DB_PATH, interval=SYNC_INTERVAL, now=None):
+    """
+    返回:
+        bool: 尚未同步過或距上次同步超過 interval 時為 True
+    """
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(
+            "SELECT synced_at FROM dataset_sync WHERE symbol = ? AND dataset = ?", (symbol, dataset)
+        ).fetchone()
+
+    if row is None:
+        return True
+
+    now = now or datetime.now()
+    return now - datetime.fromisoformat(row[0]) >= interval
+
+
+# ==================== 財報 ====================
+
+def save_statements(symbol, dataset, df, db_path=DEFAULT_DB_PATH):
+    """
+    寫入 FinMind 財報原始長表 (同一季同一科目會被覆蓋)
+
+    與倉儲中數值相同的列不會重寫，重新下載未變更的季度時數據版本 (get_statement_version) 不變。
+
+    參數:
+        symbol: 股票代碼
+        dataset: FinMind 數據集名稱 (STATEMENT_DATASETS)
+        df: 含 date, type, value 欄位的 DataFrame
+        db_path: SQLite 檔案路徑
+
+    返回:
+        int: 新增或數值改變的筆數
+    """
+    if df is None or df.empty:
+        return 0
+
+    values = pd.to_numeric(df['value'], errors='coerce')
+    records = [
+        (symbol, dataset, date.strftime('%Y-%m-%d'), str(type_), None if value != value else float(value))
+        for date, type_, value in zip(pd.to_datetime(df['date']), df['type'], values)
+    ]
+
+    with closing(_connect(db_path)) as conn, conn:
+        existing = dict(
+            ((date, type_), value) for date, type_, value in conn.execute(
+                "SELECT date, type, value FROM financial_statement WHERE symbol = ? AND dataset = ? AND date >= ?",
+                (symbol, dataset, min(record[2] for record in records)),
+            )
+        )
+        records = [
+            record for record in records
+            if (record[2], record[3]) not in existing or existing[(record[2], record[3])] != record[4]
+        ]
+        conn.executemany(
+            "INSERT OR REPLACE INTO financial_statement (symbol, dataset, date, type, value) "
+            "VALUES (?, ?, ?, ?, ?)",
+            records,
+        )
+    return len(records)
+
+
+def load_statements(symbol, dataset, db_path=DEFAULT_DB_PATH):
+    """
+    讀取某檔股票某個數據集的財報長表
+
+    返回:
+        DataFrame: date, type, value (依日期遞增)，無數據時返回 None
+    """
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(
+            "SELECT date, type, value FROM financial_statement "
+            "WHERE symbol = ? AND dataset = ? ORDER BY date, type",
+            conn,
+            params=(symbol, dataset),
+        )
+
+    if df.empty:
+        return None
+
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def load_all_statements(dataset=None, symbols=None, db_path=DEFAULT_DB_PATH):
+    """
+    讀取多檔股票的財報長表 (全市場面板用)
+
+    以長表保存而不 pivot: 各公司使用的會計科目不同，寬表會有數百個大多為 NaN 的欄位。
+
+    參數:
+        dataset: FinMind 數據集名稱，None 表示全部
+        symbols: 股票代碼清單，None 表示全部
+        db_path: SQLite 檔案路徑
+
+    返回:
+        DataFrame: symbol, dataset, date, type, value
+                   (symbol / dataset / type 為 categorical，見 compact_dtypes.compact_statements)
+    """
+    sql = "SELECT symbol, dataset, date, type, value FROM financial_statement WHERE 1 = 1"
+    params = []
+    if dataset is not None:
+        sql += " AND dataset = ?"
+        params.append(dataset)
+    if symbols is not None:
+        symbols = list(symbols)
+        sql += f" AND symbol IN ({', '.join('?' * len(symbols))})"
+        params.extend(symbols)
+
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+
+    df['date'] = pd.to_datetime(df['date'])
+    return compact_dtypes.compact_statements(df)
+
+
+def get_statement_version(symbol, dataset, db_path=DEFAULT_DB_PATH):
+    """
+    返回:
+        tuple: (最後一季日期, 筆數, 最大 rowid)，無數據時為 (None, 0, None)
+               INSERT OR REPLACE 覆蓋既有列時會配置新的 rowid，因此重編財報 (日期與筆數不變) 也會改變版本
+    """
+    with closing(_connect(db_path)) as conn:
+        return conn.execute(
+            "SELECT MAX(date), COUNT(*), MAX(rowid) FROM financial_statement WHERE symbol = ? AND dataset = ?",
+            (symbol, dataset),
+        ).fetchone()
+
+
+def get_statement_fetch_start_date(symbol, dataset, db_path=DEFAULT_DB_PATH):
+    """
+    計算增量下載的起始日期
+
+    從最後快取季度往前 RESTATEMENT_QUARTERS 季重新下載，重編的財報會覆蓋舊值
+    (save_statements 只寫入改變的列)；更早季度的重編需以完整下載更新。
+    無快取時從 STATEMENT_START_DATE 開始完整下載。
+
+    返回:
+        str: YYYY-MM-DD 格式的起始日期
+    """
+    last_date = get_statement_version(symbol, dataset, db_path)[0]
+    if last_date is None:
+        return STATEMENT_START_DATE
+    start = pd.Timestamp(last_date) - pd.DateOffset(months=3 * RESTATEMENT_QUARTERS) + timedelta(days=1)
+    return max(start, pd.Timestamp(STATEMENT_START_DATE)).strftime('%Y-%m-%d')
+
+
+def load_statement_pivot(symbol, dataset, db_path=DEFAULT_DB_PATH):
+    """
+    讀取財報寬表 (每季一列、每個科目一欄)
+
+    寬表在第一次讀取時由長表轉換並保留在記憶體中，
+    長表的數據版本 (見 get_statement_version) 未改變時直接返回，不再讀取長表與 pivot。
+
+    返回:
+        DataFrame: 依日期由新到舊排序的寬表副本，無數據時返回 None
+    """
+    version = get_statement_version(symbol, dataset, db_path)
+    if version[0] is None:
+        return None
+
+    key = (db_path, symbol, dataset)
+    with _pivot_lock:
+        cached = _pivot_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1].copy()
+
+    pivot = pivot_statements(load_statements(symbol, dataset, db_path))
+    with _pivot_lock:
+        _pivot_cache.pop(key, None)
+        _pivot_cache[key] = (version, pivot)
+        # 超過上限時淘汰最早放入的寬表
+        while len(_pivot_cache) > MAX_PIVOT_ENTRIES:
+            _pivot_cache.pop(next(iter(_pivot_cache)))
+    return pivot.copy()
+
+
+def pivot_statements(long_df):
+    """
+    將財報長表轉為每季一列、每個科目一欄的寬表
+
+    返回:
+        DataFrame: 依日期由新到舊排序 (與原本 get_financial_statements 的輸出相同)
+    """
+    df_pivot = long_df.pivot_table(
+        index='date',
+        columns='type',
+        values='value',
+        aggfunc='first'
+    ).reset_index()
+    return df_pivot.sort_values('date', ascending=False).reset_index(drop=True)
+
+
+# ==================== 月營收 ====================
+
+def save_revenue(symbol, df, db_path=DEFAULT_DB_PATH):
+    """
+    寫入 FinMind 月營收原始數據
+
+    參數:
+        symbol: 股票代碼
+        df: 含 date, revenue_year, revenue_month, revenue 欄位的 DataFrame
+        db_path: SQLite 檔案路徑
+
+    返回:
+        int: 寫入筆數
+    """
+    if df is None or df.empty:
+        return 0
+
+    revenue = pd.to_numeric(df['revenue'], errors='coerce')
+    records = [
+        (symbol, date.strftime('%Y-%m-%d'), int(year), int(month), None if value != value else float(value))
+        for date, year, month, value in zip(
+            pd.to_datetime(df['date']), df['revenue_year'], df['revenue_month'], revenue
+        )
+    ]
+
+    with closing(_connect(db_path)) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO monthly_revenue (symbol, date, revenue_year, revenue_month, revenue) "
+            "VALUES (?, ?, ?, ?, ?)",
+            records,
+        )
+    return len(records)
+
+
+def load_revenue(symbol, start_date=None, db_path=DEFAULT_DB_PATH):
+    """
+    讀取某檔股票的月營收
+
+    參數:
+        symbol: 股票代碼
+        start_date: 起始公布日期 (YYYY-MM-DD)，None 表示全部
+        db_path: SQLite 檔案路徑
+
+    返回:
+        DataFrame: stock_id, date, revenue_year, revenue_month, revenue
+                   (欄位與 FinMind 回應相同，依日期遞增)，無數據時返回 None
+    """
+    sql = ("SELECT symbol AS stock_id, date, revenue_year, revenue_month, revenue "
+           "FROM monthly_revenue WHERE symbol = ?")
+    params = [symbol]
+    if start_date is not None:
+        sql += " AND date >= ?"
+        params.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(sql + " ORDER BY date", conn, params=params)
+
+    return None if df.empty else df
+
+
+# ==================== 公司基本資料 ====================
+
+def import_companies(path=COMPANY_LIST_PATH, db_path=DEFAULT_DB_PATH):
+    """
+    由公司清單 CSV (公司代號, 公司名稱, 市場) 更新公司資料表
+
+    返回:
+        int: 公司家數
+    """
+    companies = pd.read_csv(path, dtype={'公司代號': str}, encoding='utf-8-sig')
+    markets = companies['市場'] if '市場' in companies.columns else [None] * len(companies)
+    records = [
+        (str(symbol).strip(), str(name).strip(), market)
+        for symbol, name, market in zip(companies['公司代號'], companies['公司名稱'], markets)
+    ]
+
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute("DELETE FROM company")
+        conn.executemany("INSERT INTO company (symbol, name, market) VALUES (?, ?, ?)", records)
+    return len(records)
+
+
+def load_companies(db_path=DEFAULT_DB_PATH):
+    """
+    返回:
+        DataFrame: symbol, name, market (依代碼排序)
+    """
+    return query("SELECT symbol, name, market FROM company ORDER BY symbol", db_path=db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地市場數據倉儲的匯入與查詢")
+    parser.add_argument('--import-companies', nargs='?', const=COMPANY_LIST_PATH, default=None,
+                        metavar='CSV', help="匯入公司清單 CSV")
+    parser.add_argument('--top-revenue', type=int, default=None, metavar='N',
+                        help="列出月營收年增率前 N 名")
+    parser.add_argument('--sql', default=None, help="執行 SQL 查詢並輸出結果")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite 資料庫路徑")
+    args = parser.parse_args()
+
+    if args.import_companies:
+        count = import_companies(args.import_companies, args.db)
+        print(f"已匯入 {count} 家公司")
+
+    started = time.perf_counter()
+    if args.top_revenue:
+        result = top_revenue_growth(args.top_revenue, db_path=args.db)
+    elif args.sql:
+        result = query(args.sql, db_path=args.db)
+    else:
+        return
+    print(result.to_string(index=False))
+    print(f"({len(result)} 筆，{(time.perf_counter() - started) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
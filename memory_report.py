@@ -0,0 +1,126 @@
+"""
+全市場數據記憶體報告
+比較 FinMind 預設型別 (object / float64 / int64、寬表財報) 與 compact_dtypes 精簡型別
+(float32 OHLC、uint 成交量、categorical 代碼、財報長表或稀疏寬表) 的記憶體用量；
+--synthetic 以模擬的全市場數據估算 (本地快取只有少數股票時使用)
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import compact_dtypes
+import market_warehouse
+import price_cache
+
+# ==================== 設定 ====================
+
+# 模擬全市場: 上市櫃家數與交易日數 (約 5 年)
+SYNTHETIC_SYMBOLS = 1900
+SYNTHETIC_DAYS = 1250
+
+# 模擬財報: 季數、全市場會計科目數與每家公司實際使用的科目數
+SYNTHETIC_QUARTERS = 24
+SYNTHETIC_TYPES = 400
+SYNTHETIC_TYPES_PER_COMPANY = 120
+
+
+# ==================== 測試數據 ====================
+
+def make_synthetic_prices(num_symbols=SYNTHETIC_SYMBOLS, num_days=SYNTHETIC_DAYS, seed=0):
+    """
+    返回:
+        DataFrame: 與 FinMind 回應相同型別的全市場日線長表
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=num_days)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.015, (num_days, num_symbols)), axis=0))
+    spread = close * np.abs(rng.normal(0, 0.01, close.shape))
+    return pd.DataFrame({
+        'symbol': np.tile([str(1101 + i) for i in range(num_symbols)], num_days),
+        'date': np.repeat(dates.to_numpy(), num_symbols),
+        'open': (close * (1 + rng.normal(0, 0.005, close.shape))).ravel().round(2),
+        'high': (close + spread).ravel().round(2),
+        'low': (close - spread).ravel().round(2),
+        'close': close.ravel().round(2),
+        'volume': rng.integers(0, 80_000_000, close.size, dtype=np.int64),
+    })
+
+
+def make_synthetic_statements(num_symbols=SYNTHETIC_SYMBOLS, num_quarters=SYNTHETIC_QUARTERS, seed=0):
+    """
+    返回:
+        DataFrame: symbol, dataset, date, type, value 的財報長表 (object / float64 型別)
+    """
+    rng = np.random.default_rng(seed)
+    types = np.array([f'Account{i:03d}' for i in range(SYNTHETIC_TYPES)], dtype=object)
+    dates = pd.date_range('2019-03-31', periods=num_quarters, freq=pd.offsets.QuarterEnd())
+    frames = []
+    for i in range(num_symbols):
+        used = rng.choice(types, SYNTHETIC_TYPES_PER_COMPANY, replace=False)
+        frames.append(pd.DataFrame({
+            'symbol': str(1101 + i),
+            'dataset': 'TaiwanStockBalanceSheet',
+            'date': np.repeat(dates.to_numpy(), len(used)),
+            'type': np.tile(used, num_quarters),
+            'value': rng.uniform(1e6, 1e12, len(used) * num_quarters),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+# ==================== 報告 ====================
+
+def wide_statements(long_df):
+    """每檔股票各自 pivot 後合併 (與逐檔呼叫 get_* 再 concat 的寬表相同)"""
+    return long_df.pivot_table(index=['symbol', 'date'], columns='type', values='value', aggfunc='first')
+
+
+def build_report(prices, statements):
+    """
+    參數:
+        prices: FinMind 預設型別的日線長表 (symbol, date, open, high, low, close, volume)
+        statements: 財報長表 (symbol, dataset, date, type, value)，None 表示略過
+
+    返回:
+        DataFrame: compact_dtypes.memory_report 的結果
+    """
+    compact_prices = compact_dtypes.compact_prices(prices)
+    frames = {
+        '日線長表': (prices, compact_prices),
+        '收盤價面板 (日期 × 股票)': (
+            prices.pivot(index='date', columns='symbol', values='close'),
+            compact_prices.pivot(index='date', columns='symbol', values='close'),
+        ),
+    }
+    if statements is not None and not statements.empty:
+        wide = wide_statements(statements)
+        frames['財報寬表 → 長表'] = (wide, compact_dtypes.compact_statements(statements))
+        frames['財報寬表 → 稀疏寬表'] = (wide, compact_dtypes.sparse_statements(statements))
+    return compact_dtypes.memory_report(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較全市場數據轉換為精簡型別前後的記憶體用量")
+    parser.add_argument('--synthetic', action='store_true', help="使用模擬的全市場數據")
+    parser.add_argument('--symbols', type=int, default=SYNTHETIC_SYMBOLS, help="模擬的股票數")
+    parser.add_argument('--days', type=int, default=SYNTHETIC_DAYS, help="模擬的交易日數")
+    parser.add_argument('--db', default=price_cache.DEFAULT_DB_PATH, help="SQLite 資料庫路徑")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.synthetic:
+        prices = make_synthetic_prices(args.symbols, args.days)
+        statements = make_synthetic_statements(args.symbols)
+    else:
+        prices = price_cache.load_all_prices(db_path=args.db, compact=False)
+        statements = market_warehouse.load_all_statements(db_path=args.db)
+        statements = statements.astype({'symbol': str, 'dataset': str, 'type': str})
+
+    print(build_report(prices, statements).to_string(index=False))
+    print(f"({time.perf_counter() - started:.1f} 秒)")
+
+
+if __name__ == "__main__":
+    main()
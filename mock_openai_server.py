@@ -0,0 +1,145 @@
+"""
+本地 OpenAI 相容模擬伺服器
+回應 POST /v1/chat/completions (含 stream=True 的 SSE 串流)，內容為固定的範例報告，
+供 batch_reports.py --base-url http://127.0.0.1:8011/v1 在不呼叫真實 API 的情況下測試
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==================== 設定 ====================
+
+DEFAULT_PORT = 8011
+
+MOCK_REPORT = """## 📊 技術面分析
+(模擬回應) 價格位於均線之上，RSI 處於中性區間。
+
+## 💰 基本面分析
+(模擬回應) 財務體質穩定。
+
+## 💡 操作建議 (僅供參考)
+(模擬回應) 僅供測試使用，非投資建議。"""
+
+
+# ==================== 伺服器 ====================
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """以固定內容回應 chat.completions 請求"""
+
+    latency = 0.0
+    stats = {'requests': 0, 'max_concurrent': 0}
+    _active = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt_tokens = sum(len(m.get('content', '')) for m in body.get('messages', []))
+        completion_tokens = len(MOCK_REPORT)
+
+        cls = type(self)
+        with cls._lock:
+            cls._active += 1
+            cls.stats['requests'] += 1
+            cls.stats['max_concurrent'] = max(cls.stats['max_concurrent'], cls._active)
+        try:
+            time.sleep(self.latency)
+            usage = {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            }
+            if body.get('stream'):
+                include_usage = (body.get('stream_options') or {}).get('include_usage')
+                self._send_stream(body.get('model', 'mock'), usage if include_usage else None)
+            else:
+                self._send_json({
+                    'id': 'chatcmpl-mock',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'mock'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': MOCK_REPORT},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': usage,
+                })
+        finally:
+            with cls._lock:
+                cls._active -= 1
+
+    def _send_json(self, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model, usage=None):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for line in MOCK_REPORT.splitlines(keepends=True):
+            chunk = {
+                'id': 'chatcmpl-mock',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': line}, 'finish_reason': None}],
+            }
+            self._send_event(chunk)
+        # stream_options.include_usage 時最後送出只含 usage 的 chunk
+        if usage is not None:
+            self._send_event({
+                'id': 'chatcmpl-mock',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [],
+                'usage': usage,
+            })
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+def serve(port=DEFAULT_PORT, latency=0.0):
+    """
+    啟動模擬伺服器 (背景執行緒)
+
+    返回:
+        ThreadingHTTPServer: 呼叫 shutdown() 停止
+    """
+    MockOpenAIHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 相容模擬伺服器")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="監聽埠號")
+    parser.add_argument('--latency', type=float, default=0.0, help="每個請求的模擬延遲秒數")
+    args = parser.parse_args()
+
+    MockOpenAIHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), MockOpenAIHandler)
+    print(f"模擬伺服器: http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+批次 AI 報告瀏覽頁面
+顯示 batch_reports.py 產生的自選股報告
+"""
+
+import pandas as pd
+import streamlit as st
+
+import report_store
+
+st.set_page_config(
+    page_title="批次 AI 報告",
+    page_icon="🗂️",
+    layout="wide"
+)
+
+st.title("🗂️ 批次 AI 報告")
+st.caption("瀏覽以 python batch_reports.py 為自選股清單產生的 AI 綜合分析報告")
+
+runs = report_store.list_report_runs()
+if not runs:
+    st.info("💡 尚無批次報告，請先執行 python batch_reports.py --watchlist watchlist.txt")
+    st.stop()
+
+# ==================== 批次選擇 ====================
+
+run_name = st.selectbox("批次執行", runs, help="依執行時間由新到舊排列")
+summary = report_store.load_run_summary(run_name)
+
+summary_df = pd.DataFrame(summary['reports'])
+succeeded = int((summary_df['status'] == 'ok').sum())
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("成功報告", f"{succeeded}/{len(summary_df)}")
+with col2:
+    st.metric("分析區間", f"{summary['start_date']} ~ {summary['end_date']}")
+with col3:
+    st.metric("模型", summary['model'])
+
+st.dataframe(
+    summary_df.rename(columns={
+        'symbol': '股票代碼', 'status': '狀態', 'cached': '使用快取',
+        'elapsed': '耗時 (秒)', 'error': '錯誤', 'total_tokens': 'Token 數',
+    }),
+    use_container_width=True,
+    hide_index=True
+)
+
+# ==================== 報告內容 ====================
+
+available = summary_df.loc[summary_df['status'] == 'ok', 'symbol'].tolist()
+if not available:
+    st.warning("⚠️ 此批次沒有成功的報告")
+    st.stop()
+
+symbol = st.selectbox("股票", available)
+report = report_store.load_report(run_name, symbol)
+
+st.subheader(f"🤖 {symbol} AI 綜合分析報告")
+st.caption(f"分析區間: {report['first_date']} ~ {report['last_date']}")
+st.markdown(report['report'])
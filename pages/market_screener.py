@@ -0,0 +1,61 @@
+"""
+全市場選股頁面
+在預先計算的指標面板上篩選全體上市櫃股票
+"""
+
+import time
+
+import streamlit as st
+
+import screener
+
+st.set_page_config(
+    page_title="全市場選股",
+    page_icon="🔎",
+    layout="wide"
+)
+
+st.title("🔎 全市場選股")
+st.caption("以預先計算的技術指標面板篩選所有上市櫃股票，不需逐檔呼叫 API")
+
+try:
+    panel_df = screener.load_indicator_panel()
+except FileNotFoundError as e:
+    st.error(f"❌ {str(e)}")
+    st.stop()
+
+columns = screener.available_columns(panel_df)
+latest_date = panel_df['date'].max()
+
+# ==================== 條件設定 ====================
+
+preset = st.selectbox("常用條件", ["自訂"] + list(screener.PRESET_SCREENS.keys()))
+condition = st.text_area(
+    "篩選條件",
+    value=screener.PRESET_SCREENS.get(preset, "RSI < 30 and cross_above(K, D)"),
+    help="可使用欄位: " + ", ".join(columns) + "；加上 _prev 為前一交易日數值，"
+         "cross_above(A, B) / cross_below(A, B) 表示今日穿越"
+)
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    sort_by = st.selectbox("排序欄位", columns, index=columns.index('RSI') if 'RSI' in columns else 0)
+with col2:
+    ascending = st.radio("排序方向", ["遞增", "遞減"], horizontal=True) == "遞增"
+with col3:
+    limit = st.number_input("顯示筆數", min_value=10, max_value=2000, value=50, step=10)
+
+# ==================== 篩選結果 ====================
+
+started = time.perf_counter()
+try:
+    result = screener.screen(condition, panel_df, sort_by=sort_by, ascending=ascending, limit=int(limit))
+except ValueError as e:
+    st.error(f"❌ {str(e)}")
+    st.stop()
+elapsed = time.perf_counter() - started
+
+st.success(f"✅ {latest_date:%Y-%m-%d} 共 {len(result)} 檔符合條件 (耗時 {elapsed * 1000:.0f} 毫秒)")
+display_df = result.copy()
+display_df['date'] = display_df['date'].dt.strftime('%Y-%m-%d')
+st.dataframe(display_df, use_container_width=True, hide_index=True)
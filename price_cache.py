@@ -0,0 +1,331 @@
+"""
+本地股價快取
+以 SQLite 儲存 FinMind 日線數據 (以 symbol + date 為主鍵)，
+讓 get_stock_data 只需下載最後快取日期之後的資料並合併
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import compact_dtypes
+
+# ==================== 設定 ====================
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_DB_PATH = os.path.join(CACHE_DIR, "market_data.db")
+
+# 最早的歷史起始日 (與原本 get_stock_data 的 start_date 一致)
+HISTORY_START_DATE = "2020-01-01"
+
+# 同一檔股票在此時間內已同步過就不再呼叫 API
+SYNC_INTERVAL = timedelta(hours=1)
+
+PRICE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_price (
+    symbol TEXT NOT NULL,
+    date   TEXT NOT NULL,
+    open   REAL,
+    high   REAL,
+    low    REAL,
+    close  REAL,
+    volume INTEGER,
+    PRIMARY KEY (symbol, date)
+);
+CREATE TABLE IF NOT EXISTS price_sync (
+    symbol    TEXT PRIMARY KEY,
+    synced_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot_log (
+    date        TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS indicator_state (
+    symbol    TEXT PRIMARY KEY,
+    last_date TEXT NOT NULL,
+    state     TEXT NOT NULL
+);
+"""
+
+
+# ==================== 內部函數 ====================
+
+def _connect(db_path):
+    """開啟資料庫連線並確保資料表存在"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _write_prices(conn, symbols, df):
+    """
+    在既有交易中寫入日線 (同一天的資料會被新資料覆蓋)
+
+    參數:
+        conn: 資料庫連線
+        symbols: 與 df 逐列對應的股票代碼
+        df: 包含 date, open, high, low, close, volume 的 DataFrame
+
+    返回:
+        int: 寫入的筆數
+    """
+    records = [
+        (symbol, date.strftime('%Y-%m-%d'), float(o), float(h), float(l), float(c), int(v))
+        for symbol, date, o, h, l, c, v in zip(
+            symbols, pd.to_datetime(df['date']), df['open'], df['high'],
+            df['low'], df['close'], df['volume']
+        )
+    ]
+    conn.executemany(
+        "INSERT OR REPLACE INTO stock_price "
+        "(symbol, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        records,
+    )
+    return len(records)
+
+
+# ==================== 公開函數 ====================
+
+def load_prices(symbol, db_path=DEFAULT_DB_PATH):
+    """
+    讀取某檔股票的全部快取日線
+
+    參數:
+        symbol: 股票代碼
+        db_path: SQLite 檔案路徑
+
+    返回:
+        DataFrame: 依日期遞增排序的價格數據，無快取時返回 None
+    """
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(
+            "SELECT date, open, high, low, close, volume FROM stock_price "
+            "WHERE symbol = ? ORDER BY date",
+            conn,
+            params=(symbol,),
+        )
+
+    if df.empty:
+        return None
+
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def load_all_prices(start_date=None, db_path=DEFAULT_DB_PATH, compact=True):
+    """
+    讀取所有股票的快取日線 (長表)
+
+    參數:
+        start_date: 起始日期 (YYYY-MM-DD)，None 表示全部歷史
+        db_path: SQLite 檔案路徑
+        compact: 是否在載入時轉為精簡型別 (compact_dtypes.compact_prices)
+
+    返回:
+        DataFrame: symbol, date, open, high, low, close, volume
+    """
+    query = "SELECT symbol, date, open, high, low, close, volume FROM stock_price"
+    params = ()
+    if start_date is not None:
+        query += " WHERE date >= ?"
+        params = (pd.Timestamp(start_date).strftime('%Y-%m-%d'),)
+
+    with closing(_connect(db_path)) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+
+    df['date'] = pd.to_datetime(df['date'])
+    return compact_dtypes.compact_prices(df) if compact else df
+
+
+def get_last_cached_date(symbol, db_path=DEFAULT_DB_PATH):
+    """
+    取得某檔股票最後一筆快取的日期
+
+    返回:
+        Timestamp: 最後日期，無快取時返回 None
+    """
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(
+            "SELECT MAX(date) FROM stock_price WHERE symbol = ?", (symbol,)
+        ).fetchone()
+
+    if row is None or row[0] is None:
+        return None
+    return pd.Timestamp(row[0])
+
+
+def save_prices(symbol, df, db_path=DEFAULT_DB_PATH):
+    """
+    將價格數據合併寫入快取 (同一天的資料會被新資料覆蓋)
+
+    參數:
+        symbol: 股票代碼
+        df: 包含 date, open, high, low, close, volume 的 DataFrame
+        db_path: SQLite 檔案路徑
+
+    返回:
+        int: 寫入的筆數
+    """
+    if df is None or df.empty:
+        return 0
+
+    with closing(_connect(db_path)) as conn, conn:
+        return _write_prices(conn, [symbol] * len(df), df)
+
+
+def get_last_cached_dates(db_path=DEFAULT_DB_PATH):
+    """
+    取得所有股票最後一筆快取的日期
+
+    返回:
+        dict: 股票代碼 -> Timestamp
+    """
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute("SELECT symbol, MAX(date) FROM stock_price GROUP BY symbol").fetchall()
+    return {symbol: pd.Timestamp(date) for symbol, date in rows}
+
+
+def save_market_snapshot(df, db_path=DEFAULT_DB_PATH, synced_at=None):
+    """
+    在單一交易中寫入多檔股票的價格並標記為已同步
+
+    參數:
+        df: 包含 symbol, date, open, high, low, close, volume 的 DataFrame
+        db_path: SQLite 檔案路徑
+        synced_at: 同步時間，預設為現在
+
+    返回:
+        int: 寫入的筆數
+    """
+    if df is None or df.empty:
+        return 0
+
+    synced_at = (synced_at or datetime.now()).isoformat(timespec='seconds')
+
+    with closing(_connect(db_path)) as conn, conn:
+        written = _write_prices(conn, df['symbol'], df)
+        conn.executemany(
+            "INSERT OR REPLACE INTO price_sync (symbol, synced_at) VALUES (?, ?)",
+            [(symbol, synced_at) for symbol in df['symbol'].unique()],
+        )
+
+    return written
+
+
+def log_snapshot(date, source, rows, db_path=DEFAULT_DB_PATH):
+    """記錄某交易日的全市場快照已匯入"""
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshot_log (date, source, rows, ingested_at) VALUES (?, ?, ?, ?)",
+            (pd.Timestamp(date).strftime('%Y-%m-%d'), source, rows,
+             datetime.now().isoformat(timespec='seconds')),
+        )
+
+
+def is_snapshot_ingested(date, db_path=DEFAULT_DB_PATH):
+    """判斷某交易日的全市場快照是否已匯入"""
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM snapshot_log WHERE date = ?", (pd.Timestamp(date).strftime('%Y-%m-%d'),)
+        ).fetchone()
+    return row is not None
+
+
+def mark_synced(symbol, db_path=DEFAULT_DB_PATH, synced_at=None):
+    """記錄某檔股票最後一次向 API 同步的時間"""
+    synced_at = synced_at or datetime.now()
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO price_sync (symbol, synced_at) VALUES (?, ?)",
+            (symbol, synced_at.isoformat(timespec='seconds')),
+        )
+
+
+def needs_sync(symbol, db_path=DEFAULT_DB_PATH, interval=SYNC_INTERVAL, now=None):
+    """
+    判斷快取是否需要向 API 補抓新資料
+
+    返回:
+        bool: 尚未同步過或距上次同步超過 interval 時為 True
+    """
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(
+            "SELECT synced_at FROM price_sync WHERE symbol = ?", (symbol,)
+        ).fetchone()
+
+    if row is None:
+        return True
+
+    now = now or datetime.now()
+    return now - datetime.fromisoformat(row[0]) >= interval
+
+
+def get_fetch_start_date(symbol, db_path=DEFAULT_DB_PATH):
+    """
+    計算增量下載的起始日期
+
+    從最後快取日期 (含當天) 開始重抓，讓盤中寫入的最後一根 K 棒能被收盤資料覆蓋；
+    無快取時從 HISTORY_START_DATE 開始完整下載。
+
+    返回:
+        str: YYYY-MM-DD 格式的起始日期
+    """
+    last_date = get_last_cached_date(symbol, db_path)
+    if last_date is None:
+        return HISTORY_START_DATE
+    return last_date.strftime('%Y-%m-%d')
+
+
+def load_indicator_state(symbol, db_path=DEFAULT_DB_PATH):
+    """
+    讀取某檔股票的串流指標狀態
+
+    返回:
+        str: 狀態 JSON 字串，無狀態時返回 None
+    """
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(
+            "SELECT state FROM indicator_state WHERE symbol = ?", (symbol,)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def save_indicator_state(symbol, state_json, last_date, db_path=DEFAULT_DB_PATH):
+    """
+    儲存某檔股票的串流指標狀態
+
+    參數:
+        symbol: 股票代碼
+        state_json: 狀態 JSON 字串 (streaming_indicators.IndicatorState.to_json)
+        last_date: 狀態已處理到的最後日期
+        db_path: SQLite 檔案路徑
+    """
+    with closing(_connect(db_path)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO indicator_state (symbol, last_date, state) VALUES (?, ?, ?)",
+            (symbol, pd.Timestamp(last_date).strftime('%Y-%m-%d'), state_json),
+        )
+
+
+def clear_cache(symbol=None, db_path=DEFAULT_DB_PATH):
+    """清除指定股票 (或全部) 的價格快取"""
+    with closing(_connect(db_path)) as conn, conn:
+        if symbol is None:
+            conn.execute("DELETE FROM stock_price")
+            conn.execute("DELETE FROM price_sync")
+            conn.execute("DELETE FROM indicator_state")
+            conn.execute("DELETE FROM snapshot_log")
+        else:
+            conn.execute("DELETE FROM stock_price WHERE symbol = ?", (symbol,))
+            conn.execute("DELETE FROM price_sync WHERE symbol = ?", (symbol,))
+            conn.execute("DELETE FROM indicator_state WHERE symbol = ?", (symbol,))
@@ -0,0 +1,286 @@
+"""
+AI 綜合分析提示語建構
+以固定小數位的 CSV 表格與衍生摘要 (區間高低點、均線乖離、量能、指標交叉) 取代原始 JSON，
+送出前計算 token 數，超過預算時依序減少表格列數與財務明細
+"""
+
+import pandas as pd
+
+import ai_client
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# ==================== 設定 ====================
+
+# 系統訊息 + 使用者提示語的 token 預算
+DEFAULT_TOKEN_BUDGET = 2500
+
+# 超過預算時依序嘗試的表格列數
+TABLE_ROW_STEPS = (10, 5, 3, 0)
+
+# 表格欄位 -> 小數位數 (成交量另轉為張)
+TABLE_COLUMNS = {
+    'open': 2, 'high': 2, 'low': 2, 'close': 2,
+    'MA5': 2, 'MA20': 2, 'MA60': 2,
+    'RSI': 1, 'K': 1, 'D': 1,
+    'MACD': 2, 'MACD_Hist': 2, 'WillR': 1,
+}
+
+SYSTEM_MESSAGE = """你是專業股票分析師，精通技術分析與基本面分析，使用繁體中文回答。
+職責: 客觀描述歷史走勢與指標狀態、解讀量價變化、分析財務狀況、整合技術面與基本面並指出協同或背離，依專業知識提供短中長期建議並表明僅供參考。
+原則: 以歷史數據與已知事實為依據，客觀中立、用語專業易懂；使用「歷史數據顯示」「技術指標反映」「財務數據呈現」等描述；強調分析的局限性與「歷史表現不代表未來結果」，內容僅供教育研究參考，不構成投資建議。"""
+
+REPORT_OUTLINE = """## 🎯 請依以下架構詳細分析:
+1. 目前位階: 價格在區間的位置、與各均線的關係、關鍵支撐/壓力區間
+2. 量價關係: 量價配合度、價漲量增/價跌量縮等型態、異常成交量的時間點與意義
+3. 技術指標解讀:
+   3.1 KD: 數值與交叉、超買(>80)/超賣(<20)、鈍化、訊號
+   3.2 MACD: 與 Signal 的位置、柱狀圖趨勢、黃金/死亡交叉、背離
+   3.3 威廉指標: %R 位置、超買超賣、與價格配合度
+   3.4 RSI: 數值與趨勢、超買超賣、背離
+4. 型態: K 線組合 (紅三兵、黑三鴉、十字星等)、反轉或延續型態、缺口
+5. 支撐與壓力: 各列 3 個關鍵價位並說明理由，評估強弱
+6. 趨勢: 短期 (5-10日)、中期 (20-60日)、長期 (>60日) 多頭/空頭/盤整及一致性
+7. 基本面與技術面整合 (如有財務數據): 是否協同、價格與財務表現一致性、綜合評估
+8. ⚠️ 風險: 主要風險因子、警訊、風險等級 (高/中/低)
+
+### 短期操作建議 (1-5個交易日): 操作方向 (偏多/偏空/觀望)、進場參考價位區間、停損與停利參考價位 (含百分比)、依據
+### 中期操作建議 (1-4週): 操作方向、目標價位區間、停損參考、依據
+### 長期投資建議 (1個月以上): 是否適合長期持有、目標價位、結合基本面與技術面的依據
+
+最後附上重要聲明: 分析基於歷史數據僅供參考學習、價位與建議為參考值非投資建議、歷史表現不代表未來結果、投資人應自行判斷並承擔風險。"""
+
+_encoders = {}
+
+
+# ==================== Token 計算 ====================
+
+def count_tokens(text, model=ai_client.DEFAULT_MODEL):
+    """
+    計算文字的 token 數
+
+    已安裝 tiktoken 時使用模型對應的編碼精確計算，否則以 ai_client.estimate_tokens 估算。
+
+    返回:
+        int: token 數
+    """
+    if tiktoken is None:
+        return ai_client.estimate_tokens(text)
+
+    if model not in _encoders:
+        try:
+            _encoders[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encoders[model] = tiktoken.get_encoding("o200k_base")
+    return len(_encoders[model].encode(text))
+
+
+# ==================== 數據格式化 ====================
+
+def _fmt(value, decimals=2, suffix=""):
+    """數值格式化，缺值顯示 N/A"""
+    if value is None or pd.isna(value):
+        return "N/A"
+    return f"{value:.{decimals}f}{suffix}"
+
+
+def format_indicator_table(stock_data, rows=10):
+    """
+    將最近數筆價格與指標轉為固定小數位的 CSV
+
+    參數:
+        stock_data: 含技術指標的 DataFrame
+        rows: 列數
+
+    返回:
+        str: 含標題列的 CSV，rows 為 0 時為空字串
+    """
+    if rows <= 0:
+        return ""
+
+    recent = stock_data.tail(rows)
+    table = pd.DataFrame({'date': recent['date'].dt.strftime('%Y-%m-%d')})
+    for column, decimals in TABLE_COLUMNS.items():
+        if column in recent.columns:
+            table[column] = recent[column].round(decimals)
+    # 成交量以張 (千股) 表示
+    table['vol_lots'] = (recent['volume'] / 1000).round().astype('Int64')
+    return table.to_csv(index=False, na_rep='', float_format='%g', lineterminator='\n').strip()
+
+
+def _last_cross(fast, slow, dates):
+    """找出最後一次交叉的日期與方向"""
+    diff = (fast - slow).to_numpy()
+    for i in range(len(diff) - 1, 0, -1):
+        if pd.isna(diff[i]) or pd.isna(diff[i - 1]):
+            continue
+        if diff[i] > 0 >= diff[i - 1]:
+            return f"{dates.iloc[i]:%Y-%m-%d} 黃金交叉"
+        if diff[i] < 0 <= diff[i - 1]:
+            return f"{dates.iloc[i]:%Y-%m-%d} 死亡交叉"
+    return "區間內無交叉"
+
+
+def summarize_indicators(stock_data, rsi_period=14):
+    """
+    由整個分析區間計算衍生摘要，讓模型不需逐列閱讀原始數據
+
+    參數:
+        stock_data: 含所有技術指標的股票數據 DataFrame
+        rsi_period: RSI 週期 (標示於摘要中)
+
+    返回:
+        str: 多行摘要文字
+    """
+    latest = stock_data.iloc[-1]
+    close = stock_data['close']
+    dates = stock_data['date']
+    high_idx, low_idx = stock_data['high'].idxmax(), stock_data['low'].idxmin()
+    period_high, period_low = stock_data.loc[high_idx, 'high'], stock_data.loc[low_idx, 'low']
+    span = period_high - period_low
+    position = (latest['close'] - period_low) / span * 100 if span > 0 else 50.0
+
+    def change(days):
+        return (close.iloc[-1] / close.iloc[-1 - days] - 1) * 100 if len(close) > days else None
+
+    def bias(column):
+        return (latest['close'] / latest[column] - 1) * 100 if column in latest and latest[column] else None
+
+    ma_values = [latest.get(c) for c in ('MA5', 'MA10', 'MA20', 'MA60')]
+    if any(pd.isna(v) for v in ma_values):
+        alignment = "數據不足"
+    elif all(a > b for a, b in zip(ma_values, ma_values[1:])):
+        alignment = "多頭排列"
+    elif all(a < b for a, b in zip(ma_values, ma_values[1:])):
+        alignment = "空頭排列"
+    else:
+        alignment = "糾結"
+
+    volume = stock_data['volume']
+    volume_ratio = volume.tail(5).mean() / volume.tail(20).mean() if volume.tail(20).mean() else None
+    hist = stock_data['MACD_Hist'].tail(3).to_numpy()
+    hist_trend = ("擴大" if abs(hist[-1]) > abs(hist[0]) else "收斂") if len(hist) == 3 and not pd.isna(hist).any() else "N/A"
+    rsi_prev = stock_data['RSI'].iloc[-6] if len(stock_data) > 5 else None
+
+    rsi = latest['RSI']
+    rsi_status = "數據不足" if pd.isna(rsi) else "超買" if rsi >= 70 else "超賣" if rsi <= 30 else "正常"
+    willr = latest['WillR']
+    willr_status = "" if pd.isna(willr) else " 超買區域" if willr > -20 else " 超賣區域" if willr < -80 else ""
+
+    lines = [
+        f"- 區間高點 {_fmt(period_high)} ({dates[high_idx]:%Y-%m-%d})，低點 {_fmt(period_low)} ({dates[low_idx]:%Y-%m-%d})，"
+        f"收盤位於區間 {_fmt(position, 0)}% 位置",
+        f"- 漲跌幅: 5日 {_fmt(change(5), 2, '%')}，20日 {_fmt(change(20), 2, '%')}",
+        f"- 均線: {alignment}；乖離 MA5 {_fmt(bias('MA5'), 2, '%')}、MA20 {_fmt(bias('MA20'), 2, '%')}、MA60 {_fmt(bias('MA60'), 2, '%')}",
+        f"- 量能: 5日均量 / 20日均量 = {_fmt(volume_ratio, 2)}",
+        f"- RSI({rsi_period}) {_fmt(rsi, 1)} ({rsi_status})，5日前 {_fmt(rsi_prev, 1)}",
+        f"- KD: K {_fmt(latest['K'], 1)}、D {_fmt(latest['D'], 1)}，最近交叉: {_last_cross(stock_data['K'], stock_data['D'], dates)}",
+        f"- MACD {_fmt(latest['MACD'], 2)}、Signal {_fmt(latest['MACD_Signal'], 2)}，柱狀圖 {_fmt(latest['MACD_Hist'], 2)} ({hist_trend})，"
+        f"最近交叉: {_last_cross(stock_data['MACD'], stock_data['MACD_Signal'], dates)}",
+        f"- 威廉指標 {_fmt(willr, 1)}{willr_status}",
+    ]
+    return "\n".join(lines)
+
+
+def format_fundamentals(fscore_result=None, financial_ratios=None, detailed=True):
+    """
+    將 F-Score 與財務比率轉為精簡文字
+
+    參數:
+        detailed: False 時只保留 F-Score 總分與比率，不列出各項評分
+
+    返回:
+        str: 財務摘要，無數據時為「基本面數據不足」
+    """
+    lines = []
+    if fscore_result:
+        lines.append(f"- Piotroski F-Score: {fscore_result['total_score']}/{fscore_result.get('max_score', 9)}")
+        if detailed:
+            for key, val in fscore_result['details'].items():
+                if isinstance(val, dict):
+                    mark = "✓" if val.get('score') else "✗"
+                    lines.append(f"  - {key} {mark}" + (f" ({val['value']})" if 'value' in val else ""))
+                else:
+                    lines.append(f"  - {key}: {val}")
+
+    if financial_ratios:
+        ratio_text = []
+        for key, val in financial_ratios.items():
+            if isinstance(val, float):
+                ratio_text.append(f"{key} {val:.2f}" + ("" if key in ('EPS', '流動比率') else "%"))
+            else:
+                ratio_text.append(f"{key} {val}")
+        lines.append("- 財務比率: " + "、".join(ratio_text))
+
+    return "\n".join(lines) if lines else "基本面數據不足"
+
+
+# ==================== 提示語組合 ====================
+
+def _user_prompt(symbol, first_date, last_date, start_price, end_price, price_change, summary,
+                 table, rows, fundamentals):
+    table_section = f"### 📈 最近 {rows} 個交易日 (CSV，vol_lots 單位為張)\n{table}\n\n" if table else ""
+    return f"""請根據以下數據進行**詳細專業的綜合分析**:
+
+### 📊 基本資訊
+- 股票代號: {symbol}，分析期間 {first_date} 至 {last_date}
+- 期間價格變化: {price_change:.2f}% (NT${start_price:.2f} → NT${end_price:.2f})，當前價位 NT${end_price:.2f}
+
+### 📐 技術指標摘要
+{summary}
+
+{table_section}### 💰 基本面
+{fundamentals}
+
+{REPORT_OUTLINE}"""
+
+
+def build_prompt(symbol, stock_data, start_price, end_price, price_change, first_date, last_date,
+                 fscore_result=None, financial_ratios=None, token_budget=DEFAULT_TOKEN_BUDGET,
+                 model=ai_client.DEFAULT_MODEL, rsi_period=14):
+    """
+    組合符合 token 預算的提示語
+
+    超過預算時依 TABLE_ROW_STEPS 減少表格列數，仍超過時改為只列 F-Score 總分；
+    摘要與分析架構一律保留，因此極小的預算仍可能超出 (會標示 over_budget)。
+
+    參數:
+        symbol: 股票代碼
+        stock_data: 含所有技術指標的股票數據 DataFrame
+        start_price / end_price / price_change / first_date / last_date: 區間資訊
+        fscore_result: F-Score 分析結果 (選填)
+        financial_ratios: 財務比率 (選填)
+        token_budget: 系統訊息 + 使用者提示語的 token 上限
+        model: 計算 token 時使用的模型
+        rsi_period: stock_data 中 RSI 的週期 (寫入提示語，因此也是快取鍵的一部分)
+
+    返回:
+        dict: system_message, user_prompt, data_table (快取鍵使用的精簡數據)、
+              tokens, table_rows, over_budget
+    """
+    summary = summarize_indicators(stock_data, rsi_period)
+    system_tokens = count_tokens(SYSTEM_MESSAGE, model)
+
+    for detailed in (True, False):
+        fundamentals = format_fundamentals(fscore_result, financial_ratios, detailed)
+        for rows in TABLE_ROW_STEPS:
+            table = format_indicator_table(stock_data, rows)
+            user_prompt = _user_prompt(symbol, first_date, last_date, start_price, end_price,
+                                       price_change, summary, table, rows, fundamentals)
+            tokens = system_tokens + count_tokens(user_prompt, model)
+            if tokens <= token_budget:
+                break
+        if tokens <= token_budget:
+            break
+
+    return {
+        'system_message': SYSTEM_MESSAGE,
+        'user_prompt': user_prompt,
+        'data_table': summary + "\n" + table,
+        'tokens': tokens,
+        'table_rows': rows,
+        'over_budget': tokens > token_budget,
+    }
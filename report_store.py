@@ -0,0 +1,94 @@
+"""
+批次 AI 報告的讀寫
+每次批次執行寫入 reports/<YYYYMMDD-HHMMSS>/ (同一秒內的其他執行加上 -2、-3 … 後綴)，內含 summary.json 與每檔股票的 <代碼>.json / <代碼>.md
+"""
+
+import json
+import os
+import re
+
+# ==================== 設定 ====================
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+
+_RUN_DIR_PATTERN = re.compile(r"^\d{8}-\d{6}(-\d+)?$")
+
+
+# ==================== 寫入 ====================
+
+def create_run_dir(started_at, output_dir=REPORTS_DIR):
+    """
+    建立批次執行目錄
+
+    目錄名稱精確到秒；同一秒內已有其他執行時依序加上 -2、-3 … 後綴，
+    不會寫入其他執行的目錄而覆蓋彼此的報告。
+
+    返回:
+        str: 目錄路徑
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    name = started_at.strftime('%Y%m%d-%H%M%S')
+    suffix = 1
+    while True:
+        run_dir = os.path.join(output_dir, name if suffix == 1 else f"{name}-{suffix}")
+        try:
+            os.mkdir(run_dir)
+            return run_dir
+        except FileExistsError:
+            suffix += 1
+
+
+def write_report(run_dir, result):
+    """將單一股票的結果寫成 <代碼>.json，成功時另寫 <代碼>.md"""
+    symbol = result['symbol']
+    with open(os.path.join(run_dir, f"{symbol}.json"), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if result['status'] == 'ok':
+        with open(os.path.join(run_dir, f"{symbol}.md"), 'w', encoding='utf-8') as f:
+            f.write(f"# {symbol} AI 綜合分析報告\n\n")
+            f.write(f"分析區間: {result['first_date']} ~ {result['last_date']}｜模型: {result['model']}\n\n")
+            f.write(result['report'])
+            f.write("\n")
+
+
+def write_summary(run_dir, summary):
+    """寫入批次摘要 summary.json"""
+    with open(os.path.join(run_dir, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+# ==================== 讀取 ====================
+
+def list_report_runs(output_dir=REPORTS_DIR):
+    """
+    返回:
+        list: 已完成的批次執行目錄名稱 (新到舊)
+    """
+    if not os.path.isdir(output_dir):
+        return []
+    return sorted(
+        (name for name in os.listdir(output_dir)
+         if _RUN_DIR_PATTERN.match(name) and os.path.exists(os.path.join(output_dir, name, "summary.json"))),
+        # 同一秒內的執行依後綴數字排序 (-10 在 -9 之後)
+        key=lambda name: (name[:15], int(name[16:] or 1)),
+        reverse=True,
+    )
+
+
+def load_run_summary(run_name, output_dir=REPORTS_DIR):
+    """
+    返回:
+        dict: 批次執行的 summary.json 內容
+    """
+    with open(os.path.join(output_dir, run_name, "summary.json"), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_report(run_name, symbol, output_dir=REPORTS_DIR):
+    """
+    返回:
+        dict: 單一股票的報告 JSON
+    """
+    with open(os.path.join(output_dir, run_name, f"{symbol}.json"), encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,162 @@
+"""
+全市場選股器
+在 market_batch.py 預先計算的指標面板上，以向量化布林遮罩評估使用者條件，
+不需逐檔呼叫 API
+
+條件語法為 pandas 表達式，可使用所有指標欄位與其前一日數值 (欄位名加上 _prev)，
+並支援 cross_above(A, B) / cross_below(A, B) 表示今日 A 穿越 B，例如:
+    RSI < 30 and cross_above(K, D)
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from market_batch import COMPANY_LIST_PATH, PANEL_PATH
+
+# ==================== 設定 ====================
+
+# 常用選股條件
+PRESET_SCREENS = {
+    "RSI 超賣且 KD 黃金交叉": "RSI < 30 and cross_above(K, D)",
+    "KD 黃金交叉": "cross_above(K, D)",
+    "KD 死亡交叉": "cross_below(K, D)",
+    "MACD 黃金交叉": "cross_above(MACD, MACD_Signal)",
+    "站上 MA20 且 MA5 > MA20": "cross_above(close, MA20) and MA5 > MA20",
+    "威廉指標超賣": "WillR < -80",
+    "RSI 超買": "RSI > 70",
+}
+
+# 尋找前一交易日數值時回看的交易日數
+LOOKBACK_DAYS = 10
+
+_CROSS_PATTERN = re.compile(r"cross_(above|below)\(\s*(\w+)\s*,\s*(\w+)\s*\)")
+
+_panel_cache = {}
+
+
+# ==================== 數據載入 ====================
+
+def load_indicator_panel(path=PANEL_PATH):
+    """
+    讀取指標面板 (依檔案修改時間快取於記憶體，檔案更新後自動重新載入)
+
+    返回:
+        DataFrame: market_batch.run_batch 輸出的長表
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到指標面板 {path}，請先執行 python market_batch.py")
+
+    mtime = os.path.getmtime(path)
+    cached = _panel_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        _panel_cache[path] = (mtime, pd.read_parquet(path))
+    return _panel_cache[path][1]
+
+
+def load_company_names(path=COMPANY_LIST_PATH):
+    """
+    返回:
+        DataFrame: symbol, 公司名稱, 市場
+    """
+    companies = pd.read_csv(path, dtype={'公司代號': str}, encoding='utf-8-sig')
+    return companies.rename(columns={'公司代號': 'symbol'})
+
+
+def latest_cross_section(panel_df, as_of=None):
+    """
+    取出每檔股票在指定日期的數據，並附上前一個交易日的數值
+
+    參數:
+        panel_df: 指標面板長表
+        as_of: 日期，None 表示面板中最新的交易日
+
+    返回:
+        DataFrame: 每檔股票一列；原欄位外另有 <欄位>_prev
+    """
+    as_of = panel_df['date'].max() if as_of is None else pd.Timestamp(as_of)
+
+    # 只需最近幾個交易日即可找到前一筆 (停牌數日的股票仍能取得停牌前的數值)
+    dates = np.unique(panel_df['date'].to_numpy())
+    dates = dates[dates <= np.datetime64(as_of)][-LOOKBACK_DAYS:]
+    history = panel_df[panel_df['date'].isin(dates)]
+
+    # 每檔股票最後兩筆 (今日與前一交易日)
+    last_two = history.sort_values(['symbol', 'date']).groupby('symbol', sort=False).tail(2)
+    today = last_two.groupby('symbol', sort=False).tail(1)
+    today = today[today['date'] == as_of]
+
+    previous = last_two.drop(index=today.index).set_index('symbol')
+    value_columns = [c for c in panel_df.columns if c not in ('date', 'symbol')]
+    previous = previous[value_columns].add_suffix('_prev')
+
+    return today.set_index('symbol').join(previous).reset_index()
+
+
+# ==================== 條件評估 ====================
+
+def expand_condition(condition):
+    """
+    將 cross_above / cross_below 展開為一般比較式
+
+    返回:
+        str: 可交給 DataFrame.eval 的表達式
+    """
+    def replace(match):
+        direction, left, right = match.groups()
+        if direction == 'above':
+            return f"(({left} > {right}) & ({left}_prev <= {right}_prev))"
+        return f"(({left} < {right}) & ({left}_prev >= {right}_prev))"
+
+    return _CROSS_PATTERN.sub(replace, condition)
+
+
+def screen(condition, panel_df=None, sort_by=None, ascending=True, limit=50, as_of=None):
+    """
+    依條件篩選全市場股票
+
+    參數:
+        condition: 條件表達式 (見模組說明)
+        panel_df: 指標面板長表，None 時讀取預設路徑
+        sort_by: 排序欄位，None 表示依股票代碼
+        ascending: 是否遞增排序
+        limit: 最多返回筆數，None 表示全部
+        as_of: 篩選日期，None 表示最新交易日
+
+    返回:
+        DataFrame: 符合條件的股票 (含公司名稱與所有指標)
+    """
+    if panel_df is None:
+        panel_df = load_indicator_panel()
+
+    cross_section = latest_cross_section(panel_df, as_of)
+
+    try:
+        mask = cross_section.eval(expand_condition(condition))
+    except Exception as e:
+        raise ValueError(f"條件無法解析: {condition} ({e})") from e
+
+    if not isinstance(mask, pd.Series) or mask.dtype != bool:
+        raise ValueError(f"條件必須產生布林值: {condition}")
+
+    result = cross_section[mask.to_numpy()]
+    result = result.sort_values(sort_by or 'symbol', ascending=ascending, na_position='last')
+    if limit is not None:
+        result = result.head(limit)
+
+    names = load_company_names()
+    result = result.merge(names, on='symbol', how='left')
+    leading = ['symbol', '公司名稱', '市場', 'date']
+    others = [c for c in result.columns if c not in leading and not c.endswith('_prev')]
+    return result[leading + others].reset_index(drop=True)
+
+
+def available_columns(panel_df):
+    """
+    返回:
+        list: 條件與排序可用的欄位 (不含 _prev)
+    """
+    return [c for c in panel_df.columns if c not in ('date', 'symbol')
+            and np.issubdtype(panel_df[c].dtype, np.number)]
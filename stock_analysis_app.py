@@ -7,11 +7,27 @@ AI 股票綜合分析系統
 import streamlit as st
 import requests
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import time
 import json
-from openai import OpenAI
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import ai_cache
+import app_cache
+import ai_client
+import chart_helpers
+import fscore_store
+import fundamentals
+import http_client
+import market_warehouse
+import price_cache
+import prompt_builder
+import symbol_index
+from indicators import compute_indicators_for_range, default_indicator_spec
 
 # ==================== 頁面設定 ====================
 st.set_page_config(
@@ -24,7 +40,11 @@ st.set_page_config(
 
 def get_stock_data(symbol, token=""):
     """
-    從 FinMind API 獲取台股歷史數據
+    從 FinMind API 獲取台股歷史數據 (經由本地快取增量更新)
+
+    第一次查詢會下載 2020-01-01 起的完整歷史並寫入快取，
+    之後只下載最後快取日期之後的資料並合併。
+    不以 st.cache_data 記憶：SQLite 讀取很快，且需反映同步間隔後的增量更新與每日快照匯入。
 
     參數:
         symbol: 股票代碼 (台股代碼，例如: 2330)
@@ -33,24 +53,32 @@ def get_stock_data(symbol, token=""):
     返回:
         DataFrame: 包含歷史價格數據的 DataFrame
     """
-    try:
-        # FinMind API 端點 - 獲取台股歷史日線數據
-        url = "https://api.finmindtrade.com/api/v4/data"
-
-        params = {
-            "dataset": "TaiwanStockPrice",
-            "data_id": symbol,
-            "start_date": "2020-01-01",  # 獲取較長時間的數據
-            "token": token or ""  # 使用輸入的 Token，可提升配額
-        }
+    # 快取在同步間隔內直接使用，不呼叫 API
+    if not price_cache.needs_sync(symbol):
+        cached_df = price_cache.load_prices(symbol)
+        if cached_df is not None:
+            return cached_df
 
-        response = requests.get(url, params=params, timeout=10)
+    try:
+        # FinMind API - 獲取台股歷史日線數據 (使用輸入的 Token 可提升配額)
+        response = http_client.finmind_request(
+            "TaiwanStockPrice",
+            data_id=symbol,
+            start_date=price_cache.get_fetch_start_date(symbol),  # 只抓快取之後的數據
+            token=token
+        )
         response.raise_for_status()
 
         data = response.json()
 
         # 檢查 API 響應
         if 'data' not in data or len(data['data']) == 0:
+            # 已有快取時代表沒有新資料 (例如假日)，直接使用快取
+            cached_df = price_cache.load_prices(symbol)
+            if cached_df is not None:
+                price_cache.mark_synced(symbol)
+                return cached_df
+
             st.error(f"❌ 找不到股票代碼 {symbol} 的數據，請檢查股票代碼是否正確")
             st.info("💡 請輸入有效的台股代碼，例如: 2330 (台積電)、2317 (鴻海)、2454 (聯發科)")
             st.info(f"HTTP 狀態碼: {response.status_code}")
@@ -75,11 +103,31 @@ def get_stock_data(symbol, token=""):
         })
 
         # 選擇需要的欄位
-        df = df[['date', 'open', 'high', 'low', 'close', 'volume']]
+        df = df[price_cache.PRICE_COLUMNS]
 
-        return df
+        # 合併寫入快取後讀回完整歷史
+        price_cache.save_prices(symbol, df)
+        price_cache.mark_synced(symbol)
 
+        return price_cache.load_prices(symbol)
+
+    except http_client.FinMindRateLimitError as e:
+        # 配額用盡時若有快取則退回使用快取
+        cached_df = price_cache.load_prices(symbol)
+        if cached_df is not None:
+            st.warning(f"⚠️ {str(e)}，改用本地快取數據")
+            return cached_df
+
+        st.error(f"❌ {str(e)}")
+        st.info("💡 請稍後再試，或輸入 FinMind API Token 以提升請求限制")
+        return None
     except requests.exceptions.RequestException as e:
+        # 網路錯誤時若有快取則退回使用快取
+        cached_df = price_cache.load_prices(symbol)
+        if cached_df is not None:
+            st.warning(f"⚠️ API 連線錯誤，改用本地快取數據: {str(e)}")
+            return cached_df
+
         st.error(f"❌ API 連線錯誤: {str(e)}")
         st.info("💡 請檢查網路連線是否正常")
         try:
@@ -127,68 +175,6 @@ def filter_by_date_range(df, start_date, end_date):
     return filtered_df
 
 
-def get_moving_averages(df):
-    """
-    計算移動平均線（MA5, MA10, MA20, MA60）
-
-    參數:
-        df: 包含收盤價的 DataFrame
-
-    返回:
-        DataFrame: 添加了移動平均線的 DataFrame
-    """
-    if df is None or df.empty:
-        return None
-
-    df = df.copy()
-
-    # 計算移動平均線
-    df['MA5'] = df['close'].rolling(window=5, min_periods=1).mean()
-    df['MA10'] = df['close'].rolling(window=10, min_periods=1).mean()
-    df['MA20'] = df['close'].rolling(window=20, min_periods=1).mean()
-    df['MA60'] = df['close'].rolling(window=60, min_periods=1).mean()
-
-    return df
-
-
-def calculate_rsi(df, period=14):
-    """
-    計算 RSI (相對強弱指標)
-
-    參數:
-        df: 包含收盤價的 DataFrame
-        period: RSI 計算週期，預設為 14 天
-
-    返回:
-        DataFrame: 添加了 RSI 指標的 DataFrame
-
-    RSI 計算公式:
-    RSI = 100 - (100 / (1 + RS))
-    其中 RS = 平均漲幅 / 平均跌幅
-    """
-    if df is None or df.empty:
-        return None
-
-    df = df.copy()
-
-    # 計算價格變化
-    delta = df['close'].diff()
-
-    # 分離漲幅和跌幅
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-
-    # 計算平均漲幅和平均跌幅
-    avg_gain = gain.rolling(window=period, min_periods=period).mean()
-    avg_loss = loss.rolling(window=period, min_periods=period).mean()
-
-    # 計算 RS 和 RSI
-    rs = avg_gain / avg_loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-
-    return df
-
-
 def get_rsi_status(rsi_value):
     """
     判斷 RSI 狀態
@@ -209,219 +195,77 @@ def get_rsi_status(rsi_value):
         return "正常", "blue"
 
 
-def calculate_kd(df, n=9, m1=3, m2=3):
-    """
-    計算 KD 指標 (隨機指標)
-
-    參數:
-        df: 包含 high, low, close 的 DataFrame
-        n: RSV 計算週期，預設 9
-        m1: K 值平滑參數，預設 3
-        m2: D 值平滑參數，預設 3
-
-    返回:
-        DataFrame: 添加了 K, D 指標的 DataFrame
-    """
-    if df is None or df.empty:
-        return None
-
-    df = df.copy()
-
-    # 計算 RSV (未成熟隨機值)
-    low_min = df['low'].rolling(window=n, min_periods=n).min()
-    high_max = df['high'].rolling(window=n, min_periods=n).max()
-
-    df['RSV'] = 100 * (df['close'] - low_min) / (high_max - low_min)
-
-    # 計算 K 值 (RSV 的移動平均)
-    df['K'] = df['RSV'].ewm(span=m1, adjust=False).mean()
-
-    # 計算 D 值 (K 值的移動平均)
-    df['D'] = df['K'].ewm(span=m2, adjust=False).mean()
-
-    return df
-
-
-def calculate_macd(df, fast=12, slow=26, signal=9):
-    """
-    計算 MACD 指標 (指數平滑異同移動平均線)
-
-    參數:
-        df: 包含收盤價的 DataFrame
-        fast: 快速 EMA 週期，預設 12
-        slow: 慢速 EMA 週期，預設 26
-        signal: 信號線週期，預設 9
+# ==================== 財務分析函數 ====================
 
-    返回:
-        DataFrame: 添加了 MACD, Signal, Histogram 的 DataFrame
+def get_statement_dataset(dataset, symbol, token=""):
     """
-    if df is None or df.empty:
-        return None
-
-    df = df.copy()
-
-    # 計算快速和慢速 EMA
-    ema_fast = df['close'].ewm(span=fast, adjust=False).mean()
-    ema_slow = df['close'].ewm(span=slow, adjust=False).mean()
-
-    # MACD 線 = 快速 EMA - 慢速 EMA
-    df['MACD'] = ema_fast - ema_slow
-
-    # 信號線 = MACD 的 EMA
-    df['MACD_Signal'] = df['MACD'].ewm(span=signal, adjust=False).mean()
+    經由本地倉儲獲取 FinMind 財報數據
 
-    # 柱狀圖 = MACD - 信號線
-    df['MACD_Hist'] = df['MACD'] - df['MACD_Signal']
-
-    return df
-
-
-def calculate_willr(df, period=14):
-    """
-    計算威廉指標 (Williams %R)
+    原始長表 (date, type, value) 保存在 market_warehouse，同步間隔過後只下載
+    最近幾季 (取得重編的數值) 與更新的財報；寬表由倉儲轉換一次後保留在記憶體中，
+    重複查詢既不呼叫 API 也不重新 pivot，因此不再以 st.cache_data 記憶
+    (記憶會讓倉儲同步間隔後新公布的季報在行程內延遲數週才出現)。API 失敗 (配額用盡、連線或回應錯誤) 時顯示警告並使用倉儲中既有的數據。
 
     參數:
-        df: 包含 high, low, close 的 DataFrame
-        period: 計算週期，預設 14
+        dataset: FinMind 財報數據集名稱
+        symbol: 股票代碼
+        token: FinMind API Token
 
     返回:
-        DataFrame: 添加了 WillR 指標的 DataFrame
-
-    威廉指標公式:
-    %R = -100 * (最高價 - 收盤價) / (最高價 - 最低價)
+        DataFrame: 每季一列、每個科目一欄 (依日期由新到舊)，無數據時返回 None
     """
-    if df is None or df.empty:
-        return None
-
-    df = df.copy()
-
-    # 計算週期內的最高價和最低價
-    high_max = df['high'].rolling(window=period, min_periods=period).max()
-    low_min = df['low'].rolling(window=period, min_periods=period).min()
+    if market_warehouse.needs_sync(symbol, dataset):
+        try:
+            start_date = market_warehouse.get_statement_fetch_start_date(symbol, dataset)
+            response = http_client.finmind_request(
+                dataset,
+                data_id=symbol,
+                start_date=start_date,  # 最近幾季與之後的季度
+                token=token
+            )
+            response.raise_for_status()
+            data = response.json()
 
-    # 計算威廉指標
-    df['WillR'] = -100 * (high_max - df['close']) / (high_max - low_min)
+            if 'data' in data and len(data['data']) > 0:
+                market_warehouse.save_statements(symbol, dataset, pd.DataFrame(data['data']))
+                market_warehouse.mark_synced(symbol, dataset)
+            elif start_date != market_warehouse.STATEMENT_START_DATE:
+                # 已有快取時代表尚未公布新的季報
+                market_warehouse.mark_synced(symbol, dataset)
 
-    return df
+        except http_client.FinMindRateLimitError as e:
+            st.warning(f"⚠️ {str(e)}，{dataset} 改用本地倉儲數據")
+        except Exception as e:
+            # 連線、HTTP 狀態或 JSON 解析錯誤
+            st.warning(f"⚠️ {dataset} 更新失敗，改用本地倉儲數據: {str(e)}")
 
+    return market_warehouse.load_statement_pivot(symbol, dataset)
 
-# ==================== 財務分析函數 ====================
 
 def get_financial_statements(symbol, token=""):
     """從 FinMind API 獲取財務報表數據"""
-    try:
-        url = "https://api.finmindtrade.com/api/v4/data"
-        params = {
-            "dataset": "TaiwanStockFinancialStatements",
-            "data_id": symbol,
-            "start_date": "2019-01-01",
-            "token": token
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-
-        if 'data' not in data or len(data['data']) == 0:
-            return None
-
-        df = pd.DataFrame(data['data'])
-        df['value'] = pd.to_numeric(df['value'], errors='coerce')
-        df['date'] = pd.to_datetime(df['date'])
-        df_pivot = df.pivot_table(
-            index='date',
-            columns='type',
-            values='value',
-            aggfunc='first'
-        ).reset_index()
-
-        return df_pivot.sort_values('date', ascending=False).reset_index(drop=True)
-
-    except Exception as e:
-        return None
+    return get_statement_dataset("TaiwanStockFinancialStatements", symbol, token)
 
 
 def get_balance_sheet(symbol, token=""):
     """從 FinMind API 獲取資產負債表數據"""
-    try:
-        url = "https://api.finmindtrade.com/api/v4/data"
-        params = {
-            "dataset": "TaiwanStockBalanceSheet",
-            "data_id": symbol,
-            "start_date": "2019-01-01",
-            "token": token
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+    return get_statement_dataset("TaiwanStockBalanceSheet", symbol, token)
 
-        if 'data' not in data or len(data['data']) == 0:
-            return None
 
-        df = pd.DataFrame(data['data'])
-        df['value'] = pd.to_numeric(df['value'], errors='coerce')
-        df['date'] = pd.to_datetime(df['date'])
-        df_pivot = df.pivot_table(
-            index='date',
-            columns='type',
-            values='value',
-            aggfunc='first'
-        ).reset_index()
-
-        return df_pivot.sort_values('date', ascending=False).reset_index(drop=True)
-
-    except Exception as e:
-        return None
+def get_cash_flow_statement(symbol, token=""):
+    """從 FinMind API 獲取現金流量表數據 (年初至今累計數)"""
+    return get_statement_dataset("TaiwanStockCashFlowsStatement", symbol, token)
 
 
+@app_cache.cached("財務比率", app_cache.COMPUTE_TTL)
 def calculate_financial_ratios(income_df, balance_df):
-    """計算基本財務比率"""
+    """計算基本財務比率 (最新一季)"""
     try:
         if income_df is None or balance_df is None or len(income_df) == 0 or len(balance_df) == 0:
             return None
 
-        current_income = income_df.iloc[0]
-        current_balance = balance_df.iloc[0]
-
-        ratios = {}
-        total_assets = current_balance.get('TotalAssets', current_balance.get('Assets'))
-        equity = current_balance.get('Equity')
-        liabilities = current_balance.get('Liabilities')
-        current_assets = current_balance.get('CurrentAssets')
-        current_liabilities = current_balance.get('CurrentLiabilities')
-
-        # ROE (股東權益報酬率)
-        if 'IncomeAfterTaxes' in current_income and equity:
-            roe = (current_income['IncomeAfterTaxes'] / equity * 100) if equity > 0 else 0
-            ratios['ROE'] = roe
-
-        # ROA (資產報酬率)
-        if 'IncomeAfterTaxes' in current_income and total_assets:
-            roa = (current_income['IncomeAfterTaxes'] / total_assets * 100) if total_assets > 0 else 0
-            ratios['ROA'] = roa
-
-        # 毛利率
-        if 'GrossProfit' in current_income and 'Revenue' in current_income:
-            gpm = (current_income['GrossProfit'] / current_income['Revenue'] * 100) if current_income['Revenue'] > 0 else 0
-            ratios['毛利率'] = gpm
-
-        # 淨利率
-        if 'IncomeAfterTaxes' in current_income and 'Revenue' in current_income:
-            npm = (current_income['IncomeAfterTaxes'] / current_income['Revenue'] * 100) if current_income['Revenue'] > 0 else 0
-            ratios['淨利率'] = npm
-
-        # 流動比率
-        if current_assets is not None and current_liabilities is not None:
-            cr = (current_assets / current_liabilities) if current_liabilities > 0 else 0
-            ratios['流動比率'] = cr
-
-        # 負債比率
-        if liabilities is not None and total_assets:
-            dr = (liabilities / total_assets * 100) if total_assets > 0 else 0
-            ratios['負債比率'] = dr
-
-        # EPS
-        if 'EPS' in current_income:
-            ratios['EPS'] = current_income['EPS']
-
-        return ratios
+        table = fundamentals.compute_quarterly_fundamentals(income_df, balance_df)
+        return fundamentals.latest_ratios(table)
 
     except Exception as e:
         return None
@@ -431,6 +275,8 @@ def get_monthly_revenue(symbol, token=""):
     """
     獲取月營收數據
 
+    經由本地倉儲讀取，同步間隔過後才向 FinMind 補抓 (不以 st.cache_data 記憶，新公布的營收在同步後即可看到)。
+
     參數:
         symbol: 股票代碼
         token: FinMind API Token
@@ -438,30 +284,38 @@ def get_monthly_revenue(symbol, token=""):
     返回:
         DataFrame: 月營收數據
     """
+    start_date = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')  # 改為2年數據以計算年增率
     try:
-        url = "https://api.finmindtrade.com/api/v4/data"
-        params = {
-            "dataset": "TaiwanStockMonthRevenue",
-            "data_id": symbol,
-            "start_date": (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d'),  # 改為2年數據以計算年增率
-            "token": token
-        }
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        # 同步間隔內直接讀取本地倉儲
+        if market_warehouse.needs_sync(symbol, market_warehouse.REVENUE_DATASET):
+            response = http_client.finmind_request(
+                market_warehouse.REVENUE_DATASET,
+                data_id=symbol,
+                start_date=start_date,
+                token=token
+            )
+            data = response.json()
 
-        if 'data' not in data or len(data['data']) == 0:
-            st.warning(f"⚠️ 月營收數據獲取狀況: {data.get('msg', '無數據')}")
-            return None
+            if 'data' not in data or len(data['data']) == 0:
+                st.warning(f"⚠️ 月營收數據獲取狀況: {data.get('msg', '無數據')}")
+                return None
 
-        df = pd.DataFrame(data['data'])
+            df = pd.DataFrame(data['data'])
 
-        if 'revenue' not in df.columns:
-            st.warning(f"⚠️ 月營收欄位缺失，取得欄位: {list(df.columns)}")
-            st.write("原始回應前2筆：", data.get('data', [])[:2])
-            return None
-        if 'revenue_month' not in df.columns:
-            st.warning(f"⚠️ 月營收日期欄位缺失，取得欄位: {list(df.columns)}")
-            st.write("原始回應前2筆：", data.get('data', [])[:2])
+            if 'revenue' not in df.columns:
+                st.warning(f"⚠️ 月營收欄位缺失，取得欄位: {list(df.columns)}")
+                st.write("原始回應前2筆：", data.get('data', [])[:2])
+                return None
+            if 'revenue_month' not in df.columns:
+                st.warning(f"⚠️ 月營收日期欄位缺失，取得欄位: {list(df.columns)}")
+                st.write("原始回應前2筆：", data.get('data', [])[:2])
+                return None
+
+            market_warehouse.save_revenue(symbol, df)
+            market_warehouse.mark_synced(symbol, market_warehouse.REVENUE_DATASET)
+
+        df = market_warehouse.load_revenue(symbol, start_date)
+        if df is None:
             return None
 
         df['revenue'] = pd.to_numeric(df['revenue'], errors='coerce')
@@ -491,6 +345,7 @@ def get_monthly_revenue(symbol, token=""):
         return None
 
 
+@app_cache.cached("EPS 趨勢", app_cache.COMPUTE_TTL)
 def calculate_eps_trend(income_df):
     """
     計算近5季 EPS 趨勢（含季增、年增）
@@ -502,23 +357,13 @@ def calculate_eps_trend(income_df):
         DataFrame: EPS 趨勢數據
     """
     try:
-        if income_df is None or len(income_df) < 5:
-            return None
-
-        df = income_df.sort_values('date', ascending=False).head(5).copy().reset_index(drop=True)
-
-        if 'EPS' not in df.columns:
+        if income_df is None or len(income_df) < 5 or 'EPS' not in income_df.columns:
             return None
 
-        df['EPS'] = pd.to_numeric(df['EPS'], errors='coerce')
-
-        prev_eps = df['EPS'].shift(-1)
-        year_ago_eps = df['EPS'].shift(-4)
-
-        df['QoQ'] = ((df['EPS'] - prev_eps) / prev_eps.abs() * 100).where(prev_eps != 0)
-        df['YoY'] = ((df['EPS'] - year_ago_eps) / year_ago_eps.abs() * 100).where(year_ago_eps != 0)
-
-        return df[['date', 'EPS', 'QoQ', 'YoY']]
+        table = fundamentals.compute_quarterly_fundamentals(income_df)
+        return table.head(5)[['date', 'EPS', 'EPS_QoQ', 'EPS_YoY']].rename(
+            columns={'EPS_QoQ': 'QoQ', 'EPS_YoY': 'YoY'}
+        )
 
     except Exception as e:
         return None
@@ -540,6 +385,7 @@ def calculate_pe_ratio(current_price, eps):
     return None
 
 
+@app_cache.cached("利潤率趨勢", app_cache.COMPUTE_TTL)
 def calculate_margin_trends(income_df):
     """
     計算近4季毛利率與營益率趨勢
@@ -554,85 +400,61 @@ def calculate_margin_trends(income_df):
         if income_df is None or len(income_df) < 4:
             return None
 
-        df = income_df.sort_values('date', ascending=False).head(4).copy().reset_index(drop=True)
-        df = df.iloc[::-1]  # 取最近4季，反轉為時間順序
+        table = fundamentals.compute_quarterly_fundamentals(income_df)
+        if '毛利率' not in table.columns or '營益率' not in table.columns:
+            return None
 
-        margin_data = []
-        for _, row in df.iterrows():
-            date = row.get('date')
-            revenue = row.get('Revenue', 0)
-            gross_profit = row.get('GrossProfit', 0)
-            operating_income = row.get('OperatingIncome', 0)
+        # 取最近4季，反轉為時間順序
+        return table.head(4)[['date', '毛利率', '營益率']].iloc[::-1].reset_index(drop=True)
 
-            gross_margin = (gross_profit / revenue * 100) if revenue > 0 else 0
-            operating_margin = (operating_income / revenue * 100) if revenue > 0 else 0
+    except Exception as e:
+        return None
 
-            margin_data.append({
-                'date': date,
-                '毛利率': gross_margin,
-                '營益率': operating_margin
-            })
 
-        return pd.DataFrame(margin_data)
+@app_cache.cached("F-Score", app_cache.COMPUTE_TTL)
+def calculate_piotroski_fscore(income_df, balance_df, cashflow_df=None):
+    """計算 Piotroski F-Score (最新一季，變化項目與去年同季比較；缺少數據的條件不計分)"""
+    try:
+        if income_df is None or balance_df is None or len(income_df) < 2 or len(balance_df) < 2:
+            return None
+
+        table = fundamentals.compute_quarterly_fundamentals(income_df, balance_df, cashflow_df)
+        return fundamentals.latest_fscore(table)
 
     except Exception as e:
         return None
 
 
-def calculate_piotroski_fscore(income_df, balance_df):
-    """計算 Piotroski F-Score (簡化版)"""
+@app_cache.cached("F-Score 歷史", app_cache.COMPUTE_TTL)
+def calculate_fscore_history(income_df, balance_df, cashflow_df=None):
+    """
+    計算每一季的 F-Score
+
+    返回:
+        DataFrame: date, F_Score, F_Count, F_<條件> (依日期由新到舊)，無數據時返回 None
+    """
     try:
-        if income_df is None or balance_df is None or len(income_df) < 2 or len(balance_df) < 2:
+        if income_df is None or balance_df is None or len(income_df) == 0 or len(balance_df) == 0:
             return None
 
-        score = 0
-        details = {}
-
-        current = income_df.iloc[0]
-        previous = income_df.iloc[1]
-        current_bs = balance_df.iloc[0]
-        previous_bs = balance_df.iloc[1]
-        total_assets_current = current_bs.get('TotalAssets', current_bs.get('Assets', 0))
-        total_assets_prev = previous_bs.get('TotalAssets', previous_bs.get('Assets', 0))
-
-        # 1. ROA 正值
-        if 'IncomeAfterTaxes' in current and total_assets_current:
-            roa = current['IncomeAfterTaxes'] / total_assets_current if total_assets_current > 0 else 0
-            if roa > 0:
-                score += 1
-            details['ROA正值'] = {'score': 1 if roa > 0 else 0, 'value': f"{roa:.2%}"}
-
-        # 2. 淨利正值
-        if 'IncomeAfterTaxes' in current:
-            if current['IncomeAfterTaxes'] > 0:
-                score += 1
-            details['淨利正值'] = {'score': 1 if current['IncomeAfterTaxes'] > 0 else 0}
-
-        # 3. ROA 年增
-        if all(k in current and k in previous for k in ['IncomeAfterTaxes']):
-            if total_assets_current is not None and total_assets_prev is not None:
-                roa_current = current['IncomeAfterTaxes'] / total_assets_current if total_assets_current > 0 else 0
-                roa_prev = previous['IncomeAfterTaxes'] / total_assets_prev if total_assets_prev > 0 else 0
-                if roa_current > roa_prev:
-                    score += 1
-                details['ROA年增'] = {'score': 1 if roa_current > roa_prev else 0}
-
-        # 4. 毛利率改善
-        if all(k in current and k in previous for k in ['GrossProfit', 'Revenue']):
-            gpm_current = current['GrossProfit'] / current['Revenue'] if current['Revenue'] > 0 else 0
-            gpm_prev = previous['GrossProfit'] / previous['Revenue'] if previous['Revenue'] > 0 else 0
-            if gpm_current > gpm_prev:
-                score += 1
-            details['毛利率改善'] = {'score': 1 if gpm_current > gpm_prev else 0}
-
-        return {'total_score': score, 'max_score': 9, 'details': details}
+        table = fundamentals.compute_quarterly_fundamentals(income_df, balance_df, cashflow_df)
+        return fundamentals.fscore_history(table)
 
     except Exception as e:
         return None
 
 
+def build_ai_messages(system_message, user_prompt):
+    """
+    返回:
+        list: chat.completions 的對話訊息 (系統設定與提示語合併為單一使用者訊息)
+    """
+    return [{"role": "user", "content": system_message + "\n\n" + user_prompt}]
+
+
 def generate_ai_insights(symbol, stock_data, start_price, end_price, price_change, first_date, last_date,
-                         openai_api_key, fscore_result=None, financial_ratios=None):
+                         openai_api_key, fscore_result=None, financial_ratios=None, force_refresh=False,
+                         token_budget=prompt_builder.DEFAULT_TOKEN_BUDGET, rsi_period=14):
     """
     使用 OpenAI 進行綜合分析（技術分析 + 財務分析）
 
@@ -647,212 +469,44 @@ def generate_ai_insights(symbol, stock_data, start_price, end_price, price_chang
         openai_api_key: OpenAI API 金鑰
         fscore_result: F-Score 分析結果 (選填)
         financial_ratios: 財務比率 (選填)
+        force_refresh: 忽略快取並重新生成
+        token_budget: 提示語的 token 預算
+        rsi_period: stock_data 中 RSI 的週期
 
     返回:
-        str: AI 分析結果
+        str: AI 分析結果 (已在呼叫處逐字渲染)
     """
     try:
-        # 初始化 OpenAI 客戶端
-        client = OpenAI(api_key=openai_api_key)
-
-        # 準備數據 - 轉換為 JSON 格式（包含所有技術指標）
-        data_for_ai = stock_data[['date', 'open', 'high', 'low', 'close', 'volume',
-                                    'MA5', 'MA10', 'MA20', 'MA60',
-                                    'RSI', 'K', 'D', 'MACD', 'MACD_Signal', 'MACD_Hist', 'WillR']].copy()
-        data_for_ai['date'] = data_for_ai['date'].dt.strftime('%Y-%m-%d')
-        data_json = data_for_ai.tail(10).to_json(orient='records', indent=2, force_ascii=False)
-
-        # 獲取最新指標值
-        latest_rsi = stock_data['RSI'].iloc[-1] if not pd.isna(stock_data['RSI'].iloc[-1]) else None
-        latest_k = stock_data['K'].iloc[-1] if not pd.isna(stock_data['K'].iloc[-1]) else None
-        latest_d = stock_data['D'].iloc[-1] if not pd.isna(stock_data['D'].iloc[-1]) else None
-        latest_macd = stock_data['MACD'].iloc[-1] if not pd.isna(stock_data['MACD'].iloc[-1]) else None
-        latest_macd_signal = stock_data['MACD_Signal'].iloc[-1] if not pd.isna(stock_data['MACD_Signal'].iloc[-1]) else None
-        latest_willr = stock_data['WillR'].iloc[-1] if not pd.isna(stock_data['WillR'].iloc[-1]) else None
-
-        rsi_status, _ = get_rsi_status(latest_rsi)
-
-        # 準備財務數據資訊
-        fundamental_info = ""
-        if fscore_result:
-            fundamental_info += f"\n### Piotroski F-Score\n總分: {fscore_result['total_score']}/9\n"
-            for key, val in fscore_result['details'].items():
-                fundamental_info += f"- {key}: {val}\n"
-
-        if financial_ratios:
-            fundamental_info += "\n### 財務比率\n"
-            for key, val in financial_ratios.items():
-                if isinstance(val, float):
-                    fundamental_info += f"- {key}: {val:.2f}%\n" if key != 'EPS' and key != '流動比率' else f"- {key}: {val:.2f}\n"
-                else:
-                    fundamental_info += f"- {key}: {val}\n"
-
-        # 系統角色設定
-        system_message = """你是一位專業的股票分析師,同時精通技術分析和基本面分析。你的職責包括:
-
-1. 客觀描述股票價格的歷史走勢和技術指標狀態
-2. 解讀歷史市場數據和交易量變化模式
-3. 分析財務數據和企業經營狀況
-4. 整合技術面與基本面進行綜合評估
-5. 識別技術面與基本面的協同或背離
-6. 依照專業的知識給予使用者股票代碼的建議
-
-重要原則:
-- 提供預測和建議時,必須基於歷史數據和已知事實
-- 保持完全客觀中立的分析態度
-- 使用專業術語但保持易懂
-- 所有分析僅供教育和研究目的
-- 強調分析的局限性和不確定性
-- 記得告訴用戶AI分析僅供參考,歷史表現不代表未來結果
-- 使用繁體中文回答
-
-嚴格的表達方式要求:
-- 使用「歷史數據顯示」、「技術指標反映」、「財務數據呈現」等客觀描述
-- 避免「可能性」、「預期」、「建議」、「關注」等暗示性用詞
-- 描述技術位階和財務狀況的歷史表現
-- 強調「歷史表現不代表未來結果」
-- 避免任何可能被解讀為操作指引的表達
-- 繼續現有資訊提供短中長期的投資建議，並表明僅供參考
-
-免責聲明:所提供的分析內容純粹基於歷史數據的解讀,僅供教育和研究參考,不構成任何投資建議或未來走勢預測。歷史表現不代表未來結果。"""
-
-        # 用戶提示語 - 準備所有指標的當前狀態
-        indicators_info = f"""
-**當前技術指標狀態:**
-- RSI: {latest_rsi:.2f} ({rsi_status}) {f'- RSI > 70 超買' if latest_rsi and latest_rsi >= 70 else f'- RSI < 30 超賣' if latest_rsi and latest_rsi <= 30 else ''}
-- KD 指標: K值 {latest_k:.2f}, D值 {latest_d:.2f} {f'- K > D 多頭' if latest_k and latest_d and latest_k > latest_d else '- K < D 空頭' if latest_k and latest_d else ''}
-- MACD: {latest_macd:.4f}, Signal: {latest_macd_signal:.4f} {f'- MACD > Signal 多頭' if latest_macd and latest_macd_signal and latest_macd > latest_macd_signal else '- MACD < Signal 空頭' if latest_macd and latest_macd_signal else ''}
-- 威廉指標: {latest_willr:.2f} {f'- 超買區域' if latest_willr and latest_willr > -20 else f'- 超賣區域' if latest_willr and latest_willr < -80 else ''}
-"""
-
-        user_prompt = f"""您是資深股票分析師，請根據以下數據進行**詳細專業的綜合分析**:
-
-### 📊 基本資訊
-- 股票代號: {symbol}
-- 分析期間: {first_date} 至 {last_date}
-- 期間價格變化: {price_change:.2f}% (從 NT${start_price:.2f} → NT${end_price:.2f})
-- 當前價位: NT${end_price:.2f}
-
-{indicators_info}
-
-### 📈 技術分析數據 (最近10筆完整數據)
-{data_json}
-
-### 💰 基本面分析數據
-{fundamental_info if fundamental_info else '基本面數據不足'}
-
----
-
-## 🎯 請按照以下架構進行**詳細分析**:
-
-### 1. 目前位階分析
-- 當前價格在歷史區間的位置 (高點/低點/中間)
-- 相對於各均線的位置關係
-- 價格所處的關鍵支撐/壓力區間
-
-### 2. 量價關係分析
-- 成交量與價格變動的配合度
-- 是否出現價漲量增、價跌量縮等健康型態
-- 異常成交量的時間點和意義
-
-### 3. 技術指標詳細解讀
-
-#### 3.1 KD 指標分析
-- K值與D值的當前數值和交叉狀態
-- 是否處於超買(>80)或超賣(<20)區域
-- 鈍化現象的判斷
-- KD 指標給出的訊號
-
-#### 3.2 MACD 指標分析
-- MACD 與 Signal 線的相對位置
-- 柱狀圖(Histogram)的變化趨勢
-- 是否出現黃金交叉或死亡交叉
-- MACD 背離現象的觀察
-
-#### 3.3 威廉指標分析
-- 當前 %R 值的位置
-- 超買超賣狀態判斷
-- 與價格的配合度
-
-#### 3.4 RSI 指標分析
-- RSI 的當前數值和趨勢
-- 超買超賣判斷
-- RSI 背離的觀察
-
-### 4. 型態分析
-- K線組合型態 (如紅三兵、黑三鴉、十字星等)
-- 是否形成重要的反轉或延續型態
-- 缺口的觀察
-
-### 5. 支撐與壓力分析
-- **關鍵支撐位**: 列出3個重要支撐價位並說明理由
-- **關鍵壓力位**: 列出3個重要壓力價位並說明理由
-- 支撐壓力的強弱程度評估
-
-### 6. 趨勢判斷
-- **短期趨勢** (5-10日): 多頭/空頭/盤整
-- **中期趨勢** (20-60日): 多頭/空頭/盤整
-- **長期趨勢** (>60日): 多頭/空頭/盤整
-- 各週期趨勢的一致性分析
-
-### 7. 基本面與技術面整合 (如有財務數據)
-- 技術面與基本面是否協同
-- 價格表現與財務狀況的一致性
-- 綜合評估
-
-### 8. ⚠️ 風險評估
-- 當前主要風險因子
-- 需注意的警訊
-- 風險等級評估 (高/中/低)
-
-### 短期操作建議 (1-5個交易日)
-- **操作方向**: 偏多/偏空/觀望
-- **進場參考價位**: NT$ XXX - XXX
-- **停損參考價位**: NT$ XXX (下跌X%)
-- **停利參考價位**: NT$ XXX (上漲X%)
-- **依據**: 基於XXX指標顯示...
-
-### 中期操作建議 (1-4週)
-- **操作方向**: 偏多/偏空/觀望
-- **目標價位區間**: NT$ XXX - XXX
-- **停損參考**: NT$ XXX
-- **依據**: 基於XXX趨勢...
-
-### 長期投資建議 (1個月以上)
-- **投資價值評估**: 適合/不適合長期持有
-- **目標價位**: NT$ XXX
-- **依據**: 結合基本面和技術面...
-
-
----
-
-## 💡 操作建議 (僅供參考)
-
-
-
-
-
----
-
-**重要聲明**:
-- 以上分析純粹基於歷史數據的技術分析，僅供參考學習
-- 所有價位和建議都是基於當前數據的參考值，非投資建議
-- 歷史表現不代表未來結果
-- 投資人應自行判斷並承擔投資風險
-
-請提供專業、詳細且結構化的分析報告。"""
-
-        # 調用 OpenAI API
-        with st.spinner("🤖 AI 正在分析中..."):
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "user", "content": system_message + "\n\n" + user_prompt}
-                ]
-            )
+        # 取得共用的 OpenAI 客戶端 (重用連線池)
+        client = ai_client.get_client(openai_api_key)
+
+        # 以精簡格式組合提示語並控制在 token 預算內
+        model = ai_client.DEFAULT_MODEL
+        prompt = prompt_builder.build_prompt(
+            symbol, stock_data, start_price, end_price, price_change, first_date, last_date,
+            fscore_result, financial_ratios, token_budget, model, rsi_period
+        )
 
-            analysis = response.choices[0].message.content
-            return analysis
+        # 輸入完全相同時直接使用快取的分析結果
+        cache_key = ai_cache.make_key(model, prompt['system_message'], prompt['user_prompt'], prompt['data_table'])
+        cached = None if force_refresh else ai_cache.get_response(cache_key)
+        if cached is not None:
+            st.markdown(cached['response'])
+            st.caption(f"⚡ 使用快取的分析結果 (生成於 {cached['created_at']:%Y-%m-%d %H:%M})，"
+                       "可勾選側邊欄「強制重新生成 AI 分析」更新")
+            return cached['response']
+
+        # 調用 OpenAI API (串流模式，逐字渲染)
+        stream_stats = {}
+        analysis = st.write_stream(ai_client.stream_chat_completion(
+            client,
+            build_ai_messages(prompt['system_message'], prompt['user_prompt']),
+            model=model,
+            stats=stream_stats
+        ))
+        st.caption(f"{ai_client.format_stream_stats(stream_stats)}｜提示語 {prompt['tokens']} tokens")
+        ai_cache.save_response(cache_key, model, analysis)
+        return analysis
 
     except Exception as e:
         st.error(f"❌ AI 分析失敗: {str(e)}")
@@ -860,13 +514,19 @@ def generate_ai_insights(symbol, stock_data, start_price, end_price, price_chang
         return None
 
 
-def plot_advanced_chart(df, symbol):
+def plot_advanced_chart(df, symbol, render_mode='auto'):
     """
     繪製進階圖表：K 線圖 + 移動平均線 + 多種技術指標
 
+    快速模式下折線改用 WebGL (Scattergl) 並以 LTTB 降採樣，
+    K 棒、MACD 柱狀圖與成交量在長期間時彙總為週 K / 月 K，
+    多年期間的圖表 JSON 可由數 MB 降到數百 KB。
+
     參數:
         df: 包含股票數據和所有技術指標的 DataFrame
         symbol: 股票代碼
+        render_mode: 'auto' (超過 chart_helpers.FAST_MODE_THRESHOLD 根 K 棒時使用快速模式)、
+                     'full' (繪製所有資料點) 或 'fast'
 
     返回:
         plotly figure 對象
@@ -874,6 +534,13 @@ def plot_advanced_chart(df, symbol):
     if df is None or df.empty:
         return None
 
+    fast = chart_helpers.resolve_render_mode(render_mode, len(df))
+    bars, bar_label = df, '日K'
+    if fast:
+        offset, bar_label = chart_helpers.choose_bar_interval(len(df))
+        if offset is not None:
+            bars = chart_helpers.resample_ohlc(df, offset, last_columns=['MACD_Hist'])
+
     # 創建子圖表：6 個子圖（K線+MA、RSI、KD、MACD、威廉指標、成交量）
     fig = make_subplots(
         rows=6, cols=1,
@@ -881,7 +548,7 @@ def plot_advanced_chart(df, symbol):
         vertical_spacing=0.03,
         row_heights=[0.35, 0.13, 0.13, 0.13, 0.13, 0.13],
         subplot_titles=(
-            f'{symbol} 股價 K 線圖與技術指標',
+            f'{symbol} 股價 K 線圖與技術指標' + (f' ({bar_label})' if bars is not df else ''),
             'RSI 相對強弱指標',
             'KD 隨機指標',
             'MACD 指標',
@@ -892,45 +559,45 @@ def plot_advanced_chart(df, symbol):
 
     # ========== 第一排：K 線圖和移動平均線 ==========
     fig.add_trace(go.Candlestick(
-        x=df['date'],
-        open=df['open'],
-        high=df['high'],
-        low=df['low'],
-        close=df['close'],
+        x=bars['date'],
+        open=bars['open'],
+        high=bars['high'],
+        low=bars['low'],
+        close=bars['close'],
         name='K線圖',
         increasing_line_color='#ef5350',  # 紅色 = 上漲 (台股習慣)
         decreasing_line_color='#26a69a'   # 綠色 = 下跌 (台股習慣)
     ), row=1, col=1)
 
     # 添加移動平均線
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['MA5'],
-        mode='lines', name='MA5',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['MA5'], fast,
+        name='MA5',
         line=dict(color='#FF6B6B', width=1.5)
     ), row=1, col=1)
 
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['MA10'],
-        mode='lines', name='MA10',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['MA10'], fast,
+        name='MA10',
         line=dict(color='#4ECDC4', width=1.5)
     ), row=1, col=1)
 
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['MA20'],
-        mode='lines', name='MA20',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['MA20'], fast,
+        name='MA20',
         line=dict(color='#45B7D1', width=1.5)
     ), row=1, col=1)
 
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['MA60'],
-        mode='lines', name='MA60',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['MA60'], fast,
+        name='MA60',
         line=dict(color='#FFA07A', width=1.5)
     ), row=1, col=1)
 
     # ========== 第二排：RSI 指標 ==========
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['RSI'],
-        mode='lines', name='RSI',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['RSI'], fast,
+        name='RSI',
         line=dict(color='#2E86DE', width=2)
     ), row=2, col=1)
 
@@ -975,15 +642,15 @@ def plot_advanced_chart(df, symbol):
     )
 
     # ========== 第三排：KD 指標 ==========
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['K'],
-        mode='lines', name='K值',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['K'], fast,
+        name='K值',
         line=dict(color='#FF6B6B', width=2)
     ), row=3, col=1)
 
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['D'],
-        mode='lines', name='D值',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['D'], fast,
+        name='D值',
         line=dict(color='#4ECDC4', width=2)
     ), row=3, col=1)
 
@@ -992,22 +659,22 @@ def plot_advanced_chart(df, symbol):
     fig.add_hline(y=20, line_dash="dash", line_color="green", annotation_text="超賣 (20)", row=3, col=1)
 
     # ========== 第四排：MACD 指標 ==========
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['MACD'],
-        mode='lines', name='MACD',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['MACD'], fast,
+        name='MACD',
         line=dict(color='#2E86DE', width=2)
     ), row=4, col=1)
 
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['MACD_Signal'],
-        mode='lines', name='Signal',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['MACD_Signal'], fast,
+        name='Signal',
         line=dict(color='#FFA07A', width=2)
     ), row=4, col=1)
 
     # MACD 柱狀圖
-    colors_macd = ['#ef5350' if val >= 0 else '#26a69a' for val in df['MACD_Hist']]
+    colors_macd = chart_helpers.sign_colors(bars['MACD_Hist'], chart_helpers.UP_COLOR, chart_helpers.DOWN_COLOR)
     fig.add_trace(go.Bar(
-        x=df['date'], y=df['MACD_Hist'],
+        x=bars['date'], y=bars['MACD_Hist'],
         name='MACD Hist',
         marker_color=colors_macd,
         showlegend=False
@@ -1016,9 +683,9 @@ def plot_advanced_chart(df, symbol):
     fig.add_hline(y=0, line_dash="solid", line_color="gray", line_width=1, row=4, col=1)
 
     # ========== 第五排：威廉指標 ==========
-    fig.add_trace(go.Scatter(
-        x=df['date'], y=df['WillR'],
-        mode='lines', name='Williams %R',
+    fig.add_trace(chart_helpers.line_trace(
+        df['date'], df['WillR'], fast,
+        name='Williams %R',
         line=dict(color='#9B59B6', width=2)
     ), row=5, col=1)
 
@@ -1029,11 +696,10 @@ def plot_advanced_chart(df, symbol):
     fig.add_hrect(y0=-100, y1=-80, fillcolor="green", opacity=0.1, layer="below", line_width=0, row=5, col=1)
 
     # ========== 第六排：成交量 ==========
-    colors = ['#ef5350' if df['close'].iloc[i] >= df['open'].iloc[i] else '#26a69a'
-              for i in range(len(df))]  # 紅色 = 上漲, 綠色 = 下跌 (台股習慣)
+    colors = chart_helpers.candle_colors(bars['open'], bars['close'])  # 紅色 = 上漲, 綠色 = 下跌 (台股習慣)
 
     fig.add_trace(go.Bar(
-        x=df['date'], y=df['volume'],
+        x=bars['date'], y=bars['volume'],
         name='成交量',
         marker_color=colors,
         showlegend=False
@@ -1094,7 +760,7 @@ def plot_fscore_gauge(fscore_data):
         title={'text': "Piotroski F-Score", 'font': {'size': 24}},
         delta={'reference': 5, 'increasing': {'color': "green"}, 'decreasing': {'color': "red"}},
         gauge={
-            'axis': {'range': [None, 9], 'tickwidth': 1, 'tickcolor': "darkblue"},
+            'axis': {'range': [None, fscore_data.get('max_score', 9)], 'tickwidth': 1, 'tickcolor': "darkblue"},
             'bar': {'color': "darkblue"},
             'bgcolor': "white",
             'borderwidth': 2,
@@ -1120,6 +786,57 @@ def plot_fscore_gauge(fscore_data):
     return fig
 
 
+def plot_fscore_history_chart(history_df, quarters=12):
+    """
+    繪製 F-Score 歷史趨勢圖
+
+    參數:
+        history_df: calculate_fscore_history 的結果 (依日期由新到舊)
+        quarters: 顯示的季數
+
+    返回:
+        Plotly Figure 物件
+    """
+    if history_df is None or history_df.empty:
+        return None
+
+    history = history_df.head(quarters).iloc[::-1]
+    labels = history['date'].dt.strftime('%Y-Q%q')
+    colors = np.select(
+        [history['F_Score'] >= 7, history['F_Score'] >= 5],
+        [chart_helpers.POSITIVE_COLOR, '#ffca28'],
+        chart_helpers.NEGATIVE_COLOR,
+    ).tolist()
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=labels,
+        y=history['F_Score'],
+        name='F-Score',
+        marker_color=colors,
+        text=history['F_Score'].tolist(),
+        textposition='outside'
+    ))
+    fig.add_trace(go.Scatter(
+        x=labels,
+        y=history['F_Count'],
+        mode='lines+markers',
+        name='可評估條件數',
+        line=dict(color='gray', width=1, dash='dot'),
+        marker=dict(size=6)
+    ))
+
+    fig.update_layout(
+        title='F-Score 歷史趨勢',
+        height=350,
+        template='plotly_white',
+        yaxis=dict(title='分數', range=[0, fundamentals.FSCORE_MAX + 1]),
+        xaxis_title='季度',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+
+    return fig
+
 def plot_financial_ratios_bar(ratios):
     """
     繪製財務比率橫條圖
@@ -1157,14 +874,14 @@ def plot_financial_ratios_bar(ratios):
     if profitability_metrics:
         metrics = list(profitability_metrics.keys())
         values = list(profitability_metrics.values())
-        colors = ['#66bb6a' if v > 0 else '#ef5350' for v in values]
+        colors = chart_helpers.sign_colors(values, strict=True)
 
         fig.add_trace(go.Bar(
             y=metrics,
             x=values,
             orientation='h',
             marker_color=colors,
-            text=[f"{v:.2f}%" for v in values],
+            text=chart_helpers.format_labels(values, '{:.2f}%'),
             textposition='outside',
             showlegend=False
         ), row=1, col=1)
@@ -1172,24 +889,25 @@ def plot_financial_ratios_bar(ratios):
     # 財務健康指標
     if financial_health_metrics:
         metrics = list(financial_health_metrics.keys())
-        values = list(financial_health_metrics.values())
+        values = np.array(list(financial_health_metrics.values()), dtype=np.float64)
+        is_current = np.array(['流動比率' in k for k in metrics])
+        is_debt = np.array(['負債比率' in k for k in metrics])
+        is_percent = np.array(['%' in k for k in metrics])
 
         # 流動比率 > 1 為好, 負債比率 < 50 為好
-        colors = []
-        for k, v in zip(metrics, values):
-            if '流動比率' in k:
-                colors.append('#66bb6a' if v > 1 else '#ef5350')
-            elif '負債比率' in k:
-                colors.append('#66bb6a' if v < 50 else '#ef5350')
-            else:
-                colors.append('#2196f3')
+        colors = np.select(
+            [is_current, is_debt],
+            [chart_helpers.sign_colors(values - 1, strict=True), chart_helpers.sign_colors(50 - values, strict=True)],
+            default=chart_helpers.NEUTRAL_COLOR
+        ).tolist()
 
         fig.add_trace(go.Bar(
             y=metrics,
             x=values,
             orientation='h',
             marker_color=colors,
-            text=[f"{v:.2f}%" if '%' in k else f"{v:.2f}" for k, v in zip(metrics, values)],
+            text=np.where(is_percent, chart_helpers.format_labels(values, '{:.2f}%'),
+                          chart_helpers.format_labels(values)).tolist(),
             textposition='outside',
             showlegend=False
         ), row=1, col=2)
@@ -1251,7 +969,7 @@ def plot_revenue_profit_trends(income_df):
 
     # 淨利趨勢
     if 'IncomeAfterTaxes' in df.columns:
-        colors = ['#66bb6a' if val >= 0 else '#ef5350' for val in df['IncomeAfterTaxes']]
+        colors = chart_helpers.sign_colors(df['IncomeAfterTaxes'])
 
         fig.add_trace(go.Bar(
             x=df['date'].dt.strftime('%Y-%m'),
@@ -1289,46 +1007,23 @@ def plot_profitability_trends(income_df, balance_df):
     if income_df is None or balance_df is None or income_df.empty or balance_df.empty:
         return None
 
-    # 取最近8季數據，統一排序
-    income_recent = income_df.sort_values('date', ascending=False).head(8).copy().reset_index(drop=True).iloc[::-1]
-    balance_recent = balance_df.sort_values('date', ascending=False).head(8).copy().reset_index(drop=True).iloc[::-1]
-
-    # 合併數據
-    merged = pd.merge(income_recent, balance_recent, on='date', how='inner')
-
-    if merged.empty:
+    # 取同時有資產負債表的最近8季，反轉為時間順序
+    table = fundamentals.compute_quarterly_fundamentals(income_df, balance_df)
+    if 'ROE' not in table.columns or 'ROA' not in table.columns:
         return None
+    recent = table[table['TotalAssets'].notna()].head(8).iloc[::-1]
 
-    # 計算 ROE 和 ROA
-    roe_list = []
-    roa_list = []
-    dates = []
-
-    for _, row in merged.iterrows():
-        net_income = row.get('IncomeAfterTaxes', 0)
-        equity = row.get('Equity', 0)
-        assets = row.get('TotalAssets', row.get('Assets', 0))
-
-        if equity and equity != 0:
-            roe = (net_income / equity) * 100
-            roe_list.append(roe)
-        else:
-            roe_list.append(None)
-
-        if assets and assets != 0:
-            roa = (net_income / assets) * 100
-            roa_list.append(roa)
-        else:
-            roa_list.append(None)
+    if recent.empty:
+        return None
 
-        dates.append(row['date'])
+    periods = recent['date'].dt.strftime('%Y-%m')
 
     # 創建圖表
     fig = go.Figure()
 
     fig.add_trace(go.Scatter(
-        x=[d.strftime('%Y-%m') for d in dates],
-        y=roe_list,
+        x=periods,
+        y=recent['ROE'],
         mode='lines+markers',
         name='ROE (%)',
         line=dict(color='#ff9800', width=3),
@@ -1336,8 +1031,8 @@ def plot_profitability_trends(income_df, balance_df):
     ))
 
     fig.add_trace(go.Scatter(
-        x=[d.strftime('%Y-%m') for d in dates],
-        y=roa_list,
+        x=periods,
+        y=recent['ROA'],
         mode='lines+markers',
         name='ROA (%)',
         line=dict(color='#9c27b0', width=3),
@@ -1392,18 +1087,20 @@ def plot_monthly_revenue_chart(revenue_df):
         y=revenue_df['revenue'],
         name='月營收',
         marker_color='#2196f3',
-        text=revenue_df['revenue'].apply(lambda x: f'{x/1000:.1f}' if x >= 1000 else f'{x:.0f}'),
+        text=np.where(revenue_df['revenue'] >= 1000,
+                      chart_helpers.format_labels(revenue_df['revenue'] / 1000, '{:.1f}'),
+                      chart_helpers.format_labels(revenue_df['revenue'], '{:.0f}')).tolist(),
         textposition='outside'
     ), row=1, col=1)
 
     # 年增率折線圖
-    colors = ['#66bb6a' if val >= 0 else '#ef5350' for val in revenue_df['yoy_growth'].fillna(0)]
+    colors = chart_helpers.sign_colors(revenue_df['yoy_growth'].fillna(0))
     fig.add_trace(go.Bar(
         x=revenue_df['revenue_month'],
         y=revenue_df['yoy_growth'],
         name='年增率',
         marker_color=colors,
-        text=revenue_df['yoy_growth'].apply(lambda x: f'{x:.1f}%' if pd.notna(x) else 'N/A'),
+        text=chart_helpers.format_labels(revenue_df['yoy_growth'], '{:.1f}%'),
         textposition='outside'
     ), row=2, col=1)
 
@@ -1443,13 +1140,13 @@ def plot_eps_trend_chart(eps_df):
     )
 
     # EPS 柱狀圖
-    colors_eps = ['#66bb6a' if val >= 0 else '#ef5350' for val in eps_df['EPS']]
+    colors_eps = chart_helpers.sign_colors(eps_df['EPS'])
     fig.add_trace(go.Bar(
         x=eps_df['date'].dt.strftime('%Y-Q%q'),
         y=eps_df['EPS'],
         name='EPS',
         marker_color=colors_eps,
-        text=eps_df['EPS'].apply(lambda x: f'{x:.2f}'),
+        text=chart_helpers.format_labels(eps_df['EPS']),
         textposition='outside'
     ), row=1, col=1)
 
@@ -1511,7 +1208,7 @@ def plot_margin_comparison_chart(margin_df):
         name='毛利率',
         line=dict(color='#2196f3', width=3),
         marker=dict(size=10),
-        text=margin_df['毛利率'].apply(lambda x: f'{x:.1f}%'),
+        text=chart_helpers.format_labels(margin_df['毛利率'], '{:.1f}%'),
         textposition='top center'
     ))
 
@@ -1522,7 +1219,7 @@ def plot_margin_comparison_chart(margin_df):
         name='營益率',
         line=dict(color='#ff9800', width=3),
         marker=dict(size=10),
-        text=margin_df['營益率'].apply(lambda x: f'{x:.1f}%'),
+        text=chart_helpers.format_labels(margin_df['營益率'], '{:.1f}%'),
         textposition='bottom center'
     ))
 
@@ -1545,8 +1242,562 @@ def plot_margin_comparison_chart(margin_df):
     return fig
 
 
+# ==================== 數據獲取協調 ====================
+
+@app_cache.cached("技術指標", app_cache.COMPUTE_TTL)
+def compute_technical_indicators(stock_data, start_date, end_date, rsi_period=14):
+    """
+    在含暖機區間的歷史上計算所有技術指標，再擷取選擇的日期範圍
+
+    返回:
+        DataFrame: 日期範圍內含技術指標的數據，範圍內無數據時返回 None
+    """
+    return compute_indicators_for_range(
+        stock_data, start_date, end_date, default_indicator_spec(rsi_period)
+    )
+
+
+@app_cache.cached("RSI 週期調整", app_cache.COMPUTE_TTL)
+def compute_rsi_for_range(stock_data, start_date, end_date, rsi_period):
+    """
+    只以新的週期重算日期範圍內的 RSI (其他指標與 RSI 週期無關)
+
+    返回:
+        Series: 與 compute_technical_indicators 結果逐列對齊的 RSI，範圍內無數據時返回 None
+    """
+    rsi_data = compute_indicators_for_range(
+        stock_data, start_date, end_date, [{'name': 'RSI', 'period': rsi_period}]
+    )
+    return None if rsi_data is None else rsi_data['RSI']
+
+
+# 分析所需的 FinMind 數據集: 名稱 -> (顯示名稱, 獲取函數)
+ANALYSIS_DATASETS = {
+    'price': ('股價', get_stock_data),
+    'income': ('損益表', get_financial_statements),
+    'balance': ('資產負債表', get_balance_sheet),
+    'revenue': ('月營收', get_monthly_revenue),
+    'cashflow': ('現金流量表', get_cash_flow_statement),
+}
+
+
+def fetch_analysis_data(symbol, token=""):
+    """
+    同時發出所有 FinMind 數據集請求
+
+    各數據集在執行緒池中並行下載，總等待時間為最慢的單一請求，
+    而非所有請求時間的總和。
+
+    參數:
+        symbol: 股票代碼
+        token: FinMind API Token
+
+    返回:
+        dict: 數據集名稱 -> {'data', 'status', 'elapsed', 'error'}
+              status 為 'ok' (有數據)、'empty' (無數據) 或 'error' (發生例外)
+    """
+    # 讓子執行緒內的 st.error / st.warning 能顯示在目前頁面
+    ctx = get_script_run_ctx()
+
+    def run(fetch_func):
+        add_script_run_ctx(ctx=ctx)
+        started = time.perf_counter()
+        try:
+            data = fetch_func(symbol, token)
+            status = 'ok' if data is not None and not data.empty else 'empty'
+            error = None
+        except Exception as e:
+            data, status, error = None, 'error', str(e)
+        return {
+            'data': data,
+            'status': status,
+            'elapsed': time.perf_counter() - started,
+            'error': error,
+        }
+
+    with ThreadPoolExecutor(max_workers=len(ANALYSIS_DATASETS)) as executor:
+        futures = {
+            name: executor.submit(run, fetch_func)
+            for name, (_, fetch_func) in ANALYSIS_DATASETS.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def run_analysis_pipeline(symbol, token, start_date, end_date, rsi_period=14):
+    """
+    獲取數據並計算分析所需的所有結果 (互動頁面與批次報告共用)
+
+    參數:
+        symbol: 股票代碼
+        token: FinMind API Token
+        start_date: 起始日期
+        end_date: 結束日期
+        rsi_period: RSI 週期
+
+    返回:
+        dict: bundle (各數據集獲取結果)、tech_data (日期範圍內含技術指標的數據，無數據時為 None)、
+              income / balance / cashflow / revenue (財報與月營收)、
+              fscore / fscore_history / ratios (無財報時為 None)；
+              每季 F-Score 同時寫入 fscore_store，供歷史趨勢與全市場排名查詢
+    """
+    bundle = fetch_analysis_data(symbol, token)
+    stock_data = bundle['price']['data']
+    income_df = bundle['income']['data']
+    balance_df = bundle['balance']['data']
+    cashflow_df = bundle['cashflow']['data']
+
+    tech_data = None
+    if stock_data is not None:
+        tech_data = compute_technical_indicators(stock_data, start_date, end_date, rsi_period)
+
+    has_statements = income_df is not None and balance_df is not None
+    fscore_history = calculate_fscore_history(income_df, balance_df, cashflow_df) if has_statements else None
+    if fscore_history is not None:
+        fscore_store.save_scores(fscore_history, symbol)
+
+    return {
+        'bundle': bundle,
+        'tech_data': tech_data,
+        'income': income_df,
+        'balance': balance_df,
+        'cashflow': cashflow_df,
+        'revenue': bundle['revenue']['data'],
+        'fscore': calculate_piotroski_fscore(income_df, balance_df, cashflow_df) if has_statements else None,
+        'fscore_history': fscore_history,
+        'ratios': calculate_financial_ratios(income_df, balance_df) if has_statements else None,
+    }
+
+
+def prepare_ai_inputs(analysis):
+    """
+    由 run_analysis_pipeline 的結果整理 prompt_builder.build_prompt / generate_ai_insights 的參數
+
+    返回:
+        dict: start_price, end_price, price_change, first_date, last_date, fscore_result, financial_ratios
+    """
+    tech_data = analysis['tech_data']
+    start_price = tech_data.iloc[0]['close']
+    end_price = tech_data.iloc[-1]['close']
+    return {
+        'start_price': start_price,
+        'end_price': end_price,
+        'price_change': ((end_price - start_price) / start_price) * 100,
+        'first_date': tech_data.iloc[0]['date'].strftime('%Y-%m-%d'),
+        'last_date': tech_data.iloc[-1]['date'].strftime('%Y-%m-%d'),
+        'fscore_result': analysis['fscore'],
+        'financial_ratios': analysis['ratios'],
+    }
+
+
+def show_fetch_status(bundle):
+    """在可展開區塊中顯示各數據集的獲取狀態與耗時"""
+    status_icons = {'ok': '✅', 'empty': '⚠️', 'error': '❌'}
+    with st.expander("📡 數據獲取狀態", expanded=False):
+        for name, result in bundle.items():
+            label = ANALYSIS_DATASETS[name][0]
+            message = f"{status_icons[result['status']]} {label}: {result['elapsed']:.2f} 秒"
+            if result['error']:
+                message += f" ({result['error']})"
+            st.write(message)
+
+        # 本行程內各 API 端點的累計延遲統計
+        stats = http_client.latency_stats.snapshot()
+        if stats:
+            stats_df = pd.DataFrame.from_dict(stats, orient='index')
+            stats_df.columns = ['請求次數', '錯誤次數', '平均延遲 (秒)', '最大延遲 (秒)']
+            st.dataframe(stats_df, use_container_width=True)
+
+
+def show_ai_usage_stats():
+    """在可展開區塊中顯示本行程內 OpenAI 請求的延遲與 token 用量"""
+    stats = ai_client.usage_stats.snapshot()
+    if not stats:
+        return
+    with st.expander("📡 OpenAI 請求統計", expanded=False):
+        stats_df = pd.DataFrame.from_dict(stats, orient='index')
+        stats_df.columns = ['請求次數', '錯誤次數', '平均延遲 (秒)', '最大延遲 (秒)',
+                            '平均首個 token (秒)', '輸入 tokens', '輸出 tokens']
+        st.dataframe(stats_df, use_container_width=True)
+
+
+# ==================== 分頁內容 ====================
+
+@st.fragment
+def render_technical_tab(result):
+    """
+    技術分析分頁 (fragment)
+
+    調整 RSI 週期只會重新執行此分頁: 以快取重算 RSI 並重繪圖表，
+    不重新獲取數據，也不重跑其他分頁。
+
+    參數:
+        result: st.session_state 中保存的分析結果
+    """
+    analysis = result['analysis']
+    tech_data = analysis['tech_data']
+    symbol = result['symbol']
+    if tech_data is None:
+        st.error("❌ 無法獲取技術分析數據")
+        return
+
+    rsi_period = st.slider(
+        "RSI 週期",
+        min_value=5,
+        max_value=30,
+        key='rsi_period',
+        help="RSI 計算週期，預設為 14 天；調整後只重算 RSI 與圖表"
+    )
+    # 其他指標與 RSI 週期無關，沿用分析時的結果
+    if rsi_period != result['rsi_period']:
+        rsi = compute_rsi_for_range(
+            analysis['bundle']['price']['data'], result['start_date'], result['end_date'], rsi_period
+        )
+        tech_data = tech_data.assign(RSI=rsi.to_numpy())
+        st.caption(f"AI 綜合分析報告使用分析時的 RSI 週期 ({result['rsi_period']} 日)，"
+                   "重新點擊「分析」可依目前週期更新報告")
+
+    # 繪製進階圖表
+    st.subheader("📊 技術分析圖表")
+    render_mode = st.radio(
+        "圖表模式",
+        options=list(chart_helpers.RENDER_MODES),
+        format_func=chart_helpers.RENDER_MODES.get,
+        key='chart_render_mode',
+        horizontal=True,
+        help="快速模式以 WebGL 繪製並降採樣折線，長期間的 K 棒彙總為週 K / 月 K；"
+             f"自動模式在超過 {chart_helpers.FAST_MODE_THRESHOLD} 根 K 棒時使用快速模式"
+    )
+    fig = plot_advanced_chart(tech_data, symbol, render_mode)
+    if fig:
+        st.plotly_chart(fig, use_container_width=True)
+
+    # 顯示基本統計資訊和 RSI 狀態
+    st.subheader("📈 技術指標統計")
+
+    start_price = tech_data.iloc[0]['close']
+    end_price = tech_data.iloc[-1]['close']
+    price_change = ((end_price - start_price) / start_price) * 100
+    price_diff = end_price - start_price
+
+    latest_rsi = tech_data['RSI'].iloc[-1]
+    rsi_status, _ = get_rsi_status(latest_rsi)
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("起始價格", f"NT${start_price:.2f}")
+    with col2:
+        st.metric("結束價格", f"NT${end_price:.2f}")
+    with col3:
+        st.metric("價格變化", f"NT${price_diff:.2f}", f"{price_change:.2f}%")
+    with col4:
+        if not pd.isna(latest_rsi):
+            st.metric("RSI 指標", f"{latest_rsi:.2f}", rsi_status, delta_color="off")
+        else:
+            st.metric("RSI 指標", "N/A", "數據不足")
+
+    # RSI 狀態警告
+    if not pd.isna(latest_rsi):
+        if latest_rsi >= 70:
+            st.warning(f"⚠️ RSI 超買: 當前 {latest_rsi:.2f}")
+        elif latest_rsi <= 30:
+            st.success(f"⚠️ RSI 超賣: 當前 {latest_rsi:.2f}")
+        else:
+            st.info(f"ℹ️ RSI 正常: 當前 {latest_rsi:.2f}")
+
+    # 歷史數據表格
+    st.subheader("📋 歷史數據表格 (最近 10 筆)")
+    display_columns = ['date', 'open', 'high', 'low', 'close', 'volume', 'MA5', 'MA10', 'MA20', 'MA60', 'RSI']
+    recent_data = tech_data[display_columns].tail(10).iloc[::-1]
+    recent_data_display = recent_data.copy()
+    recent_data_display['date'] = recent_data_display['date'].dt.strftime('%Y-%m-%d')
+    recent_data_display.columns = ['日期', '開盤', '最高', '最低', '收盤', '成交量', 'MA5', 'MA10', 'MA20', 'MA60', 'RSI']
+    st.dataframe(recent_data_display, use_container_width=True, hide_index=True)
+
+
+def render_fundamental_tab(analysis):
+    """
+    基本面分析分頁
+
+    參數:
+        analysis: run_analysis_pipeline 的結果
+    """
+    stock_data = analysis['bundle']['price']['data']
+    tech_data = analysis['tech_data']
+    income_df = analysis['income']
+    balance_df = analysis['balance']
+    monthly_revenue_df = analysis['revenue']
+
+    if income_df is not None and balance_df is not None:
+        # === 1. 月營收概況 ===
+        st.subheader("📅 營收概況與變化分析（近6個月）")
+        if monthly_revenue_df is not None and not monthly_revenue_df.empty:
+            # 顯示最新月營收關鍵數據
+            latest_rev = monthly_revenue_df.iloc[0]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("最新月營收", f"{latest_rev['revenue']/1000:.1f} 億",
+                         f"{latest_rev['mom_growth']:.1f}% MoM" if pd.notna(latest_rev['mom_growth']) else "N/A")
+            with col2:
+                yoy_val = latest_rev['yoy_growth'] if pd.notna(latest_rev['yoy_growth']) else 0
+                st.metric("年增率 (YoY)", f"{yoy_val:.1f}%",
+                         delta_color="normal" if yoy_val >= 0 else "inverse")
+            with col3:
+                period_str = str(latest_rev['revenue_month'])[:7] if 'revenue_month' in latest_rev else "N/A"
+                st.metric("期間", period_str)
+
+            # 月營收圖表
+            fig_monthly_rev = plot_monthly_revenue_chart(monthly_revenue_df)
+            if fig_monthly_rev:
+                st.plotly_chart(fig_monthly_rev, use_container_width=True)
+        else:
+            st.info("💡 無法獲取月營收數據")
+
+        st.divider()
+
+        # === 2. EPS 趨勢分析 ===
+        st.subheader("💎 每股盈餘（EPS）趨勢（近5季）")
+        eps_trend = calculate_eps_trend(income_df)
+        if eps_trend is not None and not eps_trend.empty:
+            # 顯示最新 EPS
+            latest_eps_row = eps_trend.iloc[0]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("最新 EPS", f"{latest_eps_row['EPS']:.2f} 元")
+            with col2:
+                qoq_val = latest_eps_row['QoQ'] if pd.notna(latest_eps_row['QoQ']) else 0
+                st.metric("季增率 (QoQ)", f"{qoq_val:.1f}%" if pd.notna(latest_eps_row['QoQ']) else "N/A")
+            with col3:
+                yoy_val = latest_eps_row['YoY'] if pd.notna(latest_eps_row['YoY']) else 0
+                st.metric("年增率 (YoY)", f"{yoy_val:.1f}%" if pd.notna(latest_eps_row['YoY']) else "N/A")
+
+            # EPS 圖表
+            fig_eps = plot_eps_trend_chart(eps_trend)
+            if fig_eps:
+                st.plotly_chart(fig_eps, use_container_width=True)
+        else:
+            st.info("💡 數據不足，無法計算 EPS 趨勢")
+
+        st.divider()
+
+        # === 3. 本益比與股價位階 ===
+        st.subheader("📈 本益比與歷史股價位階")
+        if tech_data is not None and income_df is not None:
+            current_price = tech_data.iloc[-1]['close']
+            latest_eps = income_df.iloc[0].get('EPS', 0) if 'EPS' in income_df.columns else 0
+            pe_ratio = calculate_pe_ratio(current_price, latest_eps)
+
+            # 計算歷史價格區間
+            all_prices = stock_data['close'] if stock_data is not None else tech_data['close']
+            price_high = all_prices.max()
+            price_low = all_prices.min()
+            price_avg = all_prices.mean()
+            price_position = ((current_price - price_low) / (price_high - price_low)) * 100 if price_high != price_low else 50
+
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("目前股價", f"NT$ {current_price:.2f}")
+            with col2:
+                st.metric("本益比 (P/E)", f"{pe_ratio:.2f}" if pe_ratio else "N/A")
+            with col3:
+                st.metric("歷史高/低", f"{price_high:.2f} / {price_low:.2f}")
+            with col4:
+                position_text = "高位階" if price_position >= 70 else "低位階" if price_position <= 30 else "中位階"
+                st.metric("價格位階", f"{price_position:.1f}% ({position_text})")
+
+            # 估值評價
+            if pe_ratio:
+                if pe_ratio < 10:
+                    valuation = "🟢 可能低估"
+                elif pe_ratio < 20:
+                    valuation = "🟡 合理區間"
+                elif pe_ratio < 30:
+                    valuation = "🟠 偏高"
+                else:
+                    valuation = "🔴 可能高估"
+                st.info(f"估值評價: {valuation} (本益比: {pe_ratio:.2f})")
+        else:
+            st.info("💡 數據不足，無法計算本益比")
+
+        st.divider()
+
+        # === 4. 毛利率與營益率趨勢 ===
+        st.subheader("📊 毛利率與營益率變化趨勢（近4季）")
+        margin_trend = calculate_margin_trends(income_df)
+        if margin_trend is not None and not margin_trend.empty:
+            # 顯示最新數據
+            latest_margin = margin_trend.iloc[-1]
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("最新毛利率", f"{latest_margin['毛利率']:.2f}%")
+            with col2:
+                st.metric("最新營益率", f"{latest_margin['營益率']:.2f}%")
+
+            # 毛利率營益率圖表
+            fig_margin = plot_margin_comparison_chart(margin_trend)
+            if fig_margin:
+                st.plotly_chart(fig_margin, use_container_width=True)
+        else:
+            st.info("💡 數據不足，無法計算毛利率與營益率趨勢")
+
+        st.divider()
+
+        # === 5. 財務健全度（ROE、ROA）===
+        st.subheader("💪 財務健全度分析")
+        ratios = analysis['ratios']
+        if ratios:
+            col1, col2, col3, col4 = st.columns(4)
+            # 該季缺少資產負債表等數據時比率不存在
+            with col1:
+                roe = ratios.get('ROE')
+                st.metric("ROE (股東權益報酬率)", f"{roe:.2f}%" if roe is not None else "N/A")
+            with col2:
+                roa = ratios.get('ROA')
+                st.metric("ROA (資產報酬率)", f"{roa:.2f}%" if roa is not None else "N/A")
+            with col3:
+                current_ratio = ratios.get('流動比率')
+                st.metric("流動比率", f"{current_ratio:.2f}" if current_ratio is not None else "N/A")
+            with col4:
+                debt_ratio = ratios.get('負債比率')
+                st.metric("負債比率", f"{debt_ratio:.2f}%" if debt_ratio is not None else "N/A")
+
+            # 財務比率視覺化
+            fig_ratios = plot_financial_ratios_bar(ratios)
+            if fig_ratios:
+                st.plotly_chart(fig_ratios, use_container_width=True)
+
+            # ROE/ROA 趨勢圖
+            fig_profitability = plot_profitability_trends(income_df, balance_df)
+            if fig_profitability:
+                st.plotly_chart(fig_profitability, use_container_width=True)
+
+        st.divider()
+
+        # === 6. F-Score 分析 ===
+        st.subheader("🎯 Piotroski F-Score 財務體質評分")
+        fscore = analysis['fscore']
+        if fscore:
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                score = fscore['total_score']
+                st.metric("F-Score 總分", f"{score}/{fscore['max_score']}")
+                if fscore['evaluated'] < fscore['max_score']:
+                    st.caption(f"僅 {fscore['evaluated']} 項條件有足夠數據 (缺少的項目不計分)")
+                if score >= 7:
+                    st.success("✅ 財務體質優秀 (≥7)")
+                elif score >= 5:
+                    st.info("ℹ️ 財務體質良好 (5-6)")
+                else:
+                    st.warning("⚠️ 財務體質需關注 (<5)")
+
+                # F-Score 儀表盤
+                fig_fscore = plot_fscore_gauge(fscore)
+                if fig_fscore:
+                    st.plotly_chart(fig_fscore, use_container_width=True)
+
+            with col2:
+                st.write("**評分詳情:**")
+                for metric, data in fscore['details'].items():
+                    status = "✅" if data.get('score') == 1 else "❌"
+                    st.write(f"{status} {metric}: {data}")
+
+            # 每季 F-Score 趨勢
+            fig_fscore_history = plot_fscore_history_chart(analysis['fscore_history'])
+            if fig_fscore_history:
+                st.plotly_chart(fig_fscore_history, use_container_width=True)
+
+        st.divider()
+
+        # === 7. 最近財報數據表格（4季）===
+        st.subheader("📋 最近財報數據（近4季）")
+        if len(income_df) >= 4:
+            cols_to_show = ['date', 'Revenue', 'GrossProfit', 'OperatingIncome', 'IncomeAfterTaxes', 'EPS']
+            available_cols = ['date'] + [c for c in cols_to_show[1:] if c in income_df.columns]
+            display_df = income_df.head(4)[available_cols].copy()
+            display_df['date'] = display_df['date'].dt.strftime('%Y-Q%q')
+
+            # 格式化數值
+            for col in display_df.columns:
+                if col != 'date' and col in display_df.columns:
+                    display_df[col] = display_df[col].apply(lambda x: f"{x:,.0f}" if pd.notna(x) else "N/A")
+
+            st.dataframe(display_df, use_container_width=True, hide_index=True)
+    else:
+        st.warning("⚠️ 無法獲取完整財務數據")
+        st.info("💡 建議: 輸入 FinMind API Token 以提升數據獲取限制")
+
+
+def render_ai_tab(result, openai_api_key=None, force_refresh=False):
+    """
+    AI 綜合分析分頁
+
+    只有點擊「分析」的那次執行會呼叫 OpenAI 並保存報告，其他互動只顯示保存的報告。
+
+    參數:
+        result: st.session_state 中保存的分析結果
+        openai_api_key: OpenAI API 金鑰，None 表示只顯示已保存的報告
+        force_refresh: 是否忽略 AI 快取重新生成
+    """
+    st.subheader("🤖 AI 綜合分析報告")
+    analysis = result['analysis']
+    if analysis['tech_data'] is None:
+        st.error("❌ 數據不足，無法進行 AI 分析")
+        return
+
+    if openai_api_key:
+        result['ai_report'] = generate_ai_insights(
+            result['symbol'], analysis['tech_data'], openai_api_key=openai_api_key,
+            force_refresh=force_refresh, rsi_period=result['rsi_period'], **prepare_ai_inputs(analysis)
+        )
+        if result['ai_report']:
+            st.success("✅ 綜合分析完成")
+    elif result['ai_report']:
+        st.markdown(result['ai_report'])
+    if result['ai_report']:
+        st.caption(f"報告依分析時的 RSI 週期 ({result['rsi_period']} 日) 產生；"
+                   "在技術分析分頁調整週期後，重新點擊「分析」可更新報告")
+    show_ai_usage_stats()
+
+
 # ==================== 主程式 ====================
 
+def select_symbol(query):
+    """
+    在側邊欄解析使用者輸入的股票代碼或名稱
+
+    輸入可直接對應到一檔股票時顯示公司名稱；否則列出搜尋結果供選擇 (尚未選擇時返回 None)。
+
+    參數:
+        query: 側邊欄輸入的文字
+
+    返回:
+        str: 股票代碼，找不到符合的股票時返回 None
+    """
+    index = symbol_index.load_index()
+    symbol = index.resolve(query)
+    if symbol:
+        entry = index.lookup(symbol)
+        if entry:
+            st.sidebar.caption(f"{entry['symbol']} {entry['name']} ({entry['market']})")
+        return symbol
+
+    matches = index.search(query)
+    if not matches:
+        if query.strip():
+            st.sidebar.caption("找不到符合的股票")
+        return None
+
+    # 只有唯一結果時預先選取，避免打錯的代碼被模糊比對成另一檔股票
+    entries = {entry['symbol']: entry for entry in matches}
+    return st.sidebar.selectbox(
+        "符合的股票",
+        list(entries),
+        index=0 if len(entries) == 1 else None,
+        format_func=lambda code: f"{code} {entries[code]['name']} ({entries[code]['market']})",
+        placeholder="請選擇股票"
+    )
+
+
 def main():
     # 頁面標題
     st.title("📈 AI 股票綜合分析系統")
@@ -1557,12 +1808,13 @@ def main():
     st.sidebar.header("⚙️ 分析設定")
     st.sidebar.divider()
 
-    # 股票代碼輸入
-    symbol = st.sidebar.text_input(
-        "股票代碼",
+    # 股票代碼輸入 (可輸入代碼或名稱，於本地公司清單搜尋)
+    query = st.sidebar.text_input(
+        "股票代碼或名稱",
         value="2330",
-        help="請輸入台股股票代碼,例如: 2330 (台積電)、2317 (鴻海)、2454 (聯發科)"
+        help="請輸入台股股票代碼或公司名稱,例如: 2330、台積電、鴻海、聯發科"
     )
+    symbol = select_symbol(query)
 
     # FinMind API Token 輸入 (選填)
     finmind_token = st.sidebar.text_input(
@@ -1578,6 +1830,12 @@ def main():
         help="請在 https://platform.openai.com 獲取 API 金鑰"
     )
 
+    force_ai_refresh = st.sidebar.checkbox(
+        "強制重新生成 AI 分析",
+        value=False,
+        help="相同股票與數據的分析結果會快取 24 小時，勾選後忽略快取重新呼叫 OpenAI"
+    )
+
     # 日期範圍選擇
     st.sidebar.subheader("📅 日期範圍")
 
@@ -1596,15 +1854,8 @@ def main():
         help="選擇分析的結束日期"
     )
 
-    # RSI 參數設定
-    st.sidebar.subheader("📊 RSI 參數設定")
-    rsi_period = st.sidebar.slider(
-        "RSI 週期",
-        min_value=5,
-        max_value=30,
-        value=14,
-        help="RSI 計算週期，預設為 14 天"
-    )
+    # RSI 週期滑桿位於技術分析分頁；分析時沿用目前設定的週期
+    st.session_state.setdefault('rsi_period', 14)
 
     # 分析按鈕
     analyze_button = st.sidebar.button("🔍 分析", type="primary", use_container_width=True)
@@ -1621,10 +1872,14 @@ def main():
 
     if analyze_button:
         # 輸入驗證
-        if not symbol:
+        if not query.strip():
             st.error("❌ 請輸入股票代碼")
             return
 
+        if not symbol:
+            st.error(f"❌ 找不到股票「{query.strip()}」，請確認代碼或名稱")
+            return
+
         if not openai_api_key:
             st.error("❌ 請輸入 OpenAI API Key")
             st.info("💡 請前往 https://platform.openai.com 獲取 API 金鑰")
@@ -1633,304 +1888,45 @@ def main():
         if start_date >= end_date:
             st.error("❌ 起始日期必須早於結束日期")
             return
+        with st.spinner("📊 正在獲取數據..."):
+            # 同時獲取股價、財報與月營收，並計算技術指標與財務評分
+            analysis = run_analysis_pipeline(
+                symbol, finmind_token, start_date, end_date, st.session_state.rsi_period
+            )
+
+        # 保存分析結果，之後調整 RSI 週期或其他設定時不需重新點擊分析
+        st.session_state.analysis_result = {
+            'symbol': symbol,
+            'start_date': start_date,
+            'end_date': end_date,
+            'rsi_period': st.session_state.rsi_period,
+            'analysis': analysis,
+            'ai_report': None,
+        }
+
+    result = st.session_state.get('analysis_result')
+    if result is not None:
+        if (symbol, start_date, end_date) != (result['symbol'], result['start_date'], result['end_date']):
+            st.info(f"ℹ️ 目前顯示 {result['symbol']} ({result['start_date']} ~ {result['end_date']}) "
+                    f"的分析結果，變更設定後請點擊「分析」更新")
+
+        analysis = result['analysis']
+        if analysis['bundle']['price']['data'] is not None and analysis['tech_data'] is None:
+            st.warning("⚠️ 選擇的日期範圍內沒有數據，請調整日期範圍")
+
+        show_fetch_status(analysis['bundle'])
 
         # 建立分頁
         tab1, tab2, tab3 = st.tabs(["📊 技術分析", "💰 基本面分析", "🤖 AI 綜合分析"])
 
-        # === 獲取所有數據 ===
-        with st.spinner("📊 正在獲取數據..."):
-            # 技術數據
-            stock_data = get_stock_data(symbol, finmind_token)
-            if stock_data is not None:
-                filtered_data = filter_by_date_range(stock_data, start_date, end_date)
-                if filtered_data is not None:
-                    # 計算所有技術指標
-                    data_with_ma = get_moving_averages(filtered_data)
-                    data_with_rsi = calculate_rsi(data_with_ma, period=rsi_period)
-                    data_with_kd = calculate_kd(data_with_rsi)
-                    data_with_macd = calculate_macd(data_with_kd)
-                    tech_data = calculate_willr(data_with_macd)
-            else:
-                tech_data = None
-
-            # 財務數據
-            income_df = get_financial_statements(symbol, finmind_token)
-            balance_df = get_balance_sheet(symbol, finmind_token)
-
-            # 新增數據：月營收
-            monthly_revenue_df = get_monthly_revenue(symbol, finmind_token)
-
-        # === Tab 1: 技術分析 ===
         with tab1:
-            if tech_data is not None:
-                # 繪製進階圖表
-                st.subheader("📊 技術分析圖表")
-                fig = plot_advanced_chart(tech_data, symbol)
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
-
-                # 顯示基本統計資訊和 RSI 狀態
-                st.subheader("📈 技術指標統計")
-
-                start_price = tech_data.iloc[0]['close']
-                end_price = tech_data.iloc[-1]['close']
-                price_change = ((end_price - start_price) / start_price) * 100
-                price_diff = end_price - start_price
-
-                latest_rsi = tech_data['RSI'].iloc[-1]
-                rsi_status, _ = get_rsi_status(latest_rsi)
-
-                col1, col2, col3, col4 = st.columns(4)
-
-                with col1:
-                    st.metric("起始價格", f"NT${start_price:.2f}")
-                with col2:
-                    st.metric("結束價格", f"NT${end_price:.2f}")
-                with col3:
-                    st.metric("價格變化", f"NT${price_diff:.2f}", f"{price_change:.2f}%")
-                with col4:
-                    if not pd.isna(latest_rsi):
-                        st.metric("RSI 指標", f"{latest_rsi:.2f}", rsi_status, delta_color="off")
-                    else:
-                        st.metric("RSI 指標", "N/A", "數據不足")
-
-                # RSI 狀態警告
-                if not pd.isna(latest_rsi):
-                    if latest_rsi >= 70:
-                        st.warning(f"⚠️ RSI 超買: 當前 {latest_rsi:.2f}")
-                    elif latest_rsi <= 30:
-                        st.success(f"⚠️ RSI 超賣: 當前 {latest_rsi:.2f}")
-                    else:
-                        st.info(f"ℹ️ RSI 正常: 當前 {latest_rsi:.2f}")
-
-                # 歷史數據表格
-                st.subheader("📋 歷史數據表格 (最近 10 筆)")
-                display_columns = ['date', 'open', 'high', 'low', 'close', 'volume', 'MA5', 'MA10', 'MA20', 'MA60', 'RSI']
-                recent_data = tech_data[display_columns].tail(10).iloc[::-1]
-                recent_data_display = recent_data.copy()
-                recent_data_display['date'] = recent_data_display['date'].dt.strftime('%Y-%m-%d')
-                recent_data_display.columns = ['日期', '開盤', '最高', '最低', '收盤', '成交量', 'MA5', 'MA10', 'MA20', 'MA60', 'RSI']
-                st.dataframe(recent_data_display, use_container_width=True, hide_index=True)
-            else:
-                st.error("❌ 無法獲取技術分析數據")
-
-        # === Tab 2: 基本面分析 ===
+            render_technical_tab(result)
+
         with tab2:
-            if income_df is not None and balance_df is not None:
-                # === 1. 月營收概況 ===
-                st.subheader("📅 營收概況與變化分析（近6個月）")
-                if monthly_revenue_df is not None and not monthly_revenue_df.empty:
-                    # 顯示最新月營收關鍵數據
-                    latest_rev = monthly_revenue_df.iloc[0]
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("最新月營收", f"{latest_rev['revenue']/1000:.1f} 億",
-                                 f"{latest_rev['mom_growth']:.1f}% MoM" if pd.notna(latest_rev['mom_growth']) else "N/A")
-                    with col2:
-                        yoy_val = latest_rev['yoy_growth'] if pd.notna(latest_rev['yoy_growth']) else 0
-                        st.metric("年增率 (YoY)", f"{yoy_val:.1f}%",
-                                 delta_color="normal" if yoy_val >= 0 else "inverse")
-                    with col3:
-                        period_str = str(latest_rev['revenue_month'])[:7] if 'revenue_month' in latest_rev else "N/A"
-                        st.metric("期間", period_str)
-
-                    # 月營收圖表
-                    fig_monthly_rev = plot_monthly_revenue_chart(monthly_revenue_df)
-                    if fig_monthly_rev:
-                        st.plotly_chart(fig_monthly_rev, use_container_width=True)
-                else:
-                    st.info("💡 無法獲取月營收數據")
-
-                st.divider()
-
-                # === 2. EPS 趨勢分析 ===
-                st.subheader("💎 每股盈餘（EPS）趨勢（近5季）")
-                eps_trend = calculate_eps_trend(income_df)
-                if eps_trend is not None and not eps_trend.empty:
-                    # 顯示最新 EPS
-                    latest_eps_row = eps_trend.iloc[0]
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("最新 EPS", f"{latest_eps_row['EPS']:.2f} 元")
-                    with col2:
-                        qoq_val = latest_eps_row['QoQ'] if pd.notna(latest_eps_row['QoQ']) else 0
-                        st.metric("季增率 (QoQ)", f"{qoq_val:.1f}%" if pd.notna(latest_eps_row['QoQ']) else "N/A")
-                    with col3:
-                        yoy_val = latest_eps_row['YoY'] if pd.notna(latest_eps_row['YoY']) else 0
-                        st.metric("年增率 (YoY)", f"{yoy_val:.1f}%" if pd.notna(latest_eps_row['YoY']) else "N/A")
-
-                    # EPS 圖表
-                    fig_eps = plot_eps_trend_chart(eps_trend)
-                    if fig_eps:
-                        st.plotly_chart(fig_eps, use_container_width=True)
-                else:
-                    st.info("💡 數據不足，無法計算 EPS 趨勢")
-
-                st.divider()
-
-                # === 3. 本益比與股價位階 ===
-                st.subheader("📈 本益比與歷史股價位階")
-                if tech_data is not None and income_df is not None:
-                    current_price = tech_data.iloc[-1]['close']
-                    latest_eps = income_df.iloc[0].get('EPS', 0) if 'EPS' in income_df.columns else 0
-                    pe_ratio = calculate_pe_ratio(current_price, latest_eps)
-
-                    # 計算歷史價格區間
-                    all_prices = stock_data['close'] if stock_data is not None else tech_data['close']
-                    price_high = all_prices.max()
-                    price_low = all_prices.min()
-                    price_avg = all_prices.mean()
-                    price_position = ((current_price - price_low) / (price_high - price_low)) * 100 if price_high != price_low else 50
-
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("目前股價", f"NT$ {current_price:.2f}")
-                    with col2:
-                        st.metric("本益比 (P/E)", f"{pe_ratio:.2f}" if pe_ratio else "N/A")
-                    with col3:
-                        st.metric("歷史高/低", f"{price_high:.2f} / {price_low:.2f}")
-                    with col4:
-                        position_text = "高位階" if price_position >= 70 else "低位階" if price_position <= 30 else "中位階"
-                        st.metric("價格位階", f"{price_position:.1f}% ({position_text})")
-
-                    # 估值評價
-                    if pe_ratio:
-                        if pe_ratio < 10:
-                            valuation = "🟢 可能低估"
-                        elif pe_ratio < 20:
-                            valuation = "🟡 合理區間"
-                        elif pe_ratio < 30:
-                            valuation = "🟠 偏高"
-                        else:
-                            valuation = "🔴 可能高估"
-                        st.info(f"估值評價: {valuation} (本益比: {pe_ratio:.2f})")
-                else:
-                    st.info("💡 數據不足，無法計算本益比")
-
-                st.divider()
-
-                # === 4. 毛利率與營益率趨勢 ===
-                st.subheader("📊 毛利率與營益率變化趨勢（近4季）")
-                margin_trend = calculate_margin_trends(income_df)
-                if margin_trend is not None and not margin_trend.empty:
-                    # 顯示最新數據
-                    latest_margin = margin_trend.iloc[-1]
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric("最新毛利率", f"{latest_margin['毛利率']:.2f}%")
-                    with col2:
-                        st.metric("最新營益率", f"{latest_margin['營益率']:.2f}%")
-
-                    # 毛利率營益率圖表
-                    fig_margin = plot_margin_comparison_chart(margin_trend)
-                    if fig_margin:
-                        st.plotly_chart(fig_margin, use_container_width=True)
-                else:
-                    st.info("💡 數據不足，無法計算毛利率與營益率趨勢")
-
-                st.divider()
-
-                # === 5. 財務健全度（ROE、ROA）===
-                st.subheader("💪 財務健全度分析")
-                ratios = calculate_financial_ratios(income_df, balance_df)
-                if ratios:
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        roe = ratios.get('ROE', 0)
-                        st.metric("ROE (股東權益報酬率)", f"{roe:.2f}%")
-                    with col2:
-                        roa = ratios.get('ROA', 0)
-                        st.metric("ROA (資產報酬率)", f"{roa:.2f}%")
-                    with col3:
-                        current_ratio = ratios.get('流動比率', 0)
-                        st.metric("流動比率", f"{current_ratio:.2f}")
-                    with col4:
-                        debt_ratio = ratios.get('負債比率', 0)
-                        st.metric("負債比率", f"{debt_ratio:.2f}%")
-
-                    # 財務比率視覺化
-                    fig_ratios = plot_financial_ratios_bar(ratios)
-                    if fig_ratios:
-                        st.plotly_chart(fig_ratios, use_container_width=True)
-
-                    # ROE/ROA 趨勢圖
-                    fig_profitability = plot_profitability_trends(income_df, balance_df)
-                    if fig_profitability:
-                        st.plotly_chart(fig_profitability, use_container_width=True)
-
-                st.divider()
-
-                # === 6. F-Score 分析 ===
-                st.subheader("🎯 Piotroski F-Score 財務體質評分")
-                fscore = calculate_piotroski_fscore(income_df, balance_df)
-                if fscore:
-                    col1, col2 = st.columns([1, 2])
-                    with col1:
-                        score = fscore['total_score']
-                        st.metric("F-Score 總分", f"{score}/9")
-                        if score >= 7:
-                            st.success("✅ 財務體質優秀 (≥7)")
-                        elif score >= 5:
-                            st.info("ℹ️ 財務體質良好 (5-6)")
-                        else:
-                            st.warning("⚠️ 財務體質需關注 (<5)")
-
-                        # F-Score 儀表盤
-                        fig_fscore = plot_fscore_gauge(fscore)
-                        if fig_fscore:
-                            st.plotly_chart(fig_fscore, use_container_width=True)
-
-                    with col2:
-                        st.write("**評分詳情:**")
-                        for metric, data in fscore['details'].items():
-                            status = "✅" if data.get('score') == 1 else "❌"
-                            st.write(f"{status} {metric}: {data}")
-
-                st.divider()
-
-                # === 7. 最近財報數據表格（4季）===
-                st.subheader("📋 最近財報數據（近4季）")
-                if len(income_df) >= 4:
-                    cols_to_show = ['date', 'Revenue', 'GrossProfit', 'OperatingIncome', 'IncomeAfterTaxes', 'EPS']
-                    available_cols = ['date'] + [c for c in cols_to_show[1:] if c in income_df.columns]
-                    display_df = income_df.head(4)[available_cols].copy()
-                    display_df['date'] = display_df['date'].dt.strftime('%Y-Q%q')
-
-                    # 格式化數值
-                    for col in display_df.columns:
-                        if col != 'date' and col in display_df.columns:
-                            display_df[col] = display_df[col].apply(lambda x: f"{x:,.0f}" if pd.notna(x) else "N/A")
-
-                    st.dataframe(display_df, use_container_width=True, hide_index=True)
-            else:
-                st.warning("⚠️ 無法獲取完整財務數據")
-                st.info("💡 建議: 輸入 FinMind API Token 以提升數據獲取限制")
-
-        # === Tab 3: AI 綜合分析 ===
-        with tab3:
-            st.subheader("🤖 AI 綜合分析報告")
-            if tech_data is not None:
-                fscore_result = calculate_piotroski_fscore(income_df, balance_df) if income_df is not None and balance_df is not None else None
-                financial_ratios = calculate_financial_ratios(income_df, balance_df) if income_df is not None and balance_df is not None else None
-
-                start_price = tech_data.iloc[0]['close']
-                end_price = tech_data.iloc[-1]['close']
-                price_change = ((end_price - start_price) / start_price) * 100
-                first_date = tech_data.iloc[0]['date'].strftime('%Y-%m-%d')
-                last_date = tech_data.iloc[-1]['date'].strftime('%Y-%m-%d')
-
-                ai_analysis = generate_ai_insights(
-                    symbol, tech_data, start_price, end_price, price_change,
-                    first_date, last_date, openai_api_key,
-                    fscore_result, financial_ratios
-                )
-
-                if ai_analysis:
-                    st.markdown(ai_analysis)
-                    st.success("✅ 綜合分析完成")
-            else:
-                st.error("❌ 數據不足，無法進行 AI 分析")
+            render_fundamental_tab(analysis)
 
+        with tab3:
+            render_ai_tab(result, openai_api_key if analyze_button else None, force_ai_refresh)
     else:
         # 初始顯示說明
         st.info("👈 請在左側輸入股票代碼、API 金鑰和日期範圍,然後點擊「分析」按鈕開始分析")
@@ -1948,7 +1944,7 @@ def main():
 
         #### 💰 基本面分析 (Tab 2)
         - **財務比率** - ROE, ROA, 毛利率, 淨利率, 負債比率, EPS等
-        - **Piotroski F-Score** - 9項指標評分系統 (0-9分)
+        - **Piotroski F-Score** - 9項指標評分系統 (0-9分，含每季歷史趨勢)
         - **財報數據** - 最近期財務報表數據
         - **企業體質** - 獲利能力和財務健康度評估
 
@@ -1964,8 +1960,8 @@ def main():
         2. 輸入 **OpenAI API Key** (必填)
         3. 輸入 **FinMind Token** (選填,可提升數據限制)
         4. 選擇**日期範圍** (技術分析用)
-        5. 調整 **RSI 週期** (預設14天)
-        6. 點擊 **「🔍 分析」** 按鈕
+        5. 點擊 **「🔍 分析」** 按鈕
+        6. 在技術分析分頁調整 **RSI 週期** (預設14天)，只會重算 RSI 與圖表
 
         ### ⚠️ 重要提醒
 
@@ -1975,6 +1971,9 @@ def main():
         - 請謹慎評估風險,自行做出投資決策
         """)
 
+    # 快取狀態放在最後，統計才包含本次分析
+    app_cache.render_cache_sidebar()
+
 
 if __name__ == "__main__":
     main()
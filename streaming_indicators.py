@@ -0,0 +1,497 @@
+"""
+串流 (增量) 技術指標
+每個指標物件保存自己的 EMA / 滾動視窗 / RSI 狀態，新 K 棒到來時以 O(1) 更新，
+狀態可序列化成 JSON 與價格快取存放在一起，每日更新時不必重算完整歷史
+"""
+
+import argparse
+import json
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import price_cache
+from indicators import DEFAULT_INDICATOR_SPEC
+
+NAN = float('nan')
+
+
+def _div(numerator, denominator):
+    """與 NumPy 相同語意的浮點除法 (x/0 為 ±inf，0/0 為 NaN)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(numerator) / np.float64(denominator))
+
+
+# ==================== 基本狀態 ====================
+
+class EMAState:
+    """
+    指數移動平均 (等同 pandas ewm(span, adjust=False).mean())
+
+    輸入沒有 NaN 時與 pandas 結果一致 (誤差在浮點捨入範圍內)；
+    遇到 NaN 缺口 (例如停牌期間 RSV 為 0/0) 時，舊值權重依缺口長度以 (1-α)^k 衰減。
+    """
+
+    def __init__(self, span, value=NAN, old_weight=1.0):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = value
+        self.old_weight = old_weight
+
+    def update(self, x):
+        is_observation = not math.isnan(x)
+        if not math.isnan(self.value):
+            self.old_weight *= 1.0 - self.alpha
+            if is_observation:
+                if self.value != x:
+                    self.value = (self.old_weight * self.value + self.alpha * x) / (self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        elif is_observation:
+            self.value = x
+        return self.value
+
+    def to_dict(self):
+        return {'span': self.span, 'value': self.value, 'old_weight': self.old_weight}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['span'], data['value'], data['old_weight'])
+
+
+class RollingWindowState:
+    """
+    固定長度的滾動視窗，以攤銷 O(1) 更新平均、最大值與最小值
+
+    平均以補償加總 (Neumaier) 維護移動總和，長期加減不會累積捨入誤差；
+    最大值 / 最小值以單調佇列保存視窗內仍可能成為極值的 (序號, 數值)。
+    視窗內有 NaN 時平均與極值皆為 NaN (與 NumPy 相同語意)。
+    """
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque(maxlen=window)
+        # 已加入的數值個數，作為單調佇列的序號
+        self._count = 0
+        self._sum = 0.0
+        self._compensation = 0.0
+        self._nans = 0
+        self._maxima = deque()
+        self._minima = deque()
+        for x in values:
+            self.update(x)
+
+    def _add(self, x):
+        total = self._sum + x
+        if abs(self._sum) >= abs(x):
+            self._compensation += (self._sum - total) + x
+        else:
+            self._compensation += (x - total) + self._sum
+        self._sum = total
+
+    def update(self, x):
+        if self.full:
+            oldest = self.values[0]
+            if math.isnan(oldest):
+                self._nans -= 1
+            else:
+                self._add(-oldest)
+        self.values.append(x)
+
+        index = self._count
+        self._count += 1
+        if math.isnan(x):
+            self._nans += 1
+        else:
+            self._add(x)
+            while self._maxima and self._maxima[-1][1] <= x:
+                self._maxima.pop()
+            self._maxima.append((index, x))
+            while self._minima and self._minima[-1][1] >= x:
+                self._minima.pop()
+            self._minima.append((index, x))
+
+        # 移除已離開視窗的極值
+        start = self._count - self.window
+        while self._maxima and self._maxima[0][0] < start:
+            self._maxima.popleft()
+        while self._minima and self._minima[0][0] < start:
+            self._minima.popleft()
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def mean(self, min_periods):
+        if len(self.values) < min_periods or self._nans:
+            return NAN
+        return (self._sum + self._compensation) / len(self.values)
+
+    def max(self):
+        return self._maxima[0][1] if self.full and not self._nans else NAN
+
+    def min(self):
+        return self._minima[0][1] if self.full and not self._nans else NAN
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['window'], data['values'])
+
+
+# ==================== 指標狀態 ====================
+
+class MAState:
+    """移動平均線 (min_periods=1，與 indicators 引擎相同)"""
+
+    name = 'MA'
+
+    def __init__(self, windows, windows_state=None):
+        self.windows = tuple(windows)
+        self.states = windows_state or [RollingWindowState(w) for w in self.windows]
+
+    def update(self, bar):
+        for state in self.states:
+            state.update(bar['close'])
+        return {f"MA{w}": state.mean(1) for w, state in zip(self.windows, self.states)}
+
+    def to_dict(self):
+        return {'windows': list(self.windows), 'states': [s.to_dict() for s in self.states]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['windows'], [RollingWindowState.from_dict(s) for s in data['states']])
+
+
+class RSIState:
+    """RSI (平均漲跌幅為簡單移動平均，與 indicators 引擎相同)"""
+
+    name = 'RSI'
+
+    def __init__(self, period, prev_close=NAN, gains=None, losses=None):
+        self.period = period
+        self.prev_close = prev_close
+        self.gains = gains or RollingWindowState(period)
+        self.losses = losses or RollingWindowState(period)
+
+    def update(self, bar):
+        # 第一根 K 棒沒有漲跌，與 pandas 的 where(delta > 0, 0) 相同視為 0
+        delta = bar['close'] - self.prev_close
+        self.gains.update(delta if delta > 0 else 0.0)
+        self.losses.update(-delta if delta < 0 else -0.0)
+        self.prev_close = bar['close']
+
+        rs = _div(self.gains.mean(self.period), self.losses.mean(self.period))
+        return {'RSI': 100 - _div(100, 1 + rs)}
+
+    def to_dict(self):
+        return {
+            'period': self.period, 'prev_close': self.prev_close,
+            'gains': self.gains.to_dict(), 'losses': self.losses.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['period'], data['prev_close'],
+            RollingWindowState.from_dict(data['gains']),
+            RollingWindowState.from_dict(data['losses']),
+        )
+
+
+class KDState:
+    """KD 隨機指標"""
+
+    name = 'KD'
+
+    def __init__(self, n, m1, m2, highs=None, lows=None, k=None, d=None):
+        self.n, self.m1, self.m2 = n, m1, m2
+        self.highs = highs or RollingWindowState(n)
+        self.lows = lows or RollingWindowState(n)
+        self.k = k or EMAState(m1)
+        self.d = d or EMAState(m2)
+
+    def update(self, bar):
+        self.highs.update(bar['high'])
+        self.lows.update(bar['low'])
+        low_min = self.lows.min()
+        rsv = 100 * _div(bar['close'] - low_min, self.highs.max() - low_min)
+        k = self.k.update(rsv)
+        return {'RSV': rsv, 'K': k, 'D': self.d.update(k)}
+
+    def to_dict(self):
+        return {
+            'n': self.n, 'm1': self.m1, 'm2': self.m2,
+            'highs': self.highs.to_dict(), 'lows': self.lows.to_dict(),
+            'k': self.k.to_dict(), 'd': self.d.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['n'], data['m1'], data['m2'],
+            RollingWindowState.from_dict(data['highs']),
+            RollingWindowState.from_dict(data['lows']),
+            EMAState.from_dict(data['k']),
+            EMAState.from_dict(data['d']),
+        )
+
+
+class MACDState:
+    """MACD 指標"""
+
+    name = 'MACD'
+
+    def __init__(self, fast, slow, signal, ema_fast=None, ema_slow=None, ema_signal=None):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.ema_fast = ema_fast or EMAState(fast)
+        self.ema_slow = ema_slow or EMAState(slow)
+        self.ema_signal = ema_signal or EMAState(signal)
+
+    def update(self, bar):
+        macd = self.ema_fast.update(bar['close']) - self.ema_slow.update(bar['close'])
+        macd_signal = self.ema_signal.update(macd)
+        return {'MACD': macd, 'MACD_Signal': macd_signal, 'MACD_Hist': macd - macd_signal}
+
+    def to_dict(self):
+        return {
+            'fast': self.fast, 'slow': self.slow, 'signal': self.signal,
+            'ema_fast': self.ema_fast.to_dict(), 'ema_slow': self.ema_slow.to_dict(),
+            'ema_signal': self.ema_signal.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['fast'], data['slow'], data['signal'],
+            EMAState.from_dict(data['ema_fast']),
+            EMAState.from_dict(data['ema_slow']),
+            EMAState.from_dict(data['ema_signal']),
+        )
+
+
+class WillRState:
+    """威廉指標 %R"""
+
+    name = 'WillR'
+
+    def __init__(self, period, highs=None, lows=None):
+        self.period = period
+        self.highs = highs or RollingWindowState(period)
+        self.lows = lows or RollingWindowState(period)
+
+    def update(self, bar):
+        self.highs.update(bar['high'])
+        self.lows.update(bar['low'])
+        high_max = self.highs.max()
+        return {'WillR': -100 * _div(high_max - bar['close'], high_max - self.lows.min())}
+
+    def to_dict(self):
+        return {'period': self.period, 'highs': self.highs.to_dict(), 'lows': self.lows.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['period'],
+            RollingWindowState.from_dict(data['highs']),
+            RollingWindowState.from_dict(data['lows']),
+        )
+
+
+_STATE_CLASSES = {cls.name: cls for cls in (MAState, RSIState, KDState, MACDState, WillRState)}
+
+
+def _state_from_spec(item):
+    name = item['name']
+    if name == 'MA':
+        return MAState(item['windows'])
+    if name == 'RSI':
+        return RSIState(item['period'])
+    if name == 'KD':
+        return KDState(item['n'], item['m1'], item['m2'])
+    if name == 'MACD':
+        return MACDState(item['fast'], item['slow'], item['signal'])
+    if name == 'WillR':
+        return WillRState(item['period'])
+    raise ValueError(f"未知的指標: {name}")
+
+
+# ==================== 組合狀態 ====================
+
+class IndicatorState:
+    """
+    一檔股票所有指標的增量狀態
+
+    保留加入最後一根 K 棒之前的狀態快照：價格快取會以收盤數據覆寫盤中寫入的最後一根 K 棒，
+    該 K 棒的 OHLC 改變時先還原快照再重新套用，指標不會停留在盤中數值。
+
+    參數:
+        spec: 指標規格清單 (與 indicators.compute_indicators 相同格式)
+    """
+
+    def __init__(self, spec=None, states=None, last_date=None, values=None, last_bar=None, previous=None):
+        self.spec = spec or DEFAULT_INDICATOR_SPEC
+        self.states = states or [_state_from_spec(item) for item in self.spec]
+        self.last_date = last_date
+        # 最後一根 K 棒的指標值
+        self.values = values or {}
+        # 最後一根 K 棒的 high / low / close
+        self.last_bar = last_bar
+        # 加入最後一根 K 棒之前的狀態 (_snapshot 格式)
+        self.previous = previous
+
+    def _snapshot(self):
+        return {
+            'states': [{'name': s.name, 'state': s.to_dict()} for s in self.states],
+            'last_date': self.last_date.strftime('%Y-%m-%d') if self.last_date is not None else None,
+            'values': self.values,
+            'last_bar': self.last_bar,
+        }
+
+    def _restore(self, snapshot):
+        self.states = [_STATE_CLASSES[item['name']].from_dict(item['state']) for item in snapshot['states']]
+        self.last_date = pd.Timestamp(snapshot['last_date']) if snapshot['last_date'] else None
+        self.values = snapshot['values']
+        self.last_bar = snapshot['last_bar']
+        self.previous = None
+
+    def _reset(self):
+        self.states = [_state_from_spec(item) for item in self.spec]
+        self.last_date = None
+        self.values = {}
+        self.last_bar = None
+        self.previous = None
+
+    def _apply(self, bar):
+        bar = {key: (float(bar[key]) if key != 'date' else bar[key])
+               for key in ('date', 'high', 'low', 'close')}
+        values = {}
+        for state in self.states:
+            values.update(state.update(bar))
+        self.last_date = pd.Timestamp(bar['date'])
+        self.values = values
+        self.last_bar = {key: bar[key] for key in ('high', 'low', 'close')}
+        return values
+
+    def update(self, bar):
+        """
+        加入一根新 K 棒
+
+        參數:
+            bar: 含 date, high, low, close 的 dict 或 Series
+
+        返回:
+            dict: 此 K 棒的所有指標值
+        """
+        self.previous = self._snapshot()
+        return self._apply(bar)
+
+    def _last_bar_revised(self, row):
+        if self.last_bar is None:
+            return True
+        return any(
+            not (float(row[key]) == self.last_bar[key]
+                 or (math.isnan(float(row[key])) and math.isnan(self.last_bar[key])))
+            for key in ('high', 'low', 'close')
+        )
+
+    def update_frame(self, df):
+        """
+        依序加入多根 K 棒 (處理 last_date 之後的資料)
+
+        df 中 last_date 那根 K 棒的 OHLC 與先前不同時 (例如盤中數據被收盤數據覆寫)，
+        還原到加入該 K 棒之前的快照並重新套用；沒有快照時 (舊版狀態) 以 df 從頭重算，
+        此時 df 應為完整歷史。
+
+        返回:
+            DataFrame: 新加入 (含修正) K 棒的指標值，沒有新資料時為空 DataFrame
+        """
+        if self.last_date is not None:
+            revised = df[pd.to_datetime(df['date']) == self.last_date]
+            if not revised.empty and self._last_bar_revised(revised.iloc[-1]):
+                if self.previous is not None:
+                    self._restore(self.previous)
+                else:
+                    self._reset()
+        if self.last_date is not None:
+            df = df[pd.to_datetime(df['date']) > self.last_date]
+
+        rows = []
+        records = [row._asdict() for row in df.itertuples(index=False)]
+        for i, record in enumerate(records):
+            # 只有最後一根 K 棒之前需要保存快照
+            values = self.update(record) if i == len(records) - 1 else self._apply(record)
+            rows.append(dict(date=record['date'], **values))
+        return pd.DataFrame(rows)
+
+    def to_json(self):
+        """序列化為 JSON 字串"""
+        data = self._snapshot()
+        data['spec'] = [dict(item, windows=list(item['windows'])) if 'windows' in item else item
+                        for item in self.spec]
+        data['previous'] = self.previous
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, text):
+        """由 JSON 字串還原"""
+        data = json.loads(text)
+        states = [_STATE_CLASSES[item['name']].from_dict(item['state']) for item in data['states']]
+        last_date = pd.Timestamp(data['last_date']) if data['last_date'] else None
+        return cls(data['spec'], states, last_date, data.get('values'), data.get('last_bar'), data.get('previous'))
+
+
+# ==================== 與價格快取整合 ====================
+
+def refresh_symbol_state(symbol, spec=None, db_path=price_cache.DEFAULT_DB_PATH):
+    """
+    以快取中尚未處理的 K 棒推進一檔股票的指標狀態並存回快取
+
+    參數:
+        symbol: 股票代碼
+        spec: 指標規格清單 (僅在尚無狀態時使用)
+        db_path: SQLite 檔案路徑
+
+    返回:
+        int: 本次處理的 K 棒數
+    """
+    text = price_cache.load_indicator_state(symbol, db_path)
+    state = IndicatorState.from_json(text) if text else IndicatorState(spec)
+
+    prices = price_cache.load_prices(symbol, db_path)
+    if prices is None:
+        return 0
+
+    new_rows = state.update_frame(prices)
+    if not new_rows.empty:
+        price_cache.save_indicator_state(symbol, state.to_json(), state.last_date, db_path)
+    return len(new_rows)
+
+
+def refresh_all_states(symbols, spec=None, db_path=price_cache.DEFAULT_DB_PATH):
+    """
+    推進多檔股票的指標狀態
+
+    返回:
+        dict: 股票代碼 -> 處理的 K 棒數
+    """
+    return {symbol: refresh_symbol_state(symbol, spec, db_path) for symbol in symbols}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以價格快取增量更新所有股票的指標狀態")
+    parser.add_argument('--companies', default='tw_all_listed_otc.csv', help="公司清單 CSV")
+    parser.add_argument('--db', default=price_cache.DEFAULT_DB_PATH, help="SQLite 快取路徑")
+    args = parser.parse_args()
+
+    companies = pd.read_csv(args.companies, dtype={'公司代號': str})
+    processed = refresh_all_states(companies['公司代號'], db_path=args.db)
+    updated = sum(1 for count in processed.values() if count)
+    print(f"更新 {updated} 檔股票的指標狀態，共處理 {sum(processed.values())} 根 K 棒")
+
+
+if __name__ == "__main__":
+    main()
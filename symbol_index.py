@@ -0,0 +1,194 @@
+"""
+股票代碼索引
+由上市櫃公司清單 (tw_all_listed_otc.csv) 建立記憶體索引，以代碼或中文名稱做
+前綴、子字串、簡稱 (依序包含的字元，例如「台積電」) 與模糊比對，供側邊欄即時搜尋；
+ETF 來自另一份清單 (tw_etf.csv)；兩份清單都沒有的代碼在本地即被拒絕，不會呼叫 FinMind。
+索引在每個行程只建立一次，清單檔案更新後才重新建立。
+"""
+
+import bisect
+import difflib
+import os
+import re
+import threading
+
+import pandas as pd
+
+import company_refresher
+
+# ==================== 設定 ====================
+
+COMPANY_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tw_all_listed_otc.csv")
+
+# 清單檔案不存在時，只檢查代碼格式
+CODE_PATTERN = re.compile(r"^\d{4,6}[A-Z]?$")
+
+# 搜尋結果最多筆數
+DEFAULT_LIMIT = 10
+
+# 模糊比對的相似度下限 (difflib ratio)
+FUZZY_CUTOFF = 0.6
+
+# 顯示與搜尋時省略的公司名稱後綴
+NAME_SUFFIXES = ("股份有限公司", "有限公司")
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+
+# ==================== 索引 ====================
+
+def normalize(text):
+    """
+    返回:
+        str: 去除空白、統一「臺 / 台」並轉為大寫的搜尋字串
+    """
+    return re.sub(r"\s+", "", str(text)).replace("臺", "台").upper()
+
+
+def short_name(name):
+    """
+    返回:
+        str: 去除「股份有限公司」等後綴的公司簡稱
+    """
+    for suffix in NAME_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _is_subsequence(query, text):
+    """query 的每個字元是否依序出現在 text 中 (簡稱比對)"""
+    position = 0
+    for char in query:
+        position = text.find(char, position) + 1
+        if position == 0:
+            return False
+    return True
+
+
+class SymbolIndex:
+    """公司代碼與名稱的記憶體索引"""
+
+    def __init__(self, companies):
+        """
+        參數:
+            companies: 含 公司代號、公司名稱 (與 市場) 欄位的 DataFrame
+        """
+        markets = companies['市場'] if '市場' in companies.columns else [''] * len(companies)
+        self.entries = {}
+        for code, name, market in zip(companies['公司代號'], companies['公司名稱'], markets):
+            code = str(code).strip()
+            name = short_name(str(name).strip())
+            self.entries[code] = {'symbol': code, 'name': name, 'market': market if isinstance(market, str) else ''}
+
+        self._codes = sorted(self.entries)
+        self._names = [(normalize(entry['name']), code) for code, entry in self.entries.items()]
+        self._sorted_names = sorted(self._names)
+        self._name_keys = [name for name, _ in self._sorted_names]
+        self._name_codes = [code for _, code in self._sorted_names]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, code):
+        """
+        返回:
+            dict: {'symbol', 'name', 'market'}，不存在時返回 None
+        """
+        return self.entries.get(str(code).strip())
+
+    def _prefix(self, keys, values, query):
+        start = bisect.bisect_left(keys, query)
+        end = bisect.bisect_left(keys, query + "\uffff")
+        return values[start:end]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        搜尋股票
+
+        依序為: 代碼完全相同、代碼前綴、名稱前綴、名稱子字串、簡稱 (依序包含的字元)、
+        代碼或名稱的模糊比對；同一層內保持代碼順序。
+
+        參數:
+            query: 代碼或中文名稱 (可只輸入一部分)
+            limit: 最多返回筆數
+
+        返回:
+            list: {'symbol', 'name', 'market'} 清單
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        found = []
+        seen = set()
+
+        def add(codes):
+            for code in codes:
+                if code not in seen:
+                    seen.add(code)
+                    found.append(code)
+
+        if query in self.entries:
+            add([query])
+        add(self._prefix(self._codes, self._codes, query))
+        add(sorted(self._prefix(self._name_keys, self._name_codes, query)))
+        if len(found) < limit:
+            add(sorted(code for name, code in self._names if query in name))
+        if len(found) < limit and len(query) > 1:
+            add(sorted(code for name, code in self._names if _is_subsequence(query, name)))
+        if len(found) < limit:
+            by_name = dict(self._names)
+            add(difflib.get_close_matches(query, self._codes, n=limit, cutoff=FUZZY_CUTOFF))
+            add(by_name[name] for name in difflib.get_close_matches(query, list(by_name), n=limit, cutoff=FUZZY_CUTOFF))
+
+        return [self.entries[code] for code in found[:limit]]
+
+    def resolve(self, query):
+        """
+        將輸入解析為股票代碼 (不呼叫 API)
+
+        接受清單中的代碼 (含 ETF 清單)、完整的公司簡稱，以及「代碼 名稱」格式 (取第一段)。
+        清單中沒有的代碼 (例如打錯的 ETF 代碼) 返回 None。
+
+        返回:
+            str: 股票代碼，無法確定時返回 None
+        """
+        text = str(query).strip()
+        if not text:
+            return None
+        code = normalize(text.split()[0])
+        if code in self.entries:
+            return code
+        if not self.entries and CODE_PATTERN.match(code):
+            return code
+
+        name = normalize(text)
+        matches = [entry_code for entry_name, entry_code in self._names if entry_name == name]
+        return matches[0] if len(matches) == 1 else None
+
+
+def load_index(path=COMPANY_LIST_PATH, parquet_path=company_refresher.COMPANY_PARQUET_PATH,
+               etf_path=company_refresher.ETF_LIST_PATH):
+    """
+    取得公司清單與 ETF 清單的索引 (每個行程只建立一次，檔案修改時間改變時重新建立)
+
+    清單由 company_refresher 更新時會同時寫入 Parquet，較新時直接讀取 Parquet。
+
+    返回:
+        SymbolIndex: 索引；清單檔案不存在時為空索引
+    """
+    mtime = tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in (path, etf_path))
+    key = (path, etf_path)
+    with _index_lock:
+        cached = _index_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        companies = company_refresher.read_company_list(path, parquet_path)
+        if mtime[0] is not None or os.path.exists(parquet_path):
+            companies = pd.concat([companies, company_refresher.read_etf_list(etf_path)], ignore_index=True)
+        index = SymbolIndex(companies)
+        _index_cache[key] = (mtime, index)
+        return index
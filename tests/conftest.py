@@ -0,0 +1,71 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 模組位於專案根目錄 (沒有套件結構)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_prices(num_days=300, seed=0, start='2024-01-02'):
+    """隨機漫步的日線數據 (date, open, high, low, close, volume)"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, num_days)))
+    spread = close * np.abs(rng.normal(0, 0.01, num_days))
+    return pd.DataFrame({
+        'date': pd.bdate_range(start, periods=num_days),
+        'open': close * (1 + rng.normal(0, 0.005, num_days)),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.integers(1_000, 1_000_000, num_days),
+    })
+
+
+def make_statements(num_quarters=8, seed=0, start='2023-03-31'):
+    """
+    每季一列的損益表、資產負債表與現金流量表 (FinMind pivot 後的寬表)
+
+    返回:
+        tuple: (income_df, balance_df, cashflow_df)，現金流量為年初至今累計數
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=num_quarters, freq='QE')
+    revenue = rng.uniform(800, 1200, num_quarters)
+    income = pd.DataFrame({
+        'date': dates,
+        'Revenue': revenue,
+        'GrossProfit': revenue * rng.uniform(0.3, 0.5, num_quarters),
+        'OperatingIncome': revenue * rng.uniform(0.1, 0.2, num_quarters),
+        'IncomeAfterTaxes': revenue * rng.uniform(0.05, 0.15, num_quarters),
+        'EPS': rng.uniform(1, 3, num_quarters),
+    })
+    assets = rng.uniform(5000, 6000, num_quarters)
+    balance = pd.DataFrame({
+        'date': dates,
+        'TotalAssets': assets,
+        'Equity': assets * 0.6,
+        'Liabilities': assets * 0.4,
+        'NoncurrentLiabilities': assets * rng.uniform(0.1, 0.2, num_quarters),
+        'CurrentAssets': assets * rng.uniform(0.3, 0.4, num_quarters),
+        'CurrentLiabilities': assets * rng.uniform(0.15, 0.25, num_quarters),
+        'OrdinaryShare': np.full(num_quarters, 1000.0),
+    })
+    quarterly_cfo = rng.uniform(50, 200, num_quarters)
+    cashflow = pd.DataFrame({
+        'date': dates,
+        'CashFlowsFromOperatingActivities': pd.Series(quarterly_cfo).groupby(dates.year).cumsum().to_numpy(),
+    })
+    return income, balance, cashflow
+
+
+@pytest.fixture
+def prices():
+    return make_prices()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "market_data.db")
@@ -0,0 +1,197 @@
+import json
+import os
+import types
+from datetime import datetime
+
+import pytest
+import requests
+import streamlit as st
+
+import ai_client
+import batch_reports
+import fscore_store
+import http_client
+import market_warehouse
+import mock_openai_server
+import price_cache
+import report_store
+
+SYMBOLS = ['2330', '2317', '2454']
+
+# FinMind v4 回應格式的樣本 (2330)，其他代碼沿用同一份數據
+FINMIND_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "finmind")
+
+START_DATE = '2024-07-01'
+END_DATE = '2024-09-30'
+
+
+class FakeClock:
+    """取代 http_client 的 time 模組，限流等待只推進虛擬時間"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FinMindSession:
+    """取代 http_client 的共用 Session，依 dataset 回放 FinMind 回應樣本"""
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        assert url == http_client.FINMIND_API_URL
+        self.requests.append(params)
+        with open(os.path.join(FINMIND_FIXTURES, f"{params['dataset']}.json"), encoding='utf-8') as f:
+            payload = json.load(f)
+        for row in payload['data']:
+            row['stock_id'] = params['data_id']
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = json.dumps(payload).encode('utf-8')
+        return response
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    monkeypatch.setattr(mock_openai_server.MockOpenAIHandler, 'stats', {'requests': 0, 'max_concurrent': 0})
+    server = mock_openai_server.serve(port=0)
+    yield server, mock_openai_server.MockOpenAIHandler.stats
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(http_client, 'time', types.SimpleNamespace(
+        monotonic=fake.monotonic, perf_counter=fake.perf_counter, sleep=fake.sleep))
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def finmind(monkeypatch, tmp_path):
+    """FinMind 回應經由 http_client 回放，本地資料庫改寫到暫存目錄"""
+    session = FinMindSession()
+    monkeypatch.setattr(http_client, 'get_session', lambda: session)
+    monkeypatch.setattr(http_client, '_buckets', {})
+
+    db_path = str(tmp_path / "market_data.db")
+    for module in (price_cache, market_warehouse, fscore_store):
+        connect = module._connect
+        monkeypatch.setattr(module, '_connect', lambda path, connect=connect: connect(
+            db_path if path == price_cache.DEFAULT_DB_PATH else path))
+
+    st.cache_data.clear()
+    yield session
+    st.cache_data.clear()
+
+
+def run(server, tmp_path, output, **kwargs):
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    options = dict(api_key='test', base_url=base_url, concurrency=1, start_date=START_DATE, end_date=END_DATE,
+                   output_dir=str(tmp_path / output), ai_cache_path=str(tmp_path / "ai.db"))
+    options.update(kwargs)
+    return batch_reports.run_batch(SYMBOLS, options.pop('api_key'), **options)
+
+
+def test_reports_are_persisted(mock_server, clock, tmp_path, finmind):
+    server, stats = mock_server
+    summary = run(server, tmp_path, "reports")
+
+    assert stats['requests'] == len(SYMBOLS)
+    # 每檔股票都經由與互動頁面相同的數據流程下載各數據集
+    fetched = {(params['data_id'], params['dataset']) for params in finmind.requests}
+    datasets = [os.path.splitext(name)[0] for name in os.listdir(FINMIND_FIXTURES)]
+    assert fetched == {(symbol, dataset) for symbol in SYMBOLS for dataset in datasets}
+    assert fscore_store.load_history('2330', str(tmp_path / "market_data.db")) is not None
+    run_name = report_store.list_report_runs(str(tmp_path / "reports"))[0]
+    saved = report_store.load_run_summary(run_name, str(tmp_path / "reports"))
+    assert [report['symbol'] for report in saved['reports']] == SYMBOLS
+    assert all(report['status'] == 'ok' for report in summary['reports'])
+
+    report = report_store.load_report(run_name, '2330', str(tmp_path / "reports"))
+    assert report['report'] == mock_openai_server.MOCK_REPORT
+    assert report['usage']['total_tokens'] > 0
+    assert (tmp_path / "reports" / run_name / "2330.md").read_text(encoding='utf-8').startswith("# 2330")
+
+
+def test_tpm_limit_throttles_requests(mock_server, clock, tmp_path, monkeypatch):
+    server, stats = mock_server
+    estimates = []
+    build = batch_reports.build_report_request
+
+    def recording_build(*args, **kwargs):
+        request = build(*args, **kwargs)
+        estimates.append(request['tokens'] + batch_reports.COMPLETION_TOKEN_RESERVE)
+        return request
+
+    # 容量只夠前兩份報告，第三份需等待不足的 token 以每秒 tpm / 60 補充
+    probe = build('2330', "", START_DATE, END_DATE)
+    tpm = 2 * (probe['tokens'] + batch_reports.COMPLETION_TOKEN_RESERVE)
+    monkeypatch.setattr(batch_reports, 'build_report_request', recording_build)
+    run(server, tmp_path, "reports", tpm=tpm)
+
+    assert stats['requests'] == len(SYMBOLS)
+    assert sum(estimates) > tpm
+    assert sum(clock.sleeps) == pytest.approx((sum(estimates) - tpm) / (tpm / 60))
+
+
+def test_rerun_hits_ai_cache(mock_server, clock, tmp_path):
+    server, stats = mock_server
+    run(server, tmp_path, "first", tpm=6000)
+    waited = sum(clock.sleeps)
+
+    summary = run(server, tmp_path, "second", tpm=6000)
+
+    # 快取命中不呼叫伺服器，也不消耗 TPM 額度
+    assert stats['requests'] == len(SYMBOLS)
+    assert sum(clock.sleeps) == waited
+    assert all(report['cached'] for report in summary['reports'])
+    run_name = report_store.list_report_runs(str(tmp_path / "second"))[0]
+    assert report_store.load_report(run_name, '2454', str(tmp_path / "second"))['report'] == \
+        mock_openai_server.MOCK_REPORT
+
+
+def test_forced_rerun_bypasses_cache(mock_server, clock, tmp_path):
+    server, stats = mock_server
+    run(server, tmp_path, "first")
+    summary = run(server, tmp_path, "second", force=True)
+
+    assert stats['requests'] == 2 * len(SYMBOLS)
+    assert not any(report['cached'] for report in summary['reports'])
+
+
+def test_summary_reports_only_this_run(mock_server, clock, tmp_path):
+    server, stats = mock_server
+    ai_client.usage_stats.record('earlier-model', 1.0, usage={'prompt_tokens': 10, 'completion_tokens': 10})
+    run(server, tmp_path, "first", model='test-model')
+
+    summary = run(server, tmp_path, "second", model='test-model', force=True)
+
+    assert set(summary['openai_stats']) == {'test-model'}
+    assert summary['openai_stats']['test-model']['count'] == len(SYMBOLS)
+
+
+def test_runs_in_the_same_second_do_not_share_a_directory(tmp_path):
+    started_at = datetime(2024, 10, 15, 9, 30)
+    run_dirs = [report_store.create_run_dir(started_at, str(tmp_path)) for _ in range(3)]
+
+    assert [os.path.basename(path) for path in run_dirs] == ["20241015-093000", "20241015-093000-2",
+                                                             "20241015-093000-3"]
+    for path in run_dirs:
+        report_store.write_summary(path, {'reports': []})
+    assert report_store.list_report_runs(str(tmp_path)) == ["20241015-093000-3", "20241015-093000-2",
+                                                            "20241015-093000"]
@@ -0,0 +1,169 @@
+import os
+import types
+
+import pytest
+
+import company_refresher
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+SOURCES = {'twse': fixture("mops_twse.csv"), 'tpex': fixture("mops_tpex.csv")}
+CHANGED_SOURCES = {'twse': fixture("mops_twse_changed.csv"), 'tpex': fixture("mops_tpex_changed.csv")}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {
+        'output_dir': str(tmp_path),
+        'list_path': str(tmp_path / "tw_all_listed_otc.csv"),
+        'parquet_path': str(tmp_path / "cache" / "companies.parquet"),
+        'state_path': str(tmp_path / "cache" / "company_sources.json"),
+    }
+
+
+def output_files(paths):
+    names = [filename for _, filename in company_refresher.MARKETS.values()]
+    return [os.path.join(paths['output_dir'], name) for name in names] + [paths['list_path'], paths['parquet_path']]
+
+
+def codes(df):
+    return sorted(df['公司代號'])
+
+
+def test_first_run_writes_all_outputs(paths):
+    summary = company_refresher.refresh(SOURCES, **paths)
+
+    assert summary['written']
+    assert summary['updated'] == ['twse', 'tpex']
+    assert summary['counts'] == {'twse': 4, 'tpex': 4}
+    companies = company_refresher.read_company_list(paths['list_path'], paths['parquet_path'])
+    assert companies['公司代號'].tolist() == ['1101', '1102', '2317', '2330', '3105', '5347', '6488', '8069']
+
+
+def test_unchanged_source_is_not_rewritten(paths):
+    company_refresher.refresh(SOURCES, **paths)
+    mtimes = [os.stat(path).st_mtime_ns for path in output_files(paths)]
+
+    summary = company_refresher.refresh(SOURCES, **paths)
+
+    assert summary['updated'] == []
+    assert not summary['written']
+    assert [os.stat(path).st_mtime_ns for path in output_files(paths)] == mtimes
+
+
+def test_diff_reports_added_removed_renamed_moved(paths):
+    company_refresher.refresh(SOURCES, **paths)
+
+    summary = company_refresher.refresh(CHANGED_SOURCES, **paths)
+
+    assert summary['written']
+    assert codes(summary['added']) == ['2454']
+    assert codes(summary['removed']) == ['1102']
+    assert codes(summary['renamed']) == ['1101']
+    moved = summary['moved'].iloc[0]
+    assert (moved['公司代號'], moved['市場_舊'], moved['市場_新']) == ('6488', "上櫃(TPEx)", "上市(TWSE)")
+    assert summary['counts'] == {'twse': 5, 'tpex': 3}
+
+
+def test_atomic_write_keeps_permissions(paths):
+    umask = os.umask(0o022)
+    try:
+        company_refresher.refresh(SOURCES, **paths)
+    finally:
+        os.umask(umask)
+    for path in output_files(paths):
+        assert os.stat(path).st_mode & 0o777 == 0o644
+
+    # 既有檔案沿用原本的權限
+    os.chmod(paths['list_path'], 0o640)
+    company_refresher.refresh(CHANGED_SOURCES, **paths)
+    assert os.stat(paths['list_path']).st_mode & 0o777 == 0o640
+
+    leftovers = [name for name in os.listdir(paths['output_dir']) if name.startswith(".tmp-")]
+    assert leftovers == []
+
+
+def test_not_modified_response_skips_download(paths, monkeypatch):
+    with open(fixture("mops_twse.csv"), 'rb') as f:
+        content = f.read()
+    requests_seen = []
+
+    def http_get(url, timeout=None, endpoint=None, headers=None):
+        requests_seen.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            return types.SimpleNamespace(status_code=304)
+        return types.SimpleNamespace(status_code=200, content=content, raise_for_status=lambda: None,
+                                     headers={'ETag': '"v1"', 'Last-Modified': "Tue, 15 Oct 2024 00:00:00 GMT"})
+
+    monkeypatch.setattr(company_refresher.http_client, 'http_get', http_get)
+    sources = {'twse': "https://example.com/t187ap03_L.csv", 'tpex': fixture("mops_tpex.csv")}
+
+    company_refresher.refresh(sources, **paths)
+    summary = company_refresher.refresh(sources, **paths)
+
+    assert requests_seen[0] == {}
+    assert requests_seen[1] == {'If-None-Match': '"v1"', 'If-Modified-Since': "Tue, 15 Oct 2024 00:00:00 GMT"}
+    assert summary['updated'] == []
+    assert not summary['written']
+    assert summary['counts'] == {'twse': 4, 'tpex': 4}
+
+
+def test_truncated_source_is_rejected(paths):
+    company_refresher.refresh(SOURCES, **paths)
+    with open(paths['list_path'], 'rb') as f:
+        before = f.read()
+
+    with pytest.raises(ValueError, match="只解析出 1 家"):
+        company_refresher.refresh({**SOURCES, 'twse': fixture("mops_twse_truncated.csv")}, **paths)
+
+    with open(paths['list_path'], 'rb') as f:
+        assert f.read() == before
+
+
+def test_html_error_page_is_rejected(paths, tmp_path):
+    company_refresher.refresh(SOURCES, **paths)
+    error_page = tmp_path / "error.html"
+    error_page.write_text("<html><body>系統忙碌中，請稍後再試</body></html>", encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        company_refresher.refresh({**SOURCES, 'twse': str(error_page)}, **paths)
+
+
+def stock_info(rows):
+    def finmind_request(dataset, **params):
+        assert dataset == company_refresher.ETF_DATASET
+        data = [{'stock_id': code, 'stock_name': name, 'type': 'twse'} for code, name in rows]
+        return types.SimpleNamespace(raise_for_status=lambda: None, json=lambda: {'data': data})
+    return finmind_request
+
+
+def test_refresh_etfs_keeps_only_etf_codes(tmp_path, monkeypatch):
+    path = str(tmp_path / "tw_etf.csv")
+    monkeypatch.setattr(company_refresher.http_client, 'finmind_request',
+                        stock_info([('2330', '台積電'), ('00878', '國泰永續高股息'), ('0050', '元大台灣50'),
+                                    ('0050', '元大台灣50'), ('00632R', '元大台灣50反1')]))
+
+    summary = company_refresher.refresh_etfs(path=path)
+    assert summary['written'] and summary['count'] == 3
+    etfs = company_refresher.read_etf_list(path)
+    assert codes(etfs) == ['0050', '00632R', '00878']
+    assert set(etfs['市場']) == {company_refresher.ETF_MARKET}
+
+    assert not company_refresher.refresh_etfs(path=path)['written']
+
+
+def test_refresh_etfs_rejects_truncated_response(tmp_path, monkeypatch):
+    path = str(tmp_path / "tw_etf.csv")
+    monkeypatch.setattr(company_refresher.http_client, 'finmind_request',
+                        stock_info([(f"00{n}", f"ETF {n}") for n in range(700, 710)]))
+    company_refresher.refresh_etfs(path=path)
+
+    monkeypatch.setattr(company_refresher.http_client, 'finmind_request', stock_info([('0050', '元大台灣50')]))
+    with pytest.raises(ValueError):
+        company_refresher.refresh_etfs(path=path)
+    assert len(company_refresher.read_etf_list(path)) == 10
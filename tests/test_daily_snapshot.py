@@ -0,0 +1,93 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import daily_snapshot
+import price_cache
+from conftest import make_prices
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SNAPSHOT_PATH = os.path.join(FIXTURES, "finmind_snapshot_2024-10-15.csv")
+
+
+def cache_history(symbol, last_date, db_path):
+    """快取一段結束於 last_date 的日線歷史"""
+    history = make_prices(num_days=30, start=pd.Timestamp(last_date) - pd.offsets.BDay(29))
+    price_cache.save_prices(symbol, history, db_path)
+    return history
+
+
+def cached_dates(symbol, db_path):
+    return price_cache.load_prices(symbol, db_path)['date'].dt.strftime('%Y-%m-%d').tolist()
+
+
+def test_contiguous_symbol_is_appended(db_path):
+    cache_history('2330', '2024-10-14', db_path)
+
+    summary = daily_snapshot.run(fixture=SNAPSHOT_PATH, db_path=db_path)
+
+    assert summary['written'] == 1
+    assert sorted(summary['uncached']) == ['1101', '2317']
+    assert cached_dates('2330', db_path)[-1] == '2024-10-15'
+    assert price_cache.load_prices('2330', db_path)['close'].iloc[-1] == 1035.0
+
+
+def test_symbol_with_gap_is_skipped(db_path):
+    # 快取整體停在 10-04，10-07 ~ 10-14 的 K 棒不存在
+    cache_history('2330', '2024-10-04', db_path)
+    cache_history('2317', '2024-10-04', db_path)
+
+    summary = daily_snapshot.run(fixture=SNAPSHOT_PATH, db_path=db_path)
+
+    assert summary['written'] == 0
+    assert sorted(summary['gap']) == ['2317', '2330']
+    assert cached_dates('2330', db_path)[-1] == '2024-10-04'
+    assert price_cache.get_fetch_start_date('2330', db_path) == '2024-10-04'
+
+
+def test_reingest_same_date_is_idempotent(db_path):
+    cache_history('2330', '2024-10-14', db_path)
+
+    first = daily_snapshot.run(fixture=SNAPSHOT_PATH, db_path=db_path)
+    after_first = price_cache.load_prices('2330', db_path)
+    second = daily_snapshot.run(fixture=SNAPSHOT_PATH, db_path=db_path)
+
+    assert first['written'] == second['written'] == 1
+    pd.testing.assert_frame_equal(price_cache.load_prices('2330', db_path), after_first)
+
+
+def test_holiday_uses_trading_calendar(db_path):
+    # 10-10 國慶日休市: 有交易日曆時 10-09 之後可直接接上 10-11
+    cache_history('2330', '2024-10-09', db_path)
+    snapshot = daily_snapshot.load_fixture(SNAPSHOT_PATH).assign(date=pd.Timestamp('2024-10-11'))
+    trading_dates = pd.DatetimeIndex(['2024-10-07', '2024-10-08', '2024-10-09', '2024-10-11'])
+
+    # 沒有日曆時以平日近似，保守地略過
+    assert daily_snapshot.ingest_snapshot(snapshot, db_path)['gap'] == ['2330']
+    assert daily_snapshot.ingest_snapshot(snapshot, db_path, trading_dates)['written'] == 1
+    assert cached_dates('2330', db_path)[-1] == '2024-10-11'
+
+
+def test_exchange_rows_without_date_are_dropped():
+    with open(os.path.join(FIXTURES, "twse_stock_day_all.json"), encoding='utf-8') as f:
+        rows = json.load(f)
+
+    snapshot = daily_snapshot.normalize_exchange_rows(rows, daily_snapshot.TWSE_FIELDS)
+
+    # 空白 Date、缺少 Date 與沒有成交的資料列都不寫入
+    assert snapshot['symbol'].tolist() == ['2330']
+    assert snapshot['date'].tolist() == [pd.Timestamp('2024-10-15')]
+    assert snapshot['close'].tolist() == [1035.0]
+
+    no_date = [{key: value for key, value in row.items() if key != 'Date'} for row in rows]
+    assert daily_snapshot.normalize_exchange_rows(no_date, daily_snapshot.TWSE_FIELDS).empty
+
+
+@pytest.mark.parametrize('date, expected', [
+    ('2024-10-15', '2024-10-14'),
+    ('2024-10-14', '2024-10-11'),
+])
+def test_previous_trading_date_weekday_fallback(date, expected):
+    assert daily_snapshot.previous_trading_date(date) == pd.Timestamp(expected)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fscore_batch
+import fscore_store
+import fundamentals
+from conftest import make_statements
+
+LATEST_QUARTER = pd.Timestamp('2025-12-31')
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """取代 FinMind 下載: 2330 數據完整，2317 最近一季缺少資產負債表"""
+    data = {'2330': make_statements(12, seed=0), '2317': make_statements(12, seed=1)}
+    income, balance, cashflow = data['2317']
+    data['2317'] = (income, balance[balance['date'] != LATEST_QUARTER], cashflow)
+
+    fetchers = {
+        name: (lambda symbol, token="", position=position: data[symbol][position])
+        for position, name in enumerate(fscore_batch.STATEMENT_FETCHERS)
+    }
+    monkeypatch.setattr(fscore_batch, 'STATEMENT_FETCHERS', fetchers)
+    return data
+
+
+def test_save_and_load_history_round_trip(db_path):
+    history = fundamentals.fscore_history(fundamentals.compute_quarterly_fundamentals(*make_statements()))
+
+    assert fscore_store.save_scores(history, symbol='2330', db_path=db_path) == len(history)
+    loaded = fscore_store.load_history('2330', db_path)
+
+    pd.testing.assert_frame_equal(loaded[history.columns], history, check_dtype=False)
+    assert fscore_store.load_history('9999', db_path) is None
+
+
+def test_panel_matches_single_symbol(statements, db_path):
+    history = fscore_batch.run_batch(['2330', '2317'], workers=2, db_path=db_path)
+
+    for symbol, frames in statements.items():
+        single = fundamentals.fscore_history(fundamentals.compute_quarterly_fundamentals(*frames))
+        stored = fscore_store.load_history(symbol, db_path)
+        np.testing.assert_array_equal(stored['F_Score'], single['F_Score'])
+        np.testing.assert_array_equal(stored['F_Count'], single['F_Count'])
+        assert len(history[history['stock_id'] == symbol]) == len(single)
+
+
+def test_ranking_excludes_data_poor_symbols(statements, db_path):
+    fscore_batch.run_batch(['2330', '2317'], workers=2, db_path=db_path)
+
+    ranking = fscore_store.load_ranking(as_of=LATEST_QUARTER, db_path=db_path)
+    counts = dict(zip(ranking['symbol'], ranking['F_Count']))
+    assert counts['2330'] == fundamentals.FSCORE_MAX
+    # 缺少資產負債表的季度只有損益表與現金流量表的 3 項條件
+    assert counts['2317'] == 3
+
+    ranking = fscore_store.load_ranking(as_of=LATEST_QUARTER, min_criteria=fscore_batch.DEFAULT_MIN_CRITERIA,
+                                        db_path=db_path)
+    assert ranking['symbol'].tolist() == ['2330']
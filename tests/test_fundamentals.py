@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+import fundamentals
+from conftest import make_statements
+
+MISSING_QUARTER = pd.Timestamp('2024-03-31')
+
+
+def test_ratios_match_row_formula():
+    income, balance, cashflow = make_statements()
+    table = fundamentals.compute_quarterly_fundamentals(income, balance, cashflow)
+
+    row = table.iloc[0]
+    assert row['ROE'] == row['IncomeAfterTaxes'] / row['Equity'] * 100
+    assert row['流動比率'] == row['CurrentAssets'] / row['CurrentLiabilities']
+
+
+def test_non_positive_denominator_gives_zero():
+    income, balance, _ = make_statements()
+    balance.loc[0, 'Equity'] = -100.0
+    table = fundamentals.compute_quarterly_fundamentals(income, balance).set_index('date')
+
+    assert table.loc[balance.loc[0, 'date'], 'ROE'] == 0.0
+
+
+def test_missing_balance_sheet_quarter_has_no_ratios():
+    income, balance, _ = make_statements()
+    balance = balance[balance['date'] != MISSING_QUARTER]
+    table = fundamentals.compute_quarterly_fundamentals(income, balance).set_index('date')
+
+    for name in ['ROE', 'ROA', '流動比率', '負債比率', '長期負債比率', '資產週轉率']:
+        assert np.isnan(table.loc[MISSING_QUARTER, name]), name
+    # 只依損益表的比率不受影響
+    assert table.loc[MISSING_QUARTER, '毛利率'] > 0
+
+
+def test_latest_ratios_skip_missing_values():
+    income, balance, _ = make_statements()
+    balance = balance[balance['date'] != income['date'].max()]
+    ratios = fundamentals.latest_ratios(fundamentals.compute_quarterly_fundamentals(income, balance))
+
+    assert 'ROE' not in ratios and '負債比率' not in ratios
+    assert set(ratios) == {'毛利率', '淨利率', 'EPS'}
+
+
+def test_missing_balance_sheet_quarter_is_not_scored():
+    income, balance, cashflow = make_statements(num_quarters=12)
+    balance = balance[balance['date'] != MISSING_QUARTER]
+    table = fundamentals.compute_quarterly_fundamentals(income, balance, cashflow).set_index('date')
+
+    row = table.loc[MISSING_QUARTER]
+    for name in ['ROA正值', 'ROA年增', '長期負債比下降', '流動比率上升', '未發行新股', '資產週轉率上升']:
+        assert np.isnan(row[f'F_{name}']), name
+    # 只依損益表與現金流量表的條件仍計分
+    assert row['F_Count'] == 3
+    # 去年同季缺資產負債表時，今年的年增條件也不計分
+    next_year = table.loc[MISSING_QUARTER + pd.DateOffset(years=1)]
+    assert np.isnan(next_year['F_ROA年增'])
+    assert next_year['F_ROA正值'] == 1
+
+
+def test_complete_quarters_count_all_criteria():
+    income, balance, cashflow = make_statements()
+    table = fundamentals.compute_quarterly_fundamentals(income, balance, cashflow)
+
+    history = fundamentals.fscore_history(table)
+    # 前四季沒有去年同季可比較
+    assert history['F_Count'].tolist() == [fundamentals.FSCORE_MAX] * 4 + [3] * 4
+    flags = history[[f'F_{name}' for name in fundamentals.FSCORE_CRITERIA]]
+    assert (history['F_Score'] == flags.sum(axis=1)).all()
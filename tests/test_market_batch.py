@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+
+import market_batch
+import price_cache
+from conftest import make_prices
+from indicators import DEFAULT_INDICATOR_SPEC, compute_indicator_arrays, compute_indicators, indicator_columns
+
+
+def test_empty_cache_returns_empty_frame(db_path, tmp_path):
+    output_path = str(tmp_path / "panel.parquet")
+    long_df = market_batch.run_batch(output_path=output_path, db_path=db_path)
+    assert long_df.empty
+    assert not os.path.exists(output_path)
+
+
+def test_filter_matching_nothing(db_path, tmp_path, prices):
+    price_cache.save_prices('2330', prices, db_path)
+    output_path = str(tmp_path / "panel.parquet")
+    assert market_batch.run_batch(['9999'], output_path=output_path, db_path=db_path).empty
+    assert market_batch.run_batch(start_date='2100-01-01', output_path=output_path, db_path=db_path).empty
+    assert not os.path.exists(output_path)
+
+
+def test_zero_length_arrays():
+    empty = np.empty((0, 3))
+    arrays = compute_indicator_arrays(empty, empty, empty)
+    assert set(arrays) == set(indicator_columns(DEFAULT_INDICATOR_SPEC))
+    assert all(values.shape == (0, 3) for values in arrays.values())
+
+
+def test_panel_matches_single_symbol(db_path, tmp_path):
+    for i, symbol in enumerate(['2317', '2330']):
+        price_cache.save_prices(symbol, make_prices(seed=i), db_path)
+
+    long_df = market_batch.run_batch(output_path=str(tmp_path / "panel.parquet"), db_path=db_path)
+    single = compute_indicators(price_cache.load_prices('2330', db_path))
+    panel_rows = long_df[long_df['symbol'] == '2330'].reset_index(drop=True)
+    # 面板輸出為 float32
+    np.testing.assert_allclose(panel_rows['RSI'], single['RSI'], rtol=1e-5, equal_nan=True)
+
+
+def test_suspended_symbol_matches_single_symbol(db_path, tmp_path):
+    price_cache.save_prices('2317', make_prices(seed=0), db_path)
+    # 2330 停牌 3 天且晚 20 天上市，面板上這些日期為 NaN
+    suspended = make_prices(seed=1).drop(index=[120, 121, 122]).iloc[20:]
+    price_cache.save_prices('2330', suspended, db_path)
+
+    long_df = market_batch.run_batch(output_path=str(tmp_path / "panel.parquet"), db_path=db_path)
+    single = compute_indicators(price_cache.load_prices('2330', db_path))
+    panel_rows = long_df[long_df['symbol'] == '2330'].reset_index(drop=True)
+
+    assert panel_rows['date'].tolist() == single['date'].tolist()
+    for column in indicator_columns(DEFAULT_INDICATOR_SPEC):
+        np.testing.assert_allclose(panel_rows[column], single[column], rtol=1e-4, atol=1e-4,
+                                   equal_nan=True, err_msg=column)
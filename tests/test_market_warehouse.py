@@ -0,0 +1,68 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import market_warehouse
+
+DATASET = "TaiwanStockFinancialStatements"
+
+
+def statements(value):
+    return pd.DataFrame({
+        'date': ['2024-03-31', '2024-03-31', '2024-06-30'],
+        'type': ['Revenue', 'EPS', 'Revenue'],
+        'value': [100.0, 1.5, value],
+    })
+
+
+def test_restatement_invalidates_pivot_cache(db_path):
+    market_warehouse.save_statements('2330', DATASET, statements(120.0), db_path)
+    before = market_warehouse.load_statement_pivot('2330', DATASET, db_path)
+    assert before.loc[before['date'] == '2024-06-30', 'Revenue'].item() == 120.0
+
+    # 重編: 最後一季與筆數都不變，只有數值改變
+    market_warehouse.save_statements('2330', DATASET, statements(125.0), db_path)
+    after = market_warehouse.load_statement_pivot('2330', DATASET, db_path)
+    assert after.loc[after['date'] == '2024-06-30', 'Revenue'].item() == 125.0
+
+
+def test_unchanged_statements_reuse_pivot(db_path, monkeypatch):
+    market_warehouse.save_statements('2317', DATASET, statements(80.0), db_path)
+    market_warehouse.load_statement_pivot('2317', DATASET, db_path)
+
+    monkeypatch.setattr(market_warehouse, 'load_statements', pytest.fail)
+    assert market_warehouse.load_statement_pivot('2317', DATASET, db_path) is not None
+
+
+def test_fetch_start_date_refetches_recent_quarters(db_path):
+    assert market_warehouse.get_statement_fetch_start_date('2330', DATASET, db_path) == \
+        market_warehouse.STATEMENT_START_DATE
+    market_warehouse.save_statements('2330', DATASET, statements(120.0), db_path)
+    # 最後快取季度為 2024-06-30，重新下載最近 4 季
+    assert market_warehouse.get_statement_fetch_start_date('2330', DATASET, db_path) == '2023-07-01'
+
+
+def test_refetched_unchanged_quarters_keep_version(db_path):
+    market_warehouse.save_statements('2330', DATASET, statements(120.0), db_path)
+    version = market_warehouse.get_statement_version('2330', DATASET, db_path)
+
+    assert market_warehouse.save_statements('2330', DATASET, statements(120.0), db_path) == 0
+    assert market_warehouse.get_statement_version('2330', DATASET, db_path) == version
+
+    assert market_warehouse.save_statements('2330', DATASET, statements(125.0), db_path) == 1
+    assert market_warehouse.get_statement_version('2330', DATASET, db_path) != version
+
+
+@pytest.mark.parametrize('sql', [
+    "DELETE FROM financial_statement",
+    "INSERT INTO company (symbol, name, market) VALUES ('9999', 'x', 'y')",
+    "DROP TABLE company",
+])
+def test_query_rejects_writes(db_path, sql):
+    market_warehouse.save_statements('2330', DATASET, statements(120.0), db_path)
+
+    with pytest.raises((sqlite3.OperationalError, pd.errors.DatabaseError)):
+        market_warehouse.query(sql, db_path=db_path)
+
+    assert len(market_warehouse.query("SELECT * FROM financial_statement", db_path=db_path)) == 3
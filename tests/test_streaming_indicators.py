@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from indicators import DEFAULT_INDICATOR_SPEC, compute_indicators, indicator_columns
+from streaming_indicators import IndicatorState, RollingWindowState
+
+
+def assert_matches_batch(state_values, batch_row):
+    for column in indicator_columns(DEFAULT_INDICATOR_SPEC):
+        np.testing.assert_allclose(state_values[column], batch_row[column], rtol=1e-9, equal_nan=True)
+
+
+def test_update_frame_matches_batch(prices):
+    state = IndicatorState()
+    first = state.update_frame(prices.iloc[:200])
+    restored = IndicatorState.from_json(state.to_json())
+    rest = restored.update_frame(prices)
+
+    streamed = pd.concat([first, rest], ignore_index=True)
+    batch = compute_indicators(prices)
+    assert len(streamed) == len(prices)
+    for column in indicator_columns(DEFAULT_INDICATOR_SPEC):
+        np.testing.assert_allclose(streamed[column], batch[column], rtol=1e-9, equal_nan=True)
+
+
+def test_revised_last_bar_is_reapplied(prices):
+    # 盤中寫入的最後一根 K 棒，之後被收盤數據覆寫
+    intraday = prices.copy()
+    intraday.loc[intraday.index[-1], ['high', 'low', 'close']] *= [1.05, 0.9, 0.92]
+
+    state = IndicatorState()
+    state.update_frame(intraday)
+    state = IndicatorState.from_json(state.to_json())
+
+    revised = state.update_frame(prices)
+    assert len(revised) == 1
+    assert state.last_date == prices['date'].iloc[-1]
+    assert_matches_batch(state.values, compute_indicators(prices).iloc[-1])
+
+    # 修正後再次更新不會重複套用
+    assert state.update_frame(prices).empty
+
+    # 之後的新 K 棒仍與批次計算一致
+    more = pd.concat([prices, prices.tail(1).assign(date=prices['date'].iloc[-1] + pd.offsets.BDay())],
+                     ignore_index=True)
+    state.update_frame(more)
+    assert_matches_batch(state.values, compute_indicators(more).iloc[-1])
+
+
+def test_revised_last_bar_without_snapshot_recomputes(prices):
+    intraday = prices.copy()
+    intraday.loc[intraday.index[-1], 'close'] *= 1.03
+
+    state = IndicatorState()
+    state.update_frame(intraday)
+    state.previous = None
+
+    state.update_frame(prices)
+    assert_matches_batch(state.values, compute_indicators(prices).iloc[-1])
+
+
+def test_rolling_window_matches_full_scan():
+    rng = np.random.default_rng(1)
+    values = rng.normal(100, 20, 500)
+    values[[50, 51, 300]] = np.nan
+
+    window = RollingWindowState(20)
+    for i, x in enumerate(values):
+        window.update(x)
+        recent = values[max(0, i - 19):i + 1]
+        np.testing.assert_allclose(window.mean(1), np.mean(recent), rtol=1e-12)
+        expected_max = np.max(recent) if len(recent) == 20 else np.nan
+        expected_min = np.min(recent) if len(recent) == 20 else np.nan
+        np.testing.assert_equal(window.max(), expected_max)
+        np.testing.assert_equal(window.min(), expected_min)
+
+    restored = RollingWindowState.from_dict(window.to_dict())
+    assert (restored.mean(20), restored.max(), restored.min()) == (window.mean(20), window.max(), window.min())
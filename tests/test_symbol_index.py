@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+import symbol_index
+
+COMPANIES = pd.DataFrame({
+    '公司代號': ['1101', '1102', '2317', '2330', '2303', '3008', '0050', '00878'],
+    '公司名稱': ['台灣水泥股份有限公司', '亞洲水泥股份有限公司', '鴻海精密工業股份有限公司',
+             '台灣積體電路製造股份有限公司', '聯華電子股份有限公司', '大立光電股份有限公司',
+             '元大台灣50', '國泰永續高股息'],
+    '市場': ['上市', '上市', '上市', '上市', '上市', '上市', 'ETF', 'ETF'],
+})
+
+
+@pytest.fixture
+def index():
+    return symbol_index.SymbolIndex(COMPANIES)
+
+
+def symbols(results):
+    return [entry['symbol'] for entry in results]
+
+
+def test_exact_code_comes_first(index):
+    assert symbols(index.search("2330"))[0] == "2330"
+    assert index.search("2330")[0] == {'symbol': '2330', 'name': '台灣積體電路製造', 'market': '上市'}
+
+
+def test_code_prefix(index):
+    assert symbols(index.search("110")) == ["1101", "1102"]
+
+
+def test_name_prefix_and_substring(index):
+    assert symbols(index.search("臺灣"))[:2] == ["1101", "2330"]
+    assert symbols(index.search("水泥")) == ["1101", "1102"]
+
+
+def test_subsequence_matches_abbreviation(index):
+    assert symbols(index.search("台積電")) == ["2330"]
+    assert symbols(index.search("聯電")) == ["2303"]
+
+
+def test_fuzzy_match_on_typo(index):
+    assert "3008" in symbols(index.search("大立光學"))
+    assert "2317" in symbols(index.search("2371"))
+
+
+def test_search_respects_limit(index):
+    assert len(index.search("0", limit=1)) == 1
+    assert index.search("  ") == []
+
+
+def test_resolve_listed_code_name_and_etf(index):
+    assert index.resolve("2330") == "2330"
+    assert index.resolve("2330 台積電") == "2330"
+    assert index.resolve("鴻海精密工業") == "2317"
+    assert index.resolve("00878") == "00878"
+
+
+def test_resolve_rejects_codes_missing_from_lists(index):
+    # 符合 ETF 代碼格式但不在清單中的代碼不應送往 FinMind
+    assert index.resolve("0051") is None
+    assert index.resolve("00999") is None
+    assert index.resolve("9999") is None
+    assert index.resolve("水泥") is None
+
+
+def test_empty_index_falls_back_to_code_format():
+    index = symbol_index.SymbolIndex(pd.DataFrame(columns=['公司代號', '公司名稱', '市場']))
+    assert index.resolve("2330") == "2330"
+    assert index.resolve("台積電") is None
+
+
+def test_load_index_merges_etf_list(tmp_path):
+    list_path = tmp_path / "tw_all_listed_otc.csv"
+    etf_path = tmp_path / "tw_etf.csv"
+    COMPANIES.iloc[:6].to_csv(list_path, index=False, encoding='utf-8-sig')
+    COMPANIES.iloc[6:].to_csv(etf_path, index=False, encoding='utf-8-sig')
+
+    index = symbol_index.load_index(str(list_path), str(tmp_path / "companies.parquet"), str(etf_path))
+    assert index.lookup("0050")['market'] == "ETF"
+    assert index.resolve("2330") == "2330"
+    assert symbol_index.load_index(str(list_path), str(tmp_path / "companies.parquet"), str(etf_path)) is index